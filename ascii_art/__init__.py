@@ -1,4 +1,8 @@
 from .converter import (
+    Charset,
+    Converter,
+    FrameSession,
+    RenderResult,
     char_array,
     get_char,
     load_char_array,
@@ -9,8 +13,15 @@ from .converter import (
     print_divider,
 )
 from .cli import parse_args, main
+from .pixelbuffer import PixelBuffer
+from . import api
 
 __all__ = [
+    "Charset",
+    "Converter",
+    "FrameSession",
+    "RenderResult",
+    "PixelBuffer",
     "char_array",
     "get_char",
     "load_char_array",
@@ -21,4 +32,5 @@ __all__ = [
     "print_divider",
     "parse_args",
     "main",
+    "api",
 ]
@@ -0,0 +1,129 @@
+"""Indexed ANSI colour palettes for terminals without truecolor.
+
+``256`` maps every cell to the xterm 6x6x6 colour cube or the 24-step gray
+ramp (indices 16-255; the 16 system colours are left out because terminal
+themes redefine them). ``16`` maps to the standard xterm system colours.
+
+Finding the nearest palette entry per cell would be a search over the whole
+palette. Instead every colour is quantized to ``LUT_BITS`` bits per channel
+and :func:`palette_lut` holds the nearest entry of each of the resulting
+32x32x32 colours, so mapping a cell is a single table lookup (see
+:func:`lut_key`). The table is built once (by Pillow's nearest-colour
+conversion, in C) and kept in the user cache directory like the charset
+ramps.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+from pathlib import Path
+
+from PIL import Image
+
+from . import cache
+
+# Colour depth of `ansi` output.
+ANSI_PALETTES = ("truecolor", "256", "16")
+
+# Bits kept per channel by the lookup table; it has 2 ** (3 * LUT_BITS) entries.
+LUT_BITS = 5
+
+_SHIFT = 8 - LUT_BITS
+
+_DITHER_NONE = getattr(getattr(Image, "Dither", Image), "NONE")
+
+# Standard xterm system colours 0-15.
+XTERM_16 = (
+    (0, 0, 0),
+    (205, 0, 0),
+    (0, 205, 0),
+    (205, 205, 0),
+    (0, 0, 238),
+    (205, 0, 205),
+    (0, 205, 205),
+    (229, 229, 229),
+    (127, 127, 127),
+    (255, 0, 0),
+    (0, 255, 0),
+    (255, 255, 0),
+    (92, 92, 255),
+    (255, 0, 255),
+    (0, 255, 255),
+    (255, 255, 255),
+)
+
+_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+# xterm colours 16-255: the 6x6x6 cube, then the gray ramp.
+XTERM_256 = tuple(
+    (r, g, b) for r in _CUBE_LEVELS for g in _CUBE_LEVELS for b in _CUBE_LEVELS
+) + tuple((v, v, v) for v in range(8, 248, 10))
+
+# Palette colours and the index of their first entry, by palette name.
+_PALETTES = {"256": (XTERM_256, 16), "16": (XTERM_16, 0)}
+
+
+def lut_key(r: int, g: int, b: int) -> int:
+    """Return the :func:`palette_lut` entry of an RGB colour."""
+    return (r >> _SHIFT) << (2 * LUT_BITS) | (g >> _SHIFT) << LUT_BITS | b >> _SHIFT
+
+
+def fg_escapes(palette: str) -> tuple[str, ...]:
+    """Return the SGR foreground escape of every index of `palette`."""
+    if palette == "16":
+        return tuple(f"\x1b[{30 + i if i < 8 else 82 + i}m" for i in range(16))
+    return tuple(f"\x1b[38;5;{i}m" for i in range(256))
+
+
+def bg_escapes(palette: str) -> tuple[str, ...]:
+    """Return the SGR background escape of every index of `palette`."""
+    if palette == "16":
+        return tuple(f"\x1b[{40 + i if i < 8 else 92 + i}m" for i in range(16))
+    return tuple(f"\x1b[48;5;{i}m" for i in range(256))
+
+
+def _build_lut(palette: str) -> bytes:
+    colors, first = _PALETTES[palette]
+    size = 1 << LUT_BITS
+    half = 1 << _SHIFT >> 1
+    # One pixel per table entry, at the centre of its quantization step.
+    steps = [(q << _SHIFT) + half for q in range(size)]
+    centers = Image.frombytes(
+        "RGB",
+        (size**3, 1),
+        bytes(c for r in steps for g in steps for b in steps for c in (r, g, b)),
+    )
+    pal_im = Image.new("P", (1, 1))
+    pal_im.putpalette([c for rgb in colors for c in rgb])
+    nearest = centers.quantize(palette=pal_im, dither=_DITHER_NONE).tobytes()
+    return nearest if not first else bytes(i + first for i in nearest)
+
+
+def _entry_path(palette: str) -> Path:
+    colors, first = _PALETTES[palette]
+    spec = [colors, first, LUT_BITS]
+    key = hashlib.sha256(json.dumps(spec).encode("ascii")).hexdigest()
+    return cache.cache_dir() / "ansi" / f"{key}.lut"
+
+
+@functools.lru_cache(maxsize=None)
+def palette_lut(palette: str) -> bytes:
+    """Return the palette index of every :func:`lut_key` for `palette`.
+
+    The table is read from the user cache directory, or built and stored
+    there on the first use (see :func:`ascii_art.cache.cache_dir`).
+    """
+    if palette not in _PALETTES:
+        raise ValueError("palette must be one of: " + ", ".join(_PALETTES))
+    path = _entry_path(palette)
+    size = 1 << 3 * LUT_BITS
+    lut = cache.read_bytes(path)
+    if lut is None or len(lut) != size:
+        with cache.file_lock(path.with_suffix(".lock")):
+            lut = cache.read_bytes(path)
+            if lut is None or len(lut) != size:
+                lut = _build_lut(palette)
+                cache.atomic_write(path, lut)
+    return lut
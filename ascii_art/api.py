@@ -0,0 +1,197 @@
+"""In-memory conversion API for embedding the converter in other programs.
+
+Every function renders a single image with :meth:`Converter.render` and
+returns the result directly as a string, bytes, a PIL image, a NumPy array
+or the raw character grid. Nothing is written to disk or stdout except to
+the binary file object given to :func:`write` or :func:`write_image_file`,
+and no progress bar is shown; pass ``progress_callback`` to observe progress.
+
+``image`` may be a PIL image, a path, a binary file object (unseekable ones
+such as ``sys.stdin.buffer`` are read into memory first), a NumPy array or
+a :class:`~ascii_art.pixelbuffer.PixelBuffer` (arrays and buffers are read in
+place; use ``PixelBuffer.from_array(frame, "BGR")`` for OpenCV frames).
+Animated images render their first (current) frame. Keyword options are the
+per-frame options of :meth:`Converter.convert` (``scale_factor``,
+``bg_brightness``, ``mono``, ``dither``, ``fg_color``, tone controls, ...).
+``converter`` selects the :class:`Converter` (and so the charset and font
+cache) to use; by default the shared module-level converter is used.
+
+Example::
+
+    from ascii_art import api
+
+    text = api.to_text("photo.jpg", scale_factor=0.1)
+    png = api.to_image_bytes("photo.jpg", codec="png", mono=True)
+    buf = api.to_array(frame)             # reuse: api.to_array(next, out=buf)
+
+    with open("photo.html", "wb") as fh:  # rows are written as they render
+        api.write("photo.jpg", fh, "html")
+"""
+
+from __future__ import annotations
+
+import os
+from typing import IO, Any, Iterator, Union
+
+from PIL import Image
+
+from .converter import (
+    Converter,
+    RenderResult,
+    _default_converter,
+    _open_image,
+    encode_image,
+    write_image,
+)
+from .pixelbuffer import PixelBuffer
+
+ImageInput = Union[Image.Image, PixelBuffer, str, os.PathLike, IO[bytes], Any]
+
+
+def _is_source(image: Any) -> bool:
+    return isinstance(image, (str, os.PathLike)) or hasattr(image, "read")
+
+
+def render(
+    image: ImageInput,
+    output_format: str = "image",
+    *,
+    converter: Converter | None = None,
+    **options: Any,
+) -> RenderResult:
+    """Render ``image`` and return the full :class:`RenderResult`."""
+    conv = converter if converter is not None else _default_converter()
+    if not _is_source(image):
+        return conv.render(image, output_format, **options)
+    with _open_image(image) as im:
+        return conv.render(im, output_format, **options)
+
+
+def iter_rows(
+    image: ImageInput,
+    output_format: str = "text",
+    *,
+    converter: Converter | None = None,
+    **options: Any,
+) -> Iterator[str]:
+    """Yield the rows of a `text`, `html` or `ansi` render as they are rendered.
+
+    See :meth:`Converter.iter_rows`; a path or file is kept open until the
+    last row has been produced.
+    """
+    conv = converter if converter is not None else _default_converter()
+    if not _is_source(image):
+        yield from conv.iter_rows(image, output_format, **options)
+        return
+    with _open_image(image) as im:
+        yield from conv.iter_rows(im, output_format, **options)
+
+
+def write(
+    image: ImageInput,
+    fp: IO[bytes],
+    output_format: str = "text",
+    *,
+    converter: Converter | None = None,
+    **options: Any,
+) -> None:
+    """Stream the UTF-8 `text`, `html` or `ansi` document into binary `fp`."""
+    conv = converter if converter is not None else _default_converter()
+    if not _is_source(image):
+        conv.write(image, fp, output_format, **options)
+        return
+    with _open_image(image) as im:
+        conv.write(im, fp, output_format, **options)
+
+
+def to_text(image: ImageInput, **options: Any) -> str:
+    """Return the plain-text rendering, rows separated by ``\\n``."""
+    return render(image, "text", **options).getvalue()
+
+
+def to_html(image: ImageInput, **options: Any) -> str:
+    """Return a complete HTML page.
+
+    ``html_mode`` is ``spans`` (one element per cell), ``compact`` (runs of
+    palette classes) or ``canvas`` (the grid embedded as data and drawn by a
+    script, see :mod:`ascii_art.htmlcanvas`).
+    """
+    return render(image, "html", **options).getvalue()
+
+
+def to_ansi(image: ImageInput, **options: Any) -> str:
+    """Return ANSI text, one reset-terminated line per row.
+
+    The colour depth follows ``ansi_palette``: ``truecolor`` (the default)
+    24-bit escapes, or the ``256``/``16`` colour terminal palettes.
+    """
+    return render(image, "ansi", **options).getvalue()
+
+
+def to_image(image: ImageInput, **options: Any) -> Image.Image:
+    """Return the rendered canvas (``RGB``, or ``L``/``P`` where applicable)."""
+    result = render(image, "image", **options)
+    assert result.image is not None
+    return result.image
+
+
+def to_array(image: ImageInput, out: Any = None, **options: Any) -> Any:
+    """Return the rendered canvas as a ``(height, width, 3)`` uint8 NumPy array.
+
+    The pixels equal ``to_image(...).convert("RGB")``. When ``out`` is given
+    (a writable C-contiguous uint8 array of exactly that shape, typically
+    the previous frame's result) it is drawn into and returned, so video
+    consumers render frame after frame without allocating a canvas.
+    """
+    return render(image, "array", out=out, **options).array
+
+
+def to_image_bytes(
+    image: ImageInput,
+    *,
+    codec: str = "png",
+    png_compress_level: int = 6,
+    png_optimize: bool = False,
+    webp_quality: int = 80,
+    **options: Any,
+) -> bytes:
+    """Return the rendered canvas encoded with ``codec`` (see :func:`save_image`)."""
+    return encode_image(
+        to_image(image, **options),
+        codec=codec,
+        png_compress_level=png_compress_level,
+        png_optimize=png_optimize,
+        webp_quality=webp_quality,
+    )
+
+
+def write_image_file(
+    image: ImageInput,
+    fp: IO[bytes],
+    *,
+    codec: str = "png",
+    png_compress_level: int = 6,
+    png_optimize: bool = False,
+    webp_quality: int = 80,
+    **options: Any,
+) -> None:
+    """Encode the rendered canvas with ``codec`` into the binary file ``fp``."""
+    write_image(
+        to_image(image, **options),
+        fp,
+        codec=codec,
+        png_compress_level=png_compress_level,
+        png_optimize=png_optimize,
+        webp_quality=webp_quality,
+    )
+
+
+def to_grid(image: ImageInput, **options: Any) -> tuple[list[list[str]], list[bytes]]:
+    """Return the character grid as ``(rows, colors)``.
+
+    ``rows`` holds the cells of every grid row and ``colors`` their packed RGB
+    bytes (3 per cell), untrimmed.
+    """
+    result = render(image, "grid", **options)
+    assert result.rows is not None and result.colors is not None
+    return result.rows, result.colors
@@ -0,0 +1,74 @@
+"""Braille sub-pixel rendering.
+
+A braille character (U+2800-U+28FF) is a 2x4 grid of dots, and its code
+point is ``0x2800`` plus one bit per raised dot. Sampling the frame at
+``DOTS`` sub-pixels per cell, turning every sub-pixel on or off and packing
+the eight bits of each cell gives eight samples per emitted character
+instead of one. Thresholding, packing and the character lookup are
+whole-grid operations. Requires NumPy.
+"""
+
+from __future__ import annotations
+
+from PIL import Image, ImageDraw
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - numpy is optional
+    np = None
+
+# Sub-pixels per cell: (columns, rows).
+DOTS = (2, 4)
+
+BRAILLE_BASE = 0x2800
+
+# Every braille pattern, indexed by its dot bits.
+BRAILLE_CHARS = tuple(chr(BRAILLE_BASE + bits) for bits in range(256))
+
+# Bit of the dot at [row][column] (dots 1-3 and 4-6 run down the columns,
+# dots 7 and 8 were added below them).
+_DOT_BITS = ((0x01, 0x08), (0x02, 0x10), (0x04, 0x20), (0x40, 0x80))
+
+_DITHER_FLOYDSTEINBERG = getattr(getattr(Image, "Dither", Image), "FLOYDSTEINBERG")
+_DITHER_NONE = getattr(getattr(Image, "Dither", Image), "NONE")
+
+
+def braille_indices(sub_gray: Image.Image, *, dither: bool = False) -> "np.ndarray":
+    """Return the dot bits of every cell as a flat ``uint8`` array.
+
+    ``sub_gray`` is the brightness plane sampled at ``DOTS`` pixels per cell,
+    i.e. ``(2 * columns, 4 * rows)``. Sub-pixels at 128 and above are raised
+    dots; with `dither` the plane is Floyd-Steinberg dithered to on/off
+    first, which keeps gradients visible as dot density.
+    """
+    cols, rows = DOTS
+    width, height = sub_gray.size
+    grid_w, grid_h = width // cols, height // rows
+    dots = sub_gray.convert(
+        "1", dither=_DITHER_FLOYDSTEINBERG if dither else _DITHER_NONE
+    )
+    on = np.asarray(dots, dtype=np.uint8).reshape(grid_h, rows, grid_w, cols)
+    weights = np.array(_DOT_BITS, dtype=np.uint8).reshape(rows, 1, cols)
+    return (on * weights).sum(axis=(1, 3), dtype=np.uint8).ravel()
+
+
+def braille_mask(ch: str, cell_width: int, cell_height: int) -> Image.Image:
+    """Return the ``cell_width`` x ``cell_height`` dot mask of braille `ch`.
+
+    Fonts rarely carry braille glyphs, so the dots are drawn directly: the
+    cell is split into ``DOTS`` slots with one round dot centred in each.
+    """
+    cols, rows = DOTS
+    bits = ord(ch) - BRAILLE_BASE
+    im = Image.new("L", (cell_width, cell_height), color=0)
+    draw = ImageDraw.Draw(im)
+    radius = max(0.5, 0.35 * min(cell_width / cols, cell_height / rows))
+    for row, row_bits in enumerate(_DOT_BITS):
+        for col, bit in enumerate(row_bits):
+            if bits & bit:
+                cx = (col + 0.5) * cell_width / cols
+                cy = (row + 0.5) * cell_height / rows
+                draw.ellipse(
+                    (cx - radius, cy - radius, cx + radius, cy + radius), fill=255
+                )
+    return im
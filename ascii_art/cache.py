@@ -0,0 +1,120 @@
+"""Per-user on-disk cache shared by concurrent processes.
+
+Entries live in a user cache directory (never inside the installed package,
+which may be read-only) under content-derived names, so a changed input
+simply maps to a new file instead of a stale one. Files are written to a
+temporary name and renamed into place, so readers never observe a partial
+entry, and :func:`file_lock` serializes processes that would otherwise
+compute the same entry at the same time. Every failure to read or write the
+cache is treated as a miss; the cache is purely an accelerator.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None
+
+# Environment variable overriding the cache location.
+CACHE_DIR_ENV = "ASCII_ART_CACHE_DIR"
+
+
+def cache_dir() -> Path:
+    """Return the cache directory (it is created on the first write).
+
+    ``$ASCII_ART_CACHE_DIR`` wins; otherwise the platform's user cache
+    location is used (``%LOCALAPPDATA%``, ``~/Library/Caches`` or
+    ``$XDG_CACHE_HOME``/``~/.cache``).
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ascii_art"
+
+
+def file_digest(path: str | os.PathLike[str]) -> str:
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_bytes(path: Path) -> bytes | None:
+    """Return the content of ``path``, or ``None`` if it cannot be read."""
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def atomic_write(path: Path, data: bytes) -> bool:
+    """Write ``data`` to ``path`` via a temporary file and an atomic rename.
+
+    Returns ``False`` (leaving no partial file behind) when the cache
+    location is not writable.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        return False
+    return True
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``path`` for the block.
+
+    Without a writable cache location (or lock support) the block runs
+    unlocked; the atomic writes still keep every entry consistent.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(path, "a+b")
+    except OSError:
+        yield
+        return
+    with fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover - Windows
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:  # pragma: no cover - Windows
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
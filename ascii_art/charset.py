@@ -2,20 +2,27 @@
 
 This module exposes ``generate_char_array`` which renders each character and
 computes how much of the glyph is "inked". The characters are then sorted from
-least filled (lightest) to most filled (darkest). The resulting array can be
+least filled (lightest) to most filled (darkest). ``generate_char_arrays``
+ranks several fonts at once in parallel worker processes. The resulting array can be
 used to map grayscale values to characters in the ASCII art converter.
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Sequence
 
+import PIL
 from PIL import Image, ImageDraw, ImageFont
 
+from . import cache
+
 # Base characters used to build the mapping. These are ordered arbitrarily and
 # will be sorted by brightness percentage.
 BASE_CHARS: list[str] = [
@@ -290,37 +297,99 @@ def _default_font_path() -> str:
     return ""
 
 
-def _ink_percentage(ch: str, font: ImageFont.FreeTypeFont) -> float:
-    """Return the ratio of white pixels for ``ch`` rendered with ``font``."""
-    canvas = Image.new("L", (200, 250), color=0)
+# Glyphs are drawn at ``_FONT_SIZE`` onto a canvas of ``_CANVAS_SIZE`` at
+# ``_GLYPH_ORIGIN``; pixels brighter than ``_INK_THRESHOLD`` count as ink.
+_FONT_SIZE = 250
+_CANVAS_SIZE = (200, 250)
+_GLYPH_ORIGIN = (25, 5)
+_INK_THRESHOLD = 100
+
+
+def _ink_percentages(
+    chars: Iterable[str], font: ImageFont.FreeTypeFont | ImageFont.ImageFont
+) -> list[float]:
+    """Return the ratio of inked pixels for each of ``chars`` rendered with ``font``.
+
+    Every glyph is drawn onto the same cleared canvas, which clips it exactly
+    like a fresh canvas would, and its ink is counted from the canvas
+    histogram in C instead of pixel by pixel.
+    """
+    canvas = Image.new("L", _CANVAS_SIZE, color=0)
     draw = ImageDraw.Draw(canvas)
-    draw.text((25, 5), ch, font=font, fill=255)
-    width, height = canvas.size
-    pixels = canvas.load()
-    white = 0
-    for y in range(height):
-        for x in range(width):
-            if pixels[x, y] > 100:
-                white += 1
-    return white / float(width * height)
+    box = (0, 0) + _CANVAS_SIZE
+    total = float(_CANVAS_SIZE[0] * _CANVAS_SIZE[1])
+    percentages = []
+    for ch in chars:
+        canvas.paste(0, box)
+        draw.text(_GLYPH_ORIGIN, ch, font=font, fill=255)
+        percentages.append(sum(canvas.histogram()[_INK_THRESHOLD + 1 :]) / total)
+    return percentages
+
+
+def _rank_chars(font_path: str) -> list[str]:
+    """Return ``BASE_CHARS`` sorted by ink coverage in the font at ``font_path``."""
+    if font_path:
+        font = ImageFont.truetype(font_path, _FONT_SIZE)
+    else:
+        font = ImageFont.load_default()
+    percentages = _ink_percentages(BASE_CHARS, font)
+    return [ch for _, ch in sorted(zip(percentages, BASE_CHARS))]
+
+
+# Precomputed ramps shipped with the package, keyed like the user cache.
+BUNDLED_RAMPS_FILE = Path(__file__).with_name("ramps.json")
+
+
+def _ramp_key(font_path: str) -> str:
+    """Return the content address of the ramp ranked from ``font_path``.
+
+    It covers the font file's bytes (Pillow's version for its built-in
+    font), the measuring parameters and ``BASE_CHARS``, so editing any of
+    them selects a new entry instead of a stale one.
+    """
+    font = cache.file_digest(font_path) if font_path else f"pillow-{PIL.__version__}"
+    spec = [font, _FONT_SIZE, _CANVAS_SIZE, _GLYPH_ORIGIN, _INK_THRESHOLD, BASE_CHARS]
+    return hashlib.sha256(json.dumps(spec).encode("ascii")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return cache.cache_dir() / "charsets" / f"{key}.json"
 
 
-CACHE_FILE = Path(__file__).with_name("char_cache.json")
+@functools.lru_cache(maxsize=1)
+def _bundled_ramps() -> dict[str, list[str]]:
+    try:
+        with BUNDLED_RAMPS_FILE.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
 
 
-def _load_cache() -> dict[str, list[str]]:
-    if CACHE_FILE.exists():
-        with CACHE_FILE.open("r", encoding="utf-8") as fh:
-            try:
-                return json.load(fh)
-            except json.JSONDecodeError:
-                return {}
-    return {}
+def _read_entry(key: str) -> list[str] | None:
+    data = cache.read_bytes(_entry_path(key))
+    if data is None:
+        return None
+    try:
+        chars = json.loads(data)
+    except ValueError:
+        return None
+    return chars if isinstance(chars, list) else None
 
 
-def _write_cache(cache: dict[str, list[str]]) -> None:
-    with CACHE_FILE.open("w", encoding="utf-8") as fh:
-        json.dump(cache, fh, indent=2)
+def _rank_and_store(task: tuple[str, str, bool]) -> list[str]:
+    """Rank ``BASE_CHARS`` for one font and store the result in the cache.
+
+    The entry's lock makes concurrent processes wait for the first one to
+    finish and then reuse its result instead of ranking the font again.
+    """
+    font_path, key, refresh = task
+    path = _entry_path(key)
+    with cache.file_lock(path.with_suffix(".lock")):
+        chars = None if refresh else _read_entry(key)
+        if chars is None:
+            chars = _rank_chars(font_path)
+            cache.atomic_write(path, json.dumps(chars).encode("ascii"))
+    return chars
 
 
 def generate_char_array(
@@ -329,40 +398,101 @@ def generate_char_array(
     """Return characters sorted by how much of the glyph is filled.
 
     ``font_path`` may be supplied to point to a TTF font. When ``None`` the
-    function attempts to locate a system monospace font. Results are cached in
-    ``char_cache.json`` keyed by font path.
+    function attempts to locate a system monospace font. Ramps bundled with
+    the package are returned without rendering; other fonts are ranked once
+    and cached per font content in the user cache directory (see
+    :func:`ascii_art.cache.cache_dir`). ``refresh_cache`` re-ranks the font
+    and overwrites its cache entry.
     """
-    font_path = font_path or _default_font_path()
-    cache_key = font_path or "default"
-    cache: dict[str, list[str]] = {} if refresh_cache else _load_cache()
-    if not refresh_cache and cache_key in cache:
-        return cache[cache_key]
+    return generate_char_arrays([font_path], refresh_cache=refresh_cache)[0]
+
+
+def generate_char_arrays(
+    font_paths: Sequence[str | None],
+    *,
+    workers: int | None = None,
+    refresh_cache: bool = False,
+) -> list[list[str]]:
+    """Return :func:`generate_char_array` for each of ``font_paths``.
+
+    Fonts that are neither bundled nor cached are ranked in up to
+    ``workers`` processes (default: one per CPU).
+    """
+    font_paths = [path or _default_font_path() for path in font_paths]
+    keys = [_ramp_key(path) for path in font_paths]
+    ramps: dict[str, list[str]] = {}
+    if not refresh_cache:
+        bundled = _bundled_ramps()
+        for key in keys:
+            chars = bundled.get(key) or _read_entry(key)
+            if chars is not None:
+                ramps[key] = chars
+    missing = {
+        key: path for key, path in zip(keys, font_paths) if key not in ramps
+    }
+    if missing:
+        tasks = [(path, key, refresh_cache) for key, path in missing.items()]
+        workers = min(len(tasks), max(1, int(workers or os.cpu_count() or 1)))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                ranked = list(pool.map(_rank_and_store, tasks))
+        else:
+            ranked = [_rank_and_store(task) for task in tasks]
+        ramps.update(zip(missing, ranked))
+    return [list(ramps[key]) for key in keys]
 
-    if font_path:
-        font = ImageFont.truetype(font_path, 250)
-    else:
-        font = ImageFont.load_default()
-    percentages = [_ink_percentage(ch, font) for ch in BASE_CHARS]
-    result = [ch for _, ch in sorted(zip(percentages, BASE_CHARS))]
 
-    cache[cache_key] = result
-    _write_cache(cache)
-    return result
+def write_bundled_ramps(font_paths: Sequence[str | None]) -> Path:
+    """Rank ``font_paths`` and add them to the bundled ``ramps.json``.
+
+    Maintainer helper used to precompute ramps for common monospace fonts.
+    """
+    font_paths = [path or _default_font_path() for path in font_paths]
+    bundled = dict(_bundled_ramps())
+    for path in font_paths:
+        bundled[_ramp_key(path)] = _rank_chars(path)
+    with BUNDLED_RAMPS_FILE.open("w", encoding="utf-8") as fh:
+        json.dump(bundled, fh, indent=1, sort_keys=True)
+        fh.write("\n")
+    _bundled_ramps.cache_clear()
+    return BUNDLED_RAMPS_FILE
 
 
 def parse_args(args: Iterable[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Generate brightness-ranked character arrays"
     )
-    parser.add_argument("--font-path", help="Optional path to a TTF font")
+    parser.add_argument(
+        "--font-path",
+        action="append",
+        help="Optional path to a TTF font (repeat to rank several fonts)",
+    )
     parser.add_argument(
         "--refresh-cache",
         action="store_true",
         help="Recompute the character array even if cached",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes used to rank several fonts (default: CPU count)",
+    )
+    parser.add_argument(
+        "--write-bundled",
+        action="store_true",
+        help="Add the ramps of the given fonts to the bundled ramps.json",
+    )
     return parser.parse_args(list(args) if args is not None else None)
 
 
 if __name__ == "__main__":  # pragma: no cover - manual usage
     _args = parse_args()
-    print(generate_char_array(_args.font_path, refresh_cache=_args.refresh_cache))
+    if _args.write_bundled:
+        print(write_bundled_ramps(_args.font_path or [None]))
+        raise SystemExit
+    for _chars in generate_char_arrays(
+        _args.font_path or [None],
+        workers=_args.workers,
+        refresh_cache=_args.refresh_cache,
+    ):
+        print(_chars)
@@ -1,9 +1,13 @@
 import argparse
 import configparser
+import os
+import sys
 from pathlib import Path
 from typing import Sequence
 
 from .converter import (
+    EDGE_THRESHOLD,
+    IMAGE_CODECS,
     convert_image,
     convert_video,
     list_files_from_assets,
@@ -32,9 +36,18 @@ def _validate_cell_size(val: int) -> int:
     return val
 
 
+def _validate_levels(val: str) -> tuple[int, int]:
+    black, white = (int(v) for v in val.split(","))
+    if not 0 <= black < white <= 255:
+        raise ValueError("Levels must satisfy 0 <= black < white <= 255")
+    return black, white
+
+
 def parse_args(args: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Convert images to ASCII art")
-    parser.add_argument("--input", help="Name of the input image file")
+    parser.add_argument(
+        "--input", help="Name of the input image file, or '-' to read stdin"
+    )
     parser.add_argument("--batch", help="Convert all images in the given directory")
     parser.add_argument(
         "--scale",
@@ -50,17 +63,33 @@ def parse_args(args: Sequence[str] | None = None) -> argparse.Namespace:
         "--output-dir",
         help="Directory to store the generated image",
     )
+    parser.add_argument(
+        "--output",
+        help="Write the output to this file, or '-' for stdout, "
+        "instead of a generated name in --output-dir",
+    )
     parser.add_argument(
         "--format",
-        choices=["image", "text", "html", "ansi"],
+        choices=["image", "text", "html", "ansi", "dzi"],
         help="Output format",
     )
     parser.add_argument(
         "--html",
         dest="html_mode",
-        choices=["spans", "compact"],
+        choices=["spans", "compact", "canvas"],
         help="HTML output mode (only used when --format html)",
     )
+    parser.add_argument(
+        "--ansi-tolerance",
+        type=int,
+        help="Merge ANSI colours within this per-channel difference into one "
+        "run (0-255, default: 0)",
+    )
+    parser.add_argument(
+        "--ansi-palette",
+        choices=["truecolor", "256", "16"],
+        help="Colour depth of --format ansi (default: truecolor)",
+    )
     parser.add_argument(
         "--dynamic-set",
         action="store_true",
@@ -86,6 +115,41 @@ def parse_args(args: Sequence[str] | None = None) -> argparse.Namespace:
         action="store_true",
         help="Render ASCII art in grayscale instead of colour",
     )
+    parser.add_argument(
+        "--colors",
+        type=int,
+        help="Quantize image output to N colours (1-255) on a palette canvas",
+    )
+    parser.add_argument(
+        "--fg-color",
+        help="Draw every character in one colour (e.g. '#e0e0e0' or 'white')",
+    )
+    parser.add_argument(
+        "--invert",
+        action="store_true",
+        help="Invert brightness before character selection",
+    )
+    parser.add_argument(
+        "--contrast",
+        type=float,
+        help="Contrast factor around mid-gray (default: 1.0)",
+    )
+    parser.add_argument(
+        "--gamma",
+        type=float,
+        help="Brightness gamma; values above 1 brighten midtones (default: 1.0)",
+    )
+    parser.add_argument(
+        "--levels",
+        type=_validate_levels,
+        metavar="BLACK,WHITE",
+        help="Stretch input levels BLACK..WHITE to the full range",
+    )
+    parser.add_argument(
+        "--auto-levels",
+        action="store_true",
+        help="Stretch levels per image from its brightness histogram",
+    )
     parser.add_argument(
         "--grayscale",
         choices=["avg", "luma601", "luma709"],
@@ -96,6 +160,29 @@ def parse_args(args: Sequence[str] | None = None) -> argparse.Namespace:
         choices=["none", "floyd-steinberg", "atkinson"],
         help="Optional dithering applied before character selection",
     )
+    parser.add_argument(
+        "--mapping",
+        choices=["brightness", "shape"],
+        help="Pick characters by cell brightness or by 2x3 sub-cell shape "
+        "(default: brightness)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["ascii", "braille", "halfblock"],
+        help="Cell content: ramp characters, 2x4 braille dots or two "
+        "coloured half blocks (default: ascii)",
+    )
+    parser.add_argument(
+        "--edges",
+        action="store_true",
+        help="Draw strong edges with directional glyphs (| / \\ - _)",
+    )
+    parser.add_argument(
+        "--edge-threshold",
+        type=float,
+        help="Minimum edge strength for --edges, 255 = black-to-white step "
+        "(default: 64)",
+    )
     parser.add_argument(
         "--cell-width",
         type=int,
@@ -121,6 +208,48 @@ def parse_args(args: Sequence[str] | None = None) -> argparse.Namespace:
         type=int,
         help="Assembled GIF loop count (0 = forever)",
     )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        help="Tile edge length in pixels for --format dzi (default: 256)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for tile rendering with --format dzi (default: 1)",
+    )
+    parser.add_argument(
+        "--png-stream",
+        action="store_true",
+        help="Render PNG output band by band without allocating the full canvas",
+    )
+    parser.add_argument(
+        "--png-compress",
+        type=int,
+        choices=range(10),
+        metavar="{0..9}",
+        help="zlib compression level for PNG output (default: 6)",
+    )
+    parser.add_argument(
+        "--png-filter",
+        choices=["none", "sub", "up"],
+        help="PNG scanline filter used with --png-stream (default: none)",
+    )
+    parser.add_argument(
+        "--png-optimize",
+        action="store_true",
+        help="Search for the smallest PNG encoding (slow)",
+    )
+    parser.add_argument(
+        "--image-codec",
+        choices=list(IMAGE_CODECS),
+        help="Encoder for --format image (default: png)",
+    )
+    parser.add_argument(
+        "--webp-quality",
+        type=int,
+        help="Quality for --image-codec webp, 0-100 (default: 80)",
+    )
     return parser.parse_args(args)
 
 
@@ -147,6 +276,36 @@ def main():
     grayscale_mode = args.grayscale if args.grayscale is not None else "avg"
     dither_mode = args.dither if args.dither is not None else "none"
     html_mode = args.html_mode if args.html_mode is not None else "spans"
+    ansi_tolerance = args.ansi_tolerance if args.ansi_tolerance is not None else 0
+    ansi_palette = args.ansi_palette if args.ansi_palette is not None else "truecolor"
+    mapping = args.mapping if args.mapping is not None else "brightness"
+    png_compress = args.png_compress if args.png_compress is not None else 6
+    png_filter = args.png_filter if args.png_filter is not None else "none"
+    tile_size = _validate_cell_size(
+        args.tile_size if args.tile_size is not None else 256
+    )
+    # Only tiling uses worker processes; other formats keep the library default.
+    tiling = (
+        dict(workers=args.workers)
+        if output_format == "dzi" and args.workers is not None
+        else {}
+    )
+    image_codec = args.image_codec if args.image_codec is not None else "png"
+    webp_quality = args.webp_quality if args.webp_quality is not None else 80
+    cell_opts = dict(
+        mode=args.mode if args.mode is not None else "ascii",
+        edges=args.edges,
+        edge_threshold=(
+            args.edge_threshold if args.edge_threshold is not None else EDGE_THRESHOLD
+        ),
+    )
+    tone = dict(
+        invert=args.invert,
+        contrast=args.contrast if args.contrast is not None else 1.0,
+        gamma=args.gamma if args.gamma is not None else 1.0,
+        levels=args.levels,
+        auto_levels=args.auto_levels,
+    )
 
     cell_width = _validate_cell_size(
         args.cell_width if args.cell_width is not None else ONE_CHAR_WIDTH
@@ -156,8 +315,14 @@ def main():
     )
 
     if args.video and args.webcam:
-        print("Choose either --video or --webcam, not both")
+        print("Choose either --video or --webcam, not both", file=sys.stderr)
+        return
+
+    if args.output is not None and (args.video or args.webcam or args.batch):
+        print("--output only applies to a single --input image", file=sys.stderr)
         return
+    # Binary streams for '-', so pipelines never touch the filesystem.
+    output_file = sys.stdout.buffer if args.output == "-" else args.output
 
     if args.video or args.webcam:
         source = None if args.webcam else args.video
@@ -176,6 +341,18 @@ def main():
             dither=dither_mode,
             cell_width=cell_width,
             cell_height=cell_height,
+            html_mode=html_mode,
+            ansi_tolerance=ansi_tolerance,
+            ansi_palette=ansi_palette,
+            image_codec=image_codec,
+            png_compress_level=png_compress,
+            png_optimize=args.png_optimize,
+            webp_quality=webp_quality,
+            colors=args.colors,
+            fg_color=args.fg_color,
+            mapping=mapping,
+            **cell_opts,
+            **tone,
         )
     elif args.batch:
         batch_dir = Path(args.batch)
@@ -196,32 +373,71 @@ def main():
                 grayscale_mode=grayscale_mode,
                 dither=dither_mode,
                 html_mode=html_mode,
+                ansi_tolerance=ansi_tolerance,
+                ansi_palette=ansi_palette,
                 cell_width=cell_width,
                 cell_height=cell_height,
+                png_stream=args.png_stream,
+                png_compress_level=png_compress,
+                png_filter=png_filter,
+                tile_size=tile_size,
+                image_codec=image_codec,
+                png_optimize=args.png_optimize,
+                webp_quality=webp_quality,
+                colors=args.colors,
+                fg_color=args.fg_color,
+                mapping=mapping,
+                **cell_opts,
+                **tiling,
+                **tone,
             )
             progress.update(1)
         progress.close()
     else:
         image_name = args.input
-        if image_name is None:
+        if image_name == "-":
+            image_name = sys.stdin.buffer
+        elif image_name is None:
             image_name = list_files_from_assets()
-        convert_image(
-            image_name,
-            factor,
-            bg_brightness,
-            output_dir,
-            output_format,
-            assemble=args.assemble,
-            gif_fps=args.gif_fps,
-            gif_loop=0 if args.gif_loop is None else args.gif_loop,
-            mono=args.mono,
-            font_path=args.font,
-            grayscale_mode=grayscale_mode,
-            dither=dither_mode,
-            html_mode=html_mode,
-            cell_width=cell_width,
-            cell_height=cell_height,
-        )
+        try:
+            convert_image(
+                image_name,
+                factor,
+                bg_brightness,
+                output_dir,
+                output_format,
+                assemble=args.assemble,
+                gif_fps=args.gif_fps,
+                gif_loop=0 if args.gif_loop is None else args.gif_loop,
+                mono=args.mono,
+                font_path=args.font,
+                grayscale_mode=grayscale_mode,
+                dither=dither_mode,
+                html_mode=html_mode,
+                ansi_tolerance=ansi_tolerance,
+                ansi_palette=ansi_palette,
+                cell_width=cell_width,
+                cell_height=cell_height,
+                png_stream=args.png_stream,
+                png_compress_level=png_compress,
+                png_filter=png_filter,
+                tile_size=tile_size,
+                image_codec=image_codec,
+                png_optimize=args.png_optimize,
+                webp_quality=webp_quality,
+                colors=args.colors,
+                fg_color=args.fg_color,
+                mapping=mapping,
+                base_name="stdin" if args.input == "-" else None,
+                output_file=output_file,
+                **cell_opts,
+                **tiling,
+                **tone,
+            )
+        except BrokenPipeError:
+            # The reading end of a pipeline (e.g. ``head``) closed early.
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
 
 
 if __name__ == "__main__":
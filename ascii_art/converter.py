@@ -1,22 +1,44 @@
+import contextlib
 import html
+import io
 import os
 import sys
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Sequence
 
-from PIL import Image, ImageDraw, ImageFont, ImageSequence
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageSequence
 
 from .charset import generate_char_array
+from .dzi import write_dzi
+from .htmlcanvas import canvas_page
+from .pixelbuffer import PixelBuffer
+from .pngstream import PNG_FILTERS, StreamingPNGWriter
+from .ansipalette import ANSI_PALETTES, LUT_BITS, bg_escapes, fg_escapes, palette_lut
+from .braille import BRAILLE_CHARS, DOTS, braille_indices, braille_mask
+from .edges import EDGE_CHARS, EDGE_THRESHOLD, edge_bins, overlay_edges
+from .shape import SUBCELLS, cell_indices, shape_lut
 
 
 # Pillow changed resampling constants to an enum; use getattr for compatibility.
 _RESAMPLE_NEAREST = getattr(getattr(Image, "Resampling", Image), "NEAREST")
+_TRANSPOSE = getattr(getattr(Image, "Transpose", Image), "TRANSPOSE")
+_DITHER_NONE = getattr(getattr(Image, "Dither", Image), "NONE")
 
 try:
     from tqdm import tqdm
 except ModuleNotFoundError:  # pragma: no cover - fallback when tqdm is missing
     tqdm = None
 
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - numpy is optional
+    np = None
+
 # Default character array – can be replaced by a dynamically generated one
 char_array = [
     " ",
@@ -278,26 +300,42 @@ char_array = [
 ]
 
 
+DEFAULT_CHARS: tuple[str, ...] = tuple(char_array)
+
+
 def _recompute_interval():
-    global CHAR_LENGTH, INTERVAL, CHAR_LUT
-    CHAR_LENGTH = len(char_array)
+    """Rebuild the lookup tables after ``char_array`` was replaced.
+
+    Updates the default :class:`Converter` and mirrors its tables into the
+    module globals kept for backwards compatibility.
+    """
+    global CHAR_LENGTH, INTERVAL, CHAR_LUT, CHAR_TABLE
+    _DEFAULT_CONVERTER.set_chars(char_array)
+    charset = _DEFAULT_CONVERTER.charset
+    CHAR_LENGTH = charset.length
     INTERVAL = CHAR_LENGTH / 256
     # Map grayscale values [0..255] directly to a character.
-    # Using integer math avoids per-pixel floating point work.
-    CHAR_LUT = tuple(char_array[(i * CHAR_LENGTH) // 256] for i in range(256))
+    CHAR_LUT = charset.lut
+    CHAR_TABLE = charset.table
 
 
-_recompute_interval()
-
 ONE_CHAR_WIDTH = 10
 ONE_CHAR_HEIGHT = 18
 
 # Cache glyph masks for faster `format=image` rendering.
 # Keyed by (font_key, cell_width, cell_height, char_set).
 _GLYPH_MASK_CACHE: dict[
-    tuple[str, int, int, tuple[str, ...]], dict[str, Image.Image]
+    tuple[str, int, int, tuple[str, ...], bool], dict[str, Image.Image]
 ] = {}
 
+# Hard threshold for glyph coverage. Pasting through an anti-aliased mask
+# blends the fill with what is underneath, which is meaningless for palette
+# indices, so palette canvases use on/off masks.
+_BINARY_MASK_TABLE = [0] * 128 + [255] * 128
+_GLYPH_MASK_LOCK = threading.RLock()
+# Braille patterns are drawn as dots; few fonts carry the glyphs.
+_BRAILLE_SET = frozenset(BRAILLE_CHARS)
+
 
 def _glyph_masks(
     *,
@@ -305,23 +343,1498 @@ def _glyph_masks(
     cell_width: int,
     cell_height: int,
     font_key: str,
-    chars: list[str],
+    chars: Sequence[str],
+    binary: bool = False,
 ) -> dict[str, Image.Image]:
-    key = (font_key, int(cell_width), int(cell_height), tuple(chars))
+    key = (font_key, int(cell_width), int(cell_height), tuple(chars), bool(binary))
     cached = _GLYPH_MASK_CACHE.get(key)
     if cached is not None:
         return cached
 
-    masks: dict[str, Image.Image] = {}
-    # Preserve order while removing duplicates.
-    unique_chars = list(dict.fromkeys(chars))
-    for ch in unique_chars:
-        im = Image.new("L", (int(cell_width), int(cell_height)), color=0)
-        d = ImageDraw.Draw(im)
-        d.text((0, 0), ch, font=font, fill=255)
-        masks[ch] = im
-    _GLYPH_MASK_CACHE[key] = masks
-    return masks
+    # FreeType faces are not safe to render from several threads at once.
+    with _GLYPH_MASK_LOCK:
+        cached = _GLYPH_MASK_CACHE.get(key)
+        if cached is not None:
+            return cached
+        if binary:
+            smooth = _glyph_masks(
+                font=font,
+                cell_width=cell_width,
+                cell_height=cell_height,
+                font_key=font_key,
+                chars=chars,
+            )
+            masks = {ch: m.point(_BINARY_MASK_TABLE) for ch, m in smooth.items()}
+            _GLYPH_MASK_CACHE[key] = masks
+            return masks
+
+        masks: dict[str, Image.Image] = {}
+        # Preserve order while removing duplicates.
+        unique_chars = list(dict.fromkeys(chars))
+        for ch in unique_chars:
+            if ch in _BRAILLE_SET:
+                masks[ch] = braille_mask(ch, int(cell_width), int(cell_height))
+                continue
+            im = Image.new("L", (int(cell_width), int(cell_height)), color=0)
+            d = ImageDraw.Draw(im)
+            d.text((0, 0), ch, font=font, fill=255)
+            masks[ch] = im
+        _GLYPH_MASK_CACHE[key] = masks
+        return masks
+
+
+def _blank_glyphs(masks: dict[str, Image.Image]) -> frozenset[str]:
+    """Return the characters whose glyph mask has no ink at all."""
+    return frozenset(ch for ch, mask in masks.items() if mask.getbbox() is None)
+
+
+def _blank_cells(chars: Sequence[str]) -> frozenset[str]:
+    """Return the cells that render as nothing (whitespace, empty braille)."""
+    return frozenset(ch for ch in chars if not ch.strip().strip(BRAILLE_CHARS[0]))
+
+
+def _visible_cells(
+    cells: list[str], colors: Any, blank: frozenset[str], bg_rgb: bytes
+) -> int:
+    """Return the row length once trailing invisible cells are dropped.
+
+    A cell is invisible when its character is blank or its colour (3 bytes
+    per cell in ``colors``) equals the background colour ``bg_rgb``.
+    """
+    end = len(cells)
+    while end:
+        off = 3 * (end - 1)
+        if cells[end - 1] not in blank and bytes(colors[off : off + 3]) != bg_rgb:
+            break
+        end -= 1
+    return end
+
+
+def _blend_cells(dest: Any, masks: Any, colors: Any, bg: int) -> None:
+    """Draw one row of cells into ``dest`` exactly like ``Image.paste`` does.
+
+    Args:
+        dest: ``(cell_height, n * cell_width, 3)`` uint8 view to overwrite.
+        masks: ``(n, cell_height, cell_width)`` uint8 glyph coverage.
+        colors: ``(n, 3)`` uint8 cell colours.
+        bg: Background gray level.
+    """
+    n, cell_height, cell_width = masks.shape
+    # Pillow computes ``bg * (255 - m) + c * m`` and divides by 255 with
+    # rounding as ``(t + 128 + ((t + 128) >> 8)) >> 8``.
+    m = masks.transpose(1, 0, 2)[..., None].astype(np.int32)
+    t = (colors.astype(np.int32) - bg)[None, :, None, :] * m
+    t += bg * 255 + 128
+    t += t >> 8
+    t >>= 8
+    dest.reshape(cell_height, n, cell_width, 3)[...] = t
+
+
+def _tint_luts(
+    bg_brightness: int, fg_rgb: tuple[int, int, int], mode: str
+) -> list[list[int]]:
+    """Return per-band tables mapping glyph coverage (0-255) to output colour.
+
+    The tables are sampled from Pillow pasting ``fg_rgb`` over the background
+    through a 0..255 ramp, so tinting a coverage canvas with :func:`_tint`
+    gives exactly what pasting every glyph in that colour would.
+    """
+    ramp = Image.new("L", (256, 1))
+    ramp.putdata(range(256))
+    fg: Any = fg_rgb[0] if mode == "L" else fg_rgb
+    bg: Any = bg_brightness if mode == "L" else (bg_brightness,) * 3
+    sample = Image.new(mode, (256, 1), color=bg)
+    sample.paste(fg, (0, 0), ramp)
+    return [list(band.tobytes()) for band in sample.split()]
+
+
+def _tint(coverage: Image.Image, luts: list[list[int]]) -> Image.Image:
+    bands = [coverage.point(lut) for lut in luts]
+    return bands[0] if len(bands) == 1 else Image.merge("RGB", bands)
+
+
+def _load_font(
+    user_font: str | None, cell_height: int
+) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    windows_font = r"C:\\Windows\\Fonts\\lucon.ttf"
+    linux_font = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+    if user_font:
+        try:
+            return ImageFont.truetype(user_font, cell_height)
+        except OSError:
+            print(
+                f"Could not load font '{user_font}', falling back to defaults",
+                file=sys.stderr,
+            )
+    if os.path.exists(windows_font):
+        return ImageFont.truetype(windows_font, cell_height)
+    if os.path.exists(linux_font):
+        return ImageFont.truetype(linux_font, cell_height)
+    return ImageFont.load_default()
+
+
+# `Image.convert("L", matrix)` coefficients reproducing the integer gray
+# formulas: `avg` is (r + g + b) // 3, `luma601`/`luma709` are
+# (wr * r + wg * g + wb * b) >> 8. Pillow rounds matrix conversions to the
+# nearest integer, so the offsets turn that rounding into the floor the
+# integer formulas use (verified over all 2**24 colours).
+_GRAY_MATRICES: dict[str, tuple[float, float, float, float]] = {
+    "avg": (1 / 3, 1 / 3, 1 / 3, -1 / 3),
+    "luma601": (77 / 256, 150 / 256, 29 / 256, -0.5),
+    "luma709": (54 / 256, 183 / 256, 19 / 256, -0.5),
+}
+
+
+def _gray_plane(frame_rgb: Image.Image, grayscale_mode: str) -> Image.Image:
+    """Return the brightness plane (mode ``L``) used for character selection."""
+    return frame_rgb.convert("L", _GRAY_MATRICES[grayscale_mode])
+
+
+def _tone_table(
+    *,
+    invert: bool = False,
+    contrast: float = 1.0,
+    gamma: float = 1.0,
+    levels: tuple[int, int] | None = None,
+) -> list[int] | None:
+    """Fuse the tone controls into one 256-entry gray remapping table.
+
+    Applied in order: levels stretch (``black`` -> 0, ``white`` -> 255),
+    contrast around mid-gray, gamma (values above 1 brighten midtones) and
+    inversion. Returns ``None`` when the result is the identity, so the
+    default settings cost nothing.
+    """
+    if levels is None:
+        black, white = 0, 255
+    else:
+        black, white = int(levels[0]), int(levels[1])
+    table = []
+    for v in range(256):
+        f = (v - black) / (white - black) if white > black else float(v >= white)
+        f = min(1.0, max(0.0, f))
+        f = min(1.0, max(0.0, (f - 0.5) * contrast + 0.5))
+        if gamma != 1.0:
+            f = f ** (1.0 / gamma)
+        if invert:
+            f = 1.0 - f
+        table.append(int(f * 255.0 + 0.5))
+    if table == list(range(256)):
+        return None
+    return table
+
+
+def _auto_levels(histogram: list[int], clip: float = 0.005) -> tuple[int, int]:
+    """Return the ``(black, white)`` levels for a histogram-based stretch.
+
+    The darkest and brightest ``clip`` fraction of pixels are allowed to
+    saturate so that a few outliers do not pin the range.
+    """
+    total = sum(histogram[:256])
+    limit = total * clip
+    black, acc = 0, 0
+    for black in range(256):
+        acc += histogram[black]
+        if acc > limit:
+            break
+    white, acc = 255, 0
+    for white in range(255, -1, -1):
+        acc += histogram[white]
+        if acc > limit:
+            break
+    if white <= black:
+        return 0, 255
+    return black, white
+
+
+def _text_rows(gray: Image.Image, table: dict[int, str]) -> Iterator[str]:
+    """Yield the undithered text row for every row of a gray plane.
+
+    Each row of gray bytes is decoded as latin-1 (one code point per byte)
+    and mapped through ``table`` (:attr:`Charset.table`) by ``str.translate``,
+    so no Python code runs per pixel.
+    """
+    width, height = gray.size
+    data = gray.tobytes()
+    for y in range(height):
+        yield data[y * width : (y + 1) * width].decode("latin-1").translate(table)
+
+
+def _index_text_rows(
+    index: memoryview, width: int, table: Sequence[str]
+) -> Iterator[str]:
+    """Yield the text rows of a flat ``uint8``/``uint16`` cell index plane.
+
+    Like :func:`_text_rows`: wide indices are decoded as UTF-16 in native
+    byte order, which maps every index below 0xD800 to the same code point,
+    and translated through `table` in C.
+    """
+    codec = "latin-1" if index.itemsize == 1 else f"utf-16-{sys.byteorder[0]}e"
+    trans = dict(enumerate(table))
+    data = index.cast("B")
+    step = width * index.itemsize
+    for start in range(0, len(data), step):
+        yield str(data[start : start + step], codec).translate(trans)
+
+
+def _ansi_row(
+    cells: Sequence[str], colors: Any, n: int, blank: frozenset[str], tolerance: int
+) -> str:
+    """Return the first `n` cells as ANSI text with one escape per colour run.
+
+    A cell continues the current run, and gets no escape, when every channel
+    is within `tolerance` of the colour that started it (``0``: identical).
+    Blank cells show no colour and always continue the run.
+    """
+    escape = "\x1b[38;2;{};{};{}m".format
+    parts: list[str] = []
+    append = parts.append
+    r0 = g0 = b0 = -256
+    stop = 3 * n
+    for ch, r, g, b in zip(
+        cells[:n], colors[0:stop:3], colors[1:stop:3], colors[2:stop:3]
+    ):
+        if ch not in blank and (
+            r > r0 + tolerance
+            or r < r0 - tolerance
+            or g > g0 + tolerance
+            or g < g0 - tolerance
+            or b > b0 + tolerance
+            or b < b0 - tolerance
+        ):
+            append(escape(r, g, b))
+            r0, g0, b0 = r, g, b
+        append(ch)
+    return "".join(parts)
+
+
+def _ansi_index_row(
+    cells: Sequence[str],
+    colors: Any,
+    n: int,
+    blank: frozenset[str],
+    lut: bytes,
+    escapes: Sequence[str],
+) -> str:
+    """Return the first `n` cells as ANSI text in an indexed palette.
+
+    Every cell colour is mapped to its palette index with one `lut` lookup
+    (see :func:`ascii_art.ansipalette.palette_lut`); an escape from
+    `escapes` is written only when the index changes.
+    """
+    shift = 8 - LUT_BITS
+    parts: list[str] = []
+    append = parts.append
+    current = -1
+    stop = 3 * n
+    for ch, r, g, b in zip(
+        cells[:n], colors[0:stop:3], colors[1:stop:3], colors[2:stop:3]
+    ):
+        if ch not in blank:
+            index = lut[
+                (r >> shift) << (2 * LUT_BITS) | (g >> shift) << LUT_BITS | b >> shift
+            ]
+            if index != current:
+                append(escapes[index])
+                current = index
+        append(ch)
+    return "".join(parts)
+
+
+def _ansi_half_index_row(
+    upper: Any, lower: Any, n: int, lut: bytes, palette: str
+) -> str:
+    """Return `n` half blocks as ANSI text in an indexed palette."""
+    shift = 8 - LUT_BITS
+    fg_codes = fg_escapes(palette)
+    bg_codes = bg_escapes(palette)
+    parts: list[str] = []
+    append = parts.append
+    fg = bg = -1
+    stop = 3 * n
+    for r, g, b, r2, g2, b2 in zip(
+        upper[0:stop:3],
+        upper[1:stop:3],
+        upper[2:stop:3],
+        lower[0:stop:3],
+        lower[1:stop:3],
+        lower[2:stop:3],
+    ):
+        index = lut[
+            (r >> shift) << (2 * LUT_BITS) | (g >> shift) << LUT_BITS | b >> shift
+        ]
+        if index != fg:
+            append(fg_codes[index])
+            fg = index
+        index = lut[
+            (r2 >> shift) << (2 * LUT_BITS) | (g2 >> shift) << LUT_BITS | b2 >> shift
+        ]
+        if index != bg:
+            append(bg_codes[index])
+            bg = index
+        append(HALF_BLOCK)
+    return "".join(parts)
+
+
+def _ansi_half_row(upper: Any, lower: Any, n: int, tolerance: int) -> str:
+    """Return `n` half blocks as ANSI text, like :func:`_ansi_row`.
+
+    The upper colours are foreground and the lower ones background runs;
+    each escape is emitted only when its own colour leaves its run.
+    """
+    fg_escape = "\x1b[38;2;{};{};{}m".format
+    bg_escape = "\x1b[48;2;{};{};{}m".format
+    parts: list[str] = []
+    append = parts.append
+    fr = fg = fb = br = bg = bb = -256
+    stop = 3 * n
+    for r, g, b, r2, g2, b2 in zip(
+        upper[0:stop:3],
+        upper[1:stop:3],
+        upper[2:stop:3],
+        lower[0:stop:3],
+        lower[1:stop:3],
+        lower[2:stop:3],
+    ):
+        if (
+            r > fr + tolerance
+            or r < fr - tolerance
+            or g > fg + tolerance
+            or g < fg - tolerance
+            or b > fb + tolerance
+            or b < fb - tolerance
+        ):
+            append(fg_escape(r, g, b))
+            fr, fg, fb = r, g, b
+        if (
+            r2 > br + tolerance
+            or r2 < br - tolerance
+            or g2 > bg + tolerance
+            or g2 < bg - tolerance
+            or b2 > bb + tolerance
+            or b2 < bb - tolerance
+        ):
+            append(bg_escape(r2, g2, b2))
+            br, bg, bb = r2, g2, b2
+        append(HALF_BLOCK)
+    return "".join(parts)
+
+
+# Mono compact HTML: gray levels bucketed to 16 steps, and their class index.
+_GRAY_BUCKETS = bytes(v & 0xF0 for v in range(256))
+_GRAY_CLASSES = bytes(v >> 4 for v in range(256))
+
+
+def _html_escape_table(chars: Sequence[str]) -> dict[int, str]:
+    """Return a ``str.translate`` table escaping the HTML specials in `chars`."""
+    return {
+        ord(c): html.escape(c) for c in set("".join(chars)) if html.escape(c) != c
+    }
+
+
+def _run_starts(n: int, *planes: Sequence[int]) -> list[int]:
+    """Return the offsets in ``range(n)`` where a run of equal cells starts.
+
+    A new run starts wherever any of `planes` changes value; with NumPy that
+    is one vectorized diff per plane.
+    """
+    if not n:
+        return []
+    if np is None:
+        keys = list(zip(*(plane[:n] for plane in planes)))
+        return [0] + [x for x in range(1, n) if keys[x] != keys[x - 1]]
+    change = np.zeros(n - 1, dtype=bool)
+    for plane in planes:
+        values = np.asarray(plane[:n])
+        change |= values[1:] != values[:-1]
+    return [0, *(np.flatnonzero(change) + 1).tolist()]
+
+
+def _little_endian(index: memoryview) -> bytes:
+    """Return the bytes of a ``uint8``/``uint16`` index plane, little-endian."""
+    if index.itemsize == 1 or sys.byteorder == "little":
+        return index.tobytes()
+    wide = array("H", index.tobytes())
+    wide.byteswap()
+    return wide.tobytes()
+
+
+def _half_block_rows(
+    half_rgb: Image.Image,
+) -> Iterator[tuple[memoryview, memoryview]]:
+    """Yield the ``(upper, lower)`` colour bytes of every row of half blocks.
+
+    `half_rgb` is sampled at two pixels per cell vertically; each pair of
+    pixel rows becomes one row of cells, 3 bytes per cell in each half.
+    """
+    data = memoryview(half_rgb.tobytes())
+    stride = 3 * half_rgb.width
+    for start in range(0, len(data), 2 * stride):
+        yield data[start : start + stride], data[start + stride : start + 2 * stride]
+
+
+def _diffuse_floyd_steinberg(
+    grays: list[int],
+    err_curr: list[float],
+    err_next: list[float],
+    err_next2: list[float],
+    levels_m1: int,
+) -> None:
+    """Quantize one row of gray levels in place to ``levels_m1 + 1`` steps.
+
+    The error rows are offset by two cells; the quantization error of every
+    cell is spread over its right and lower neighbours (7, 3, 5, 1 / 16).
+    """
+    for x in range(len(grays)):
+        idx0 = x + 2
+        v = float(grays[x]) + err_curr[idx0]
+        if v < 0.0:
+            v = 0.0
+        elif v > 255.0:
+            v = 255.0
+        qidx = int(v * levels_m1 / 255.0 + 0.5)
+        if qidx > levels_m1:
+            qidx = levels_m1
+        qh = int(qidx * 255.0 / levels_m1 + 0.5)
+        grays[x] = qh
+        err = v - float(qh)
+        err_curr[idx0 + 1] += err * (7.0 / 16.0)
+        err_next[idx0 - 1] += err * (3.0 / 16.0)
+        err_next[idx0 + 0] += err * (5.0 / 16.0)
+        err_next[idx0 + 1] += err * (1.0 / 16.0)
+
+
+def _diffuse_atkinson(
+    grays: list[int],
+    err_curr: list[float],
+    err_next: list[float],
+    err_next2: list[float],
+    levels_m1: int,
+) -> None:
+    """Like :func:`_diffuse_floyd_steinberg` with Atkinson's kernel.
+
+    Six neighbours over three rows get 1/8 of the error each; the remaining
+    quarter is dropped, which keeps highlights and shadows crisp.
+    """
+    for x in range(len(grays)):
+        idx0 = x + 2
+        v = float(grays[x]) + err_curr[idx0]
+        if v < 0.0:
+            v = 0.0
+        elif v > 255.0:
+            v = 255.0
+        qidx = int(v * levels_m1 / 255.0 + 0.5)
+        if qidx > levels_m1:
+            qidx = levels_m1
+        qh = int(qidx * 255.0 / levels_m1 + 0.5)
+        grays[x] = qh
+        err = (v - float(qh)) / 8.0
+        err_curr[idx0 + 1] += err
+        err_curr[idx0 + 2] += err
+        err_next[idx0 - 1] += err
+        err_next[idx0 + 0] += err
+        err_next[idx0 + 1] += err
+        err_next2[idx0 + 0] += err
+
+
+# Error diffusion kernel of every dither mode other than `none`.
+_DIFFUSERS = {
+    "floyd-steinberg": _diffuse_floyd_steinberg,
+    "atkinson": _diffuse_atkinson,
+}
+
+
+def _cell_rows(
+    frame_rgb: Image.Image,
+    gray_im: Image.Image,
+    *,
+    dither: str,
+    mono: bool,
+    charset: "Charset",
+    session: "FrameSession | None" = None,
+    reuse_cells: bool = False,
+    cell_index: tuple[Sequence[str], Any] | None = None,
+) -> Iterator[tuple[list[str], bytes]]:
+    """Yield ``(cells, colors)`` for every row of the character grid.
+
+    ``cells`` holds one ``char_array`` entry per cell (entries may be longer
+    than one character). ``colors`` packs one RGB triplet per cell: the source
+    pixel colour, or the (dithered) gray level when ``mono`` is set.
+
+    ``gray_im`` is the (tone-mapped) brightness plane from
+    :func:`_gray_plane`; without dithering the cells are a C-level ``map``
+    over ``charset.lut`` as well.
+
+    Dither error rows come from ``session`` when given. With `reuse_cells`
+    every row is yielded in the same (pooled) ``cells`` list, so callers that
+    keep rows must leave it off.
+
+    `cell_index` replaces the brightness lookup (and dithering) with a
+    ``(table, index)`` pair chosen elsewhere, e.g. by shape matching: cell
+    ``i`` shows ``table[index[i]]``.
+    """
+    width, height = frame_rgb.size
+    gray = memoryview(gray_im.tobytes())
+    lut = charset.lut
+    table, index = (lut, gray) if cell_index is None else cell_index
+    stride = width * 3
+    cells: list[str] | None = None
+    if reuse_cells:
+        cells = _pooled(session, "cells", width, lambda: [""] * width)
+    if dither == "none" or cell_index is not None:
+        color_bytes = (
+            Image.merge("RGB", (gray_im, gray_im, gray_im)) if mono else frame_rgb
+        ).tobytes()
+        for y in range(height):
+            row = map(table.__getitem__, index[y * width : (y + 1) * width])
+            if cells is None:
+                yield list(row), color_bytes[y * stride : (y + 1) * stride]
+            else:
+                cells[:] = row
+                yield cells, color_bytes[y * stride : (y + 1) * stride]
+        return
+
+    rgb_bytes = frame_rgb.tobytes()
+    levels_m1 = max(1, charset.length - 1)
+    pad = 4
+    # Three rotating error rows plus a zero row used to clear the one that
+    # moves to the bottom; rows are cleared in place, never reallocated.
+    zeros, err_curr, err_next, err_next2 = _pooled(
+        session,
+        "dither",
+        width,
+        lambda: [[0.0] * (width + pad) for _ in range(4)],
+    )
+    err_curr[:] = zeros
+    err_next[:] = zeros
+    err_next2[:] = zeros
+    grays = _pooled(session, "grays", width, lambda: [0] * width)
+    diffuse = _DIFFUSERS[dither]
+    mono_row = bytearray(stride) if mono else None
+    for y in range(height):
+        grays[:] = gray[y * width : (y + 1) * width]
+        err_curr, err_next, err_next2 = err_next, err_next2, err_curr
+        err_next2[:] = zeros
+        diffuse(grays, err_curr, err_next, err_next2, levels_m1)
+        if mono_row is not None:
+            # The quantized level is repeated into all three channels.
+            row_levels = bytes(grays)
+            mono_row[0::3] = mono_row[1::3] = mono_row[2::3] = row_levels
+            colors = bytes(mono_row)
+        else:
+            colors = rgb_bytes[y * stride : (y + 1) * stride]
+        if cells is None:
+            yield [lut[h] for h in grays], colors
+        else:
+            cells[:] = map(lut.__getitem__, grays)
+            yield cells, colors
+
+
+# Raster encoders available for `format=image`: codec -> (extension, Pillow format).
+IMAGE_CODECS: dict[str, tuple[str, str]] = {
+    "png": (".png", "PNG"),
+    "webp": (".webp", "WEBP"),
+    "webp-lossless": (".webp", "WEBP"),
+    "qoi": (".qoi", "QOI"),
+    "bmp": (".bmp", "BMP"),
+    "ppm": (".ppm", "PPM"),
+}
+
+
+def _edge_cell_rows(
+    rows: Iterator[tuple[list[str], bytes]], edge_plane: Any
+) -> Iterator[tuple[list[str], bytes]]:
+    """Replace the cells of `rows` that lie on an edge with edge glyphs.
+
+    `edge_plane` is the :func:`~ascii_art.edges.edge_bins` array of the grid;
+    only its edge cells are visited.
+    """
+    for (cells, colors), bins in zip(rows, edge_plane):
+        for x in np.flatnonzero(bins >= 0).tolist():
+            cells[x] = EDGE_CHARS[bins[x]]
+        yield cells, colors
+
+
+def _mapped_cell_index(
+    sample: Callable[[tuple[int, int]], Image.Image],
+    size: tuple[int, int],
+    opts: "_RenderOptions",
+    *,
+    tone: list[int] | None,
+    charset: "Charset",
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
+    font_key: str,
+) -> tuple[Sequence[str], Any] | None:
+    """Return the ``(table, index)`` cells of shape mapping or braille mode.
+
+    `sample` resizes the source frame to a given size. ``None`` means the
+    cells follow the brightness plane (see :func:`_cell_rows`).
+    """
+    width, height = size
+    cell_index: tuple[Sequence[str], Any] | None = None
+    if opts.mapping == "shape":
+        # Every cell is sampled as a 2x3 sub-cell block and matched against
+        # the glyph shapes through the font's lookup table.
+        sub_cols, sub_rows = SUBCELLS
+        sub_gray = _gray_plane(
+            sample((sub_cols * width, sub_rows * height)).convert("RGB"),
+            opts.grayscale_mode,
+        )
+        if tone is not None:
+            sub_gray = sub_gray.point(tone)
+        shape_masks = _glyph_masks(
+            font=font,
+            cell_width=opts.cell_width,
+            cell_height=opts.cell_height,
+            font_key=font_key,
+            chars=charset.chars,
+        )
+        lut = shape_lut(
+            (font_key, opts.cell_width, opts.cell_height, charset.chars),
+            [shape_masks[ch] for ch in charset.chars],
+        )
+        cell_index = (charset.chars, memoryview(cell_indices(sub_gray, lut)))
+    if opts.mode == "braille":
+        # Eight on/off sub-pixels per cell, packed into the dot bits.
+        dot_cols, dot_rows = DOTS
+        dot_gray = _gray_plane(
+            sample((dot_cols * width, dot_rows * height)).convert("RGB"),
+            opts.grayscale_mode,
+        )
+        if tone is not None:
+            dot_gray = dot_gray.point(tone)
+        cell_index = (
+            BRAILLE_CHARS,
+            memoryview(braille_indices(dot_gray, dither=opts.dither != "none")),
+        )
+    return cell_index
+
+
+@dataclass
+class _HtmlClasses:
+    """Palette classes of the cells of a compact or canvas HTML render.
+
+    With `class_bytes` every sample was mapped onto `palette` in C and
+    `color_bytes` holds the mapped colours; otherwise `class_index` maps
+    every exact colour of the frame to its class.
+    """
+
+    palette: list[tuple[int, int, int]]
+    width: int
+    fg: bool = False
+    mono: bool = False
+    class_bytes: Any = None
+    color_bytes: Any = None
+    class_index: dict[tuple[int, int, int], int] | None = None
+
+    def css(self, half: bool) -> str:
+        """Return the ``<style>`` block of compact HTML."""
+        return "\n".join(
+            [
+                "<style>",
+                "pre.ascii{font-family:monospace;line-height:1;}",
+                *(
+                    f".c{i}{{color:rgb({r},{g},{b})}}"
+                    for i, (r, g, b) in enumerate(self.palette)
+                ),
+                # Half blocks take their lower colour from the same palette.
+                *(
+                    f".b{i}{{background:rgb({r},{g},{b})}}"
+                    for i, (r, g, b) in enumerate(self.palette if half else ())
+                ),
+                "</style>",
+            ]
+        )
+
+    def row(self, y: int, row_colors: Any) -> tuple[Any, Sequence[int]]:
+        """Return the colour bytes (as drawn) and classes of one row's cells."""
+        width = self.width
+        if self.fg:
+            return row_colors, memoryview(bytes(width))
+        if self.mono:
+            crow = bytes(row_colors).translate(_GRAY_BUCKETS)
+            return crow, memoryview(crow[0::3].translate(_GRAY_CLASSES))
+        if self.class_index is None:
+            stride = 3 * width
+            return (
+                self.color_bytes[y * stride : (y + 1) * stride],
+                self.class_bytes[y * width : (y + 1) * width],
+            )
+        return row_colors, self._lookup(row_colors)
+
+    def half_row(
+        self, y: int, upper: Any, lower: Any
+    ) -> tuple[Sequence[int], Sequence[int]]:
+        """Return the upper and lower classes of one row of half blocks."""
+        width = self.width
+        if self.mono:
+            return (
+                memoryview(bytes(upper[0::3]).translate(_GRAY_CLASSES)),
+                memoryview(bytes(lower[0::3]).translate(_GRAY_CLASSES)),
+            )
+        if self.class_index is None:
+            return (
+                self.class_bytes[2 * y * width : (2 * y + 1) * width],
+                self.class_bytes[(2 * y + 1) * width : (2 * y + 2) * width],
+            )
+        return self._lookup(upper), self._lookup(lower)
+
+    def _lookup(self, colors: Any) -> list[int]:
+        assert self.class_index is not None
+        return list(
+            map(
+                self.class_index.__getitem__,
+                zip(colors[0::3], colors[1::3], colors[2::3]),
+            )
+        )
+
+
+def _html_classes(
+    frame_rgb: Image.Image,
+    half_rgb: Image.Image | None,
+    *,
+    fg_rgb: tuple[int, int, int] | None,
+    mono: bool,
+    session: "FrameSession | None",
+) -> _HtmlClasses:
+    """Return the class palette of a compact or canvas HTML render.
+
+    The palette is fixed before the first row so that the ``<style>`` block
+    can be written ahead of the streamed rows.
+    """
+    width = frame_rgb.width
+    if fg_rgb is not None:
+        return _HtmlClasses([fg_rgb], width, fg=True)
+    if mono:
+        # Mono gray levels are bucketed to keep the class list short.
+        return _HtmlClasses([(v, v, v) for v in range(0, 256, 16)], width, mono=True)
+    palette_src = frame_rgb if half_rgb is None else half_rgb
+    first: list[Image.Image] = []
+
+    def _first_palette() -> tuple[list[tuple[int, int, int]], Image.Image]:
+        quant = palette_src.quantize(colors=64)
+        first.append(quant)
+        pal = quant.getpalette() or []
+        pal = pal[: 3 * (quant.getextrema()[1] + 1)]
+        pal_im = Image.new("P", (1, 1))
+        pal_im.putpalette(pal)
+        return list(zip(*[iter(pal)] * 3)), pal_im
+
+    try:
+        # A stream keeps the palette (and class list) of its first frame;
+        # later frames are only mapped onto it in C.
+        palette, pal_im = _pooled(
+            session, "palette", ("html", half_rgb is None), _first_palette
+        )
+        quant = (
+            first[0]
+            if first
+            else palette_src.quantize(palette=pal_im, dither=_DITHER_NONE)
+        )
+        return _HtmlClasses(
+            palette,
+            width,
+            class_bytes=memoryview(quant.tobytes()),
+            color_bytes=memoryview(quant.convert("RGB").tobytes()),
+        )
+    except Exception:
+        palette = [
+            rgb
+            for _, rgb in palette_src.getcolors(palette_src.width * palette_src.height)
+        ]
+        return _HtmlClasses(
+            palette, width, class_index={rgb: i for i, rgb in enumerate(palette)}
+        )
+
+
+def _half_visible(half_cells: list[str], upper: Any, lower: Any, bg_rgb: bytes) -> int:
+    """Return the length of a half-block row without its invisible tail."""
+    no_blank: frozenset[str] = frozenset()
+    return max(
+        _visible_cells(half_cells, upper, no_blank, bg_rgb),
+        _visible_cells(half_cells, lower, no_blank, bg_rgb),
+    )
+
+
+def _ansi_rows(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    chars: Sequence[str],
+    bg_rgb: bytes,
+    ansi_palette: str,
+    tolerance: int,
+) -> Iterator[str]:
+    """Yield the `ansi` rows of the cell grid (see :func:`_ansi_row`)."""
+    blank = _blank_cells(chars)
+    if ansi_palette != "truecolor":
+        lut = palette_lut(ansi_palette)
+        escapes = fg_escapes(ansi_palette)
+        for cells, row_colors in cell_rows:
+            yield _ansi_index_row(
+                cells,
+                row_colors,
+                _visible_cells(cells, row_colors, blank, bg_rgb),
+                blank,
+                lut,
+                escapes,
+            )
+        return
+    for cells, row_colors in cell_rows:
+        yield _ansi_row(
+            cells,
+            row_colors,
+            _visible_cells(cells, row_colors, blank, bg_rgb),
+            blank,
+            tolerance,
+        )
+
+
+def _ansi_half_rows(
+    half_rgb: Image.Image, bg_rgb: bytes, ansi_palette: str, tolerance: int
+) -> Iterator[str]:
+    """Yield the `ansi` rows of a half-block grid."""
+    half_cells = [HALF_BLOCK] * half_rgb.width
+    lut = None if ansi_palette == "truecolor" else palette_lut(ansi_palette)
+    for upper, lower in _half_block_rows(half_rgb):
+        n = _half_visible(half_cells, upper, lower, bg_rgb)
+        if lut is None:
+            yield _ansi_half_row(upper, lower, n, tolerance)
+        else:
+            yield _ansi_half_index_row(upper, lower, n, lut, ansi_palette)
+
+
+def _html_span_rows(
+    cell_rows: Iterator[tuple[list[str], bytes]], chars: Sequence[str], bg_rgb: bytes
+) -> Iterator[str]:
+    """Yield the `spans` HTML rows: one styled element per visible cell.
+
+    Rows are formatted by C-level `map` over the strided colour channels;
+    only the escaping table is built in Python.
+    """
+    blank = _blank_cells(chars)
+    span = '<span style="color:rgb({},{},{})">{}</span>'.format
+    escaped = {ch: html.escape(ch) for ch in chars}
+    for cells, row_colors in cell_rows:
+        n = 3 * _visible_cells(cells, row_colors, blank, bg_rgb)
+        yield "".join(
+            map(
+                span,
+                row_colors[0:n:3],
+                row_colors[1:n:3],
+                row_colors[2:n:3],
+                map(escaped.__getitem__, cells),
+            )
+        )
+
+
+def _html_half_span_rows(half_rgb: Image.Image, bg_rgb: bytes) -> Iterator[str]:
+    """Yield the `spans` HTML rows of a half-block grid."""
+    half_cells = [HALF_BLOCK] * half_rgb.width
+    span = (
+        '<span style="color:rgb({},{},{});'
+        'background:rgb({},{},{})">' + HALF_BLOCK + "</span>"
+    ).format
+    for upper, lower in _half_block_rows(half_rgb):
+        n = 3 * _half_visible(half_cells, upper, lower, bg_rgb)
+        yield "".join(
+            map(
+                span,
+                upper[0:n:3],
+                upper[1:n:3],
+                upper[2:n:3],
+                lower[0:n:3],
+                lower[1:n:3],
+                lower[2:n:3],
+            )
+        )
+
+
+def _html_compact_rows(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    classes: _HtmlClasses,
+    chars: Sequence[str],
+    bg_rgb: bytes,
+) -> Iterator[str]:
+    """Yield the `compact` HTML rows: one classed element per colour run."""
+    blank = _blank_cells(chars)
+    span = '<span class="c{}">{}</span>'.format
+    escape_table = _html_escape_table(chars)
+    for y, (cells, row_colors) in enumerate(cell_rows):
+        crow, row_classes = classes.row(y, row_colors)
+        n = _visible_cells(cells, crow, blank, bg_rgb)
+        # Run text is sliced, joined and escaped in C calls.
+        starts = _run_starts(n, row_classes)
+        ends = starts[1:] + [n]
+        runs = map(cells.__getitem__, map(slice, starts, ends))
+        yield "".join(
+            map(
+                span,
+                map(row_classes.__getitem__, starts),
+                map(str.translate, map("".join, runs), repeat(escape_table)),
+            )
+        )
+
+
+def _html_half_compact_rows(
+    half_rgb: Image.Image, classes: _HtmlClasses, bg_rgb: bytes
+) -> Iterator[str]:
+    """Yield the `compact` HTML rows of a half-block grid."""
+    half_cells = [HALF_BLOCK] * half_rgb.width
+    span = '<span class="c{} b{}">{}</span>'.format
+    for y, (upper, lower) in enumerate(_half_block_rows(half_rgb)):
+        top, bottom = classes.half_row(y, upper, lower)
+        n = _half_visible(half_cells, upper, lower, bg_rgb)
+        starts = _run_starts(n, top, bottom)
+        yield "".join(
+            map(
+                span,
+                map(top.__getitem__, starts),
+                map(bottom.__getitem__, starts),
+                map(HALF_BLOCK.__mul__, map(int.__sub__, starts[1:] + [n], starts)),
+            )
+        )
+
+
+def _html_canvas_page(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    classes: _HtmlClasses,
+    *,
+    gray_im: Image.Image,
+    lut: Sequence[str],
+    cell_index: tuple[Sequence[str], Any] | None,
+    chars: Sequence[str],
+    dither: str,
+    bg_brightness: int,
+    rows_done: Callable[[int, int], None],
+) -> str:
+    """Return the `canvas` HTML page (see :mod:`ascii_art.htmlcanvas`).
+
+    The page is built from two flat planes, the character index and the
+    palette class of every cell. Undithered grids already have both in
+    bulk; dithered rows only exist one at a time and are collected.
+    """
+    width, height = gray_im.size
+    if (dither == "none" or cell_index is not None) and classes.class_index is None:
+        if cell_index is None:
+            page_chars: Sequence[str] = lut
+            index_plane = gray_im.tobytes()
+        else:
+            page_chars = cell_index[0]
+            index_plane = _little_endian(cell_index[1])
+        if classes.fg:
+            class_plane = bytes(width * height)
+        elif classes.mono:
+            class_plane = gray_im.tobytes().translate(_GRAY_CLASSES)
+        else:
+            class_plane = classes.class_bytes.tobytes()
+        # The planes are built in one step, so progress jumps once.
+        rows_done(height - 1, height)
+    else:
+        page_chars = chars
+        char_ids = {ch: i for i, ch in enumerate(chars)}
+        ids = array("B" if len(chars) <= 256 else "H")
+        classes_out = bytearray()
+        for y, (cells, row_colors) in enumerate(cell_rows):
+            ids.extend(map(char_ids.__getitem__, cells))
+            classes_out += bytes(classes.row(y, row_colors)[1])
+            rows_done(y, 1)
+        index_plane = _little_endian(memoryview(ids))
+        class_plane = bytes(classes_out)
+    return canvas_page(
+        (width, height),
+        page_chars,
+        index_plane,
+        classes.palette,
+        class_plane,
+        bg_brightness,
+    )
+
+
+def _draw_half_bands(
+    half_src: Image.Image,
+    cell_size: tuple[int, int],
+    *,
+    image: Image.Image | None,
+    array_out: Any,
+    png_writer: StreamingPNGWriter | None,
+    rows_done: Callable[[int, int], None],
+) -> None:
+    """Draw a half-block grid into `image`, `array_out` or `png_writer`.
+
+    Half blocks are two solid rectangles: no glyphs are drawn, each two-row
+    band of `half_src` is scaled up to the cells instead.
+    """
+    cell_width, cell_height = cell_size
+    width = half_src.width
+    band_size = (cell_width * width, cell_height)
+    for y in range(half_src.height // 2):
+        band = half_src.crop((0, 2 * y, width, 2 * y + 2)).resize(
+            band_size, _RESAMPLE_NEAREST
+        )
+        if array_out is not None:
+            array_out[y * cell_height : (y + 1) * cell_height] = np.asarray(
+                band.convert("RGB")
+            )
+        elif png_writer is not None:
+            png_writer.write_band(band)
+        else:
+            assert image is not None
+            image.paste(band, (0, y * cell_height))
+        rows_done(y, 1)
+
+
+def _blend_array_rows(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    array_out: Any,
+    glyph_masks: dict[str, Image.Image],
+    chars: Sequence[str],
+    *,
+    cell_height: int,
+    bg_brightness: int,
+    canvas_palette: list[int] | None,
+    pal_bytes: memoryview | None,
+    session: "FrameSession | None",
+    rows_done: Callable[[int, int], None],
+) -> None:
+    """Draw the cells of an `array` render into `array_out`.
+
+    Every pixel of a cell is ``Image.paste``'s blend of background and cell
+    colour by glyph coverage; a row of cells is blended in one vectorized
+    step straight into the caller's array.
+    """
+    atlas, atlas_index = _pooled(
+        session,
+        "atlas-array",
+        (glyph_masks, chars),
+        lambda: (
+            np.stack([np.asarray(glyph_masks[ch]) for ch in chars]),
+            {ch: i for i, ch in enumerate(chars)},
+        ),
+    )
+    palette_rgb = (
+        None
+        if canvas_palette is None
+        else np.array(canvas_palette, dtype=np.uint8).reshape(-1, 3)
+    )
+    for y, (cells, row_colors) in enumerate(cell_rows):
+        width = len(cells)
+        if pal_bytes is None:
+            rgb = np.frombuffer(row_colors, dtype=np.uint8).reshape(width, 3)
+        else:
+            rgb = palette_rgb[
+                np.frombuffer(pal_bytes[y * width : (y + 1) * width], np.uint8)
+            ]
+        idx = np.fromiter(map(atlas_index.__getitem__, cells), np.intp, width)
+        _blend_cells(
+            array_out[y * cell_height : (y + 1) * cell_height],
+            atlas[idx],
+            rgb,
+            bg_brightness,
+        )
+        rows_done(y, 1)
+
+
+def _paste_coverage_rows(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    image: Image.Image,
+    glyph_masks: dict[str, Image.Image],
+    chars: Sequence[str],
+    *,
+    cell_size: tuple[int, int],
+    row_step: int,
+    session: "FrameSession | None",
+    next_row: Callable[[int], None],
+) -> None:
+    """Paste the glyph coverage of every row of cells into the ``L`` `image`.
+
+    With one colour for every glyph each row's coverage is assembled from a
+    transposed glyph atlas, where every cell is a single contiguous run of
+    bytes, and pasted in one call.
+    """
+    cell_width, cell_height = cell_size
+
+    def _strip_atlas() -> dict[str, bytes]:
+        atlas = dict.fromkeys(chars, bytes(cell_width * cell_height))
+        atlas.update(
+            (ch, mask.transpose(_TRANSPOSE).tobytes())
+            for ch, mask in glyph_masks.items()
+        )
+        return atlas
+
+    atlas = _pooled(session, "atlas-strip", (glyph_masks, chars), _strip_atlas)
+    for y, (cells, _) in enumerate(cell_rows):
+        strip = Image.frombytes(
+            "L",
+            (cell_height, cell_width * len(cells)),
+            b"".join(map(atlas.__getitem__, cells)),
+        )
+        image.paste(strip.transpose(_TRANSPOSE), (0, y * row_step))
+        next_row(y)
+
+
+def _paste_cell_glyphs(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    image: Image.Image,
+    glyph_masks: dict[str, Image.Image],
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
+    *,
+    cell_width: int,
+    row_step: int,
+    bg_fill: Any,
+    pal_bytes: memoryview | None,
+    next_row: Callable[[int], None],
+) -> None:
+    """Paste every cell's glyph in its own colour into `image`.
+
+    Colours are gray levels on an ``L`` canvas, palette indices from
+    `pal_bytes` on a ``P`` canvas and RGB triplets otherwise. Cells whose
+    glyph has no ink, or whose colour equals the background, would paste
+    nothing visible and are skipped.
+    """
+    paste = image.paste
+    draw_text = ImageDraw.Draw(image).text
+    blank = _blank_glyphs(glyph_masks)
+    gray_canvas = image.mode == "L"
+    for y, (cells, row_colors) in enumerate(cell_rows):
+        width = len(cells)
+        pal_row = None if pal_bytes is None else pal_bytes[y * width : (y + 1) * width]
+        y_pos = y * row_step
+        x_pos = -cell_width
+        off = -3
+        for x, ch in enumerate(cells):
+            x_pos += cell_width
+            off += 3
+            if ch in blank:
+                continue
+            if gray_canvas:
+                color = row_colors[off]
+            elif pal_row is not None:
+                color = pal_row[x]
+            else:
+                color = (row_colors[off], row_colors[off + 1], row_colors[off + 2])
+            if color == bg_fill:
+                continue
+            mask = glyph_masks.get(ch)
+            if mask is None:
+                draw_text((x_pos, y_pos), ch, font=font, fill=color)
+            else:
+                paste(color, (x_pos, y_pos), mask)
+        next_row(y)
+
+
+def _render_raster(
+    cell_rows: Iterator[tuple[list[str], bytes]],
+    opts: "_RenderOptions",
+    *,
+    frame_rgb: Image.Image,
+    half_rgb: Image.Image | None,
+    half_gray: Image.Image | None,
+    chars: Sequence[str],
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
+    font_key: str,
+    out: Any,
+    session: "FrameSession | None",
+    png_writer_factory: (
+        Callable[[tuple[int, int], str, list[int] | None], StreamingPNGWriter] | None
+    ),
+    rows_done: Callable[[int, int], None],
+) -> tuple[Image.Image | None, Any]:
+    """Draw an `image` or `array` render and return ``(image, array)``.
+
+    Mono output only ever needs one channel, and a quantized colour grid
+    only needs palette indices; both are far cheaper to paste and encode
+    than a full RGB canvas. With `png_writer_factory` every row band goes to
+    the writer and no image is returned.
+    """
+    width, height = frame_rgb.size
+    cell_width, cell_height = opts.cell_width, opts.cell_height
+    bg_brightness = opts.bg_brightness
+    fg_rgb = opts.fg_rgb
+    canvas_mode = "RGB"
+    canvas_palette: list[int] | None = None
+    bg_fill: Any = (bg_brightness, bg_brightness, bg_brightness)
+    tint_luts: list[list[int]] | None = None
+    pal_bytes: memoryview | None = None
+    quant: Image.Image | None = None
+    if fg_rgb is not None:
+        if fg_rgb[0] == fg_rgb[1] == fg_rgb[2]:
+            canvas_mode = "L"
+        tint_luts = _tint_luts(bg_brightness, fg_rgb, canvas_mode)
+    elif opts.mono:
+        canvas_mode = "L"
+        bg_fill = bg_brightness
+    elif opts.colors:
+        quant = (frame_rgb if half_rgb is None else half_rgb).quantize(
+            colors=opts.colors
+        )
+        pal_bytes = memoryview(quant.tobytes())
+        canvas_palette = list(quant.getpalette() or [])
+        canvas_palette = canvas_palette[: 3 * (quant.getextrema()[1] + 1)]
+        canvas_mode = "P"
+        bg_fill = len(canvas_palette) // 3
+        canvas_palette += [bg_brightness] * 3
+    # The writer is finished when drawing succeeds and discarded otherwise.
+    with contextlib.ExitStack() as stack:
+        png_writer: StreamingPNGWriter | None = None
+        if png_writer_factory is not None:
+            # Only one band of cells is ever allocated; each finished row is
+            # handed to the writer and the band is cleared for the next.
+            png_writer = stack.enter_context(
+                png_writer_factory(
+                    (cell_width * width, cell_height * height),
+                    canvas_mode,
+                    canvas_palette,
+                )
+            )
+        if tint_luts is not None:
+            # Solid-colour glyphs: render ink coverage only and map it to colour
+            # in one pass once the canvas (or band) is complete.
+            canvas_mode = "L"
+            bg_fill = 0
+        image: Image.Image | None = None
+        if opts.output_format == "array":
+            shape = (cell_height * height, cell_width * width, 3)
+            if out is None:
+                out = _pooled(
+                    session, "array", shape, lambda: np.empty(shape, np.uint8)
+                )
+            elif (
+                getattr(out, "shape", None) != shape
+                or out.dtype != np.uint8
+                or not out.flags.c_contiguous
+                or not out.flags.writeable
+            ):
+                raise ValueError(
+                    f"out must be a writable C-contiguous uint8 array of shape {shape}"
+                )
+        else:
+            canvas_size = (
+                cell_width * width,
+                cell_height if png_writer is not None else cell_height * height,
+            )
+            fresh: list[Image.Image] = []
+
+            def _new_canvas() -> Image.Image:
+                fresh.append(Image.new(canvas_mode, canvas_size, color=bg_fill))
+                return fresh[0]
+
+            image = _pooled(session, "canvas", (canvas_mode, canvas_size), _new_canvas)
+            if not fresh:
+                image.paste(bg_fill, (0, 0) + canvas_size)
+            if canvas_palette is not None:
+                image.putpalette(canvas_palette)
+
+        if half_rgb is not None:
+            if opts.mono:
+                half_src = half_gray
+            elif quant is not None:
+                half_src = quant
+            else:
+                half_src = half_rgb
+            _draw_half_bands(
+                half_src,
+                (cell_width, cell_height),
+                image=image,
+                array_out=out,
+                png_writer=png_writer,
+                rows_done=rows_done,
+            )
+            return (None if png_writer is not None else image), out
+
+        glyph_masks = _glyph_masks(
+            font=font,
+            cell_width=cell_width,
+            cell_height=cell_height,
+            font_key=font_key,
+            chars=chars,
+            binary=pal_bytes is not None,
+        )
+        if opts.output_format == "array":
+            _blend_array_rows(
+                cell_rows,
+                out,
+                glyph_masks,
+                chars,
+                cell_height=cell_height,
+                bg_brightness=bg_brightness,
+                canvas_palette=canvas_palette,
+                pal_bytes=pal_bytes,
+                session=session,
+                rows_done=rows_done,
+            )
+            return None, out
+
+        assert image is not None
+        canvas = image
+
+        def _next_row(y: int) -> None:
+            if png_writer is not None:
+                png_writer.write_band(
+                    canvas if tint_luts is None else _tint(canvas, tint_luts)
+                )
+                canvas.paste(bg_fill, (0, 0) + canvas.size)
+            rows_done(y, 1)
+
+        # When streaming, every row is drawn at the top of the band.
+        row_step = 0 if png_writer is not None else cell_height
+        if tint_luts is not None:
+            _paste_coverage_rows(
+                cell_rows,
+                canvas,
+                glyph_masks,
+                chars,
+                cell_size=(cell_width, cell_height),
+                row_step=row_step,
+                session=session,
+                next_row=_next_row,
+            )
+            if png_writer is None:
+                image = _tint(canvas, tint_luts)
+        else:
+            _paste_cell_glyphs(
+                cell_rows,
+                canvas,
+                glyph_masks,
+                font,
+                cell_width=cell_width,
+                row_step=row_step,
+                bg_fill=bg_fill,
+                pal_bytes=pal_bytes,
+                next_row=_next_row,
+            )
+        return (None if png_writer is not None else image), out
+
+
+def _codec_args(
+    image: Image.Image,
+    codec: str,
+    *,
+    png_compress_level: int,
+    png_optimize: bool,
+    webp_quality: int,
+) -> tuple[Image.Image, str, str, dict[str, Any]]:
+    """Return ``(image, extension, Pillow format, save params)`` for ``codec``."""
+    if codec not in IMAGE_CODECS:
+        raise ValueError("codec must be one of: " + ", ".join(IMAGE_CODECS))
+    ext, fmt = IMAGE_CODECS[codec]
+    Image.init()
+    if fmt not in Image.SAVE:
+        raise ValueError(f"This Pillow build cannot write {codec} images")
+    params: dict[str, Any] = {}
+    if codec == "png":
+        params = {
+            "compress_level": int(png_compress_level),
+            "optimize": bool(png_optimize),
+        }
+    elif codec == "webp":
+        params = {"quality": int(webp_quality)}
+    elif codec == "webp-lossless":
+        params = {"lossless": True}
+    if (codec == "qoi" and image.mode not in ("RGB", "RGBA")) or (
+        codec == "ppm" and image.mode == "P"
+    ):
+        image = image.convert("RGB")
+    return image, ext, fmt, params
+
+
+def save_image(
+    image: Image.Image,
+    path_stem: str | os.PathLike[str],
+    *,
+    codec: str = "png",
+    png_compress_level: int = 6,
+    png_optimize: bool = False,
+    webp_quality: int = 80,
+) -> str:
+    """Encode ``image`` with ``codec`` and return the written file path.
+
+    ``path_stem`` is the output path without extension; the codec decides it.
+    `png_compress_level`/`png_optimize` only apply to PNG and `webp_quality`
+    only to lossy WebP. `bmp`/`ppm` are uncompressed and the fastest to
+    write; `qoi` needs a Pillow build with QOI write support.
+    """
+    image, ext, fmt, params = _codec_args(
+        image,
+        codec,
+        png_compress_level=png_compress_level,
+        png_optimize=png_optimize,
+        webp_quality=webp_quality,
+    )
+    path = os.fspath(path_stem) + ext
+    image.save(path, format=fmt, **params)
+    return path
+
+
+def write_image(
+    image: Image.Image,
+    fp: BinaryIO,
+    *,
+    codec: str = "png",
+    png_compress_level: int = 6,
+    png_optimize: bool = False,
+    webp_quality: int = 80,
+) -> None:
+    """Encode ``image`` like :func:`save_image` into the binary file `fp`."""
+    image, _, fmt, params = _codec_args(
+        image,
+        codec,
+        png_compress_level=png_compress_level,
+        png_optimize=png_optimize,
+        webp_quality=webp_quality,
+    )
+    image.save(fp, format=fmt, **params)
+
+
+def encode_image(
+    image: Image.Image,
+    *,
+    codec: str = "png",
+    png_compress_level: int = 6,
+    png_optimize: bool = False,
+    webp_quality: int = 80,
+) -> bytes:
+    """Encode ``image`` like :func:`save_image` but return the file bytes."""
+    buf = io.BytesIO()
+    write_image(
+        image,
+        buf,
+        codec=codec,
+        png_compress_level=png_compress_level,
+        png_optimize=png_optimize,
+        webp_quality=webp_quality,
+    )
+    return buf.getvalue()
+
+
+# Write buffer of output files; rows of text formats are streamed into it.
+STREAM_BUFFER_SIZE = 1 << 20
+
+
+def _open_image(source: Any) -> Image.Image:
+    """Open a path or binary file object with Pillow.
+
+    Pillow needs to seek, so unseekable streams such as pipes and
+    ``sys.stdin.buffer`` are read into memory first.
+    """
+    if hasattr(source, "read"):
+        seekable = getattr(source, "seekable", None)
+        if seekable is None or not seekable():
+            source = io.BytesIO(source.read())
+    return Image.open(source)
+
+
+@contextlib.contextmanager
+def _output_stream(target: Any) -> Iterator[BinaryIO | None]:
+    """Yield a binary stream for `target` (a path, a file object or ``None``).
+
+    Paths are opened with a large write buffer and closed afterwards; file
+    objects are only flushed, so callers keep ownership (e.g. of stdout).
+    """
+    if target is None or hasattr(target, "write"):
+        yield target
+        if target is not None:
+            target.flush()
+        return
+    with open(target, "wb", buffering=STREAM_BUFFER_SIZE) as fh:
+        yield fh
 
 
 OUTPUT_IMAGE_PREFIX = "FrameOut"  # output image file name prefix
@@ -355,11 +1868,8 @@ def load_char_array(dynamic: bool = False, font_path: str | None = None) -> None
 
     global char_array
     if dynamic:
-        try:
-            char_array = generate_char_array(font_path)
-        except OSError:
-            print(f"Could not load font '{font_path}', using default set")
-            char_array = generate_char_array(None)
+        _DEFAULT_CONVERTER.load_chars(font_path)
+        char_array = _DEFAULT_CONVERTER.chars
     _recompute_interval()
 
 
@@ -374,11 +1884,7 @@ def get_char(input_int: int) -> str:
     Returns:
         A character (string) from the `char_array` list
     """
-    if input_int <= 0:
-        return CHAR_LUT[0]
-    if input_int >= 255:
-        return CHAR_LUT[255]
-    return CHAR_LUT[input_int]
+    return _default_converter().get_char(input_int)
 
 
 def list_files_from_assets():
@@ -422,1259 +1928,1461 @@ def list_files_from_assets():
     return list_of_images[index - 1]
 
 
-def convert_image(
-    input_name: Any,
-    scale_factor: float = 0.2,
-    bg_brightness: int = 30,
-    output_dir: str = "./assets/output",
-    output_format: str = "image",
-    base_name: str | None = None,
-    mono: bool = False,
-    font_path: str | None = None,
-    grayscale_mode: str = "avg",
-    dither: str = "none",
-    assemble: bool = False,
-    gif_fps: float | None = None,
-    gif_loop: int = 0,
-    cell_width: int = ONE_CHAR_WIDTH,
-    cell_height: int = ONE_CHAR_HEIGHT,
-    html_mode: str = "spans",
-    progress_callback: Callable[[int, int], None] | None = None,
-) -> None:
+def _as_frame(image: Any) -> Image.Image | PixelBuffer:
+    """Return ``image`` unchanged, or wrap an array-like as a :class:`PixelBuffer`.
+
+    Arrays and shaped buffers are read in place; their channel order is
+    guessed from the channel count, so wrap BGR data explicitly with
+    ``PixelBuffer.from_array(frame, "BGR")``.
     """
-    Converts an image file to an ASCII art representation, and saves the output
-    image to ``output_dir`` with a filename that includes the chosen parameters
-    and the input filename.
+    if isinstance(image, (Image.Image, PixelBuffer)):
+        return image
+    try:
+        return PixelBuffer.from_array(image)
+    except TypeError:
+        raise TypeError(
+            "image must be a PIL image, a PixelBuffer or an array-like buffer"
+        ) from None
+
+
+RENDER_FORMATS = ("image", "array", "text", "html", "ansi", "grid")
+
+# How characters are chosen: from one brightness sample per cell, or by
+# matching the cell's sub-cell luminance against glyph shapes (`shape`).
+MAPPINGS = ("brightness", "shape")
+
+# What a cell shows: a ramp character (`ascii`), a 2x4 braille dot pattern,
+# or two stacked colour samples as an upper half block on a background.
+MODES = ("ascii", "braille", "halfblock")
+
+HALF_BLOCK = "\u2580"
+
+# Formats whose rows are lines of text (see :meth:`Converter.iter_rows`).
+TEXT_FORMATS = ("text", "html", "ansi")
+
+
+@dataclass(frozen=True)
+class _RenderOptions:
+    """Validated per-frame options shared by ``render`` and ``convert``."""
+
+    output_format: str
+    scale_factor: float
+    bg_brightness: int
+    mono: bool
+    font_path: str | None
+    grayscale_mode: str
+    dither: str
+    cell_width: int
+    cell_height: int
+    html_mode: str
+    colors: int | None
+    fg_rgb: tuple[int, int, int] | None
+    invert: bool
+    contrast: float
+    gamma: float
+    levels: tuple[int, int] | None
+    auto_levels: bool
+    grid_size: tuple[int, int] | None
+    mapping: str
+    edges: bool
+    edge_threshold: float
+    mode: str
+    ansi_tolerance: int
+    ansi_palette: str
+
+    @classmethod
+    def create(
+        cls,
+        output_format: str = "image",
+        scale_factor: float = 0.2,
+        bg_brightness: int = 30,
+        mono: bool = False,
+        font_path: str | None = None,
+        grayscale_mode: str = "avg",
+        dither: str = "none",
+        cell_width: int = ONE_CHAR_WIDTH,
+        cell_height: int = ONE_CHAR_HEIGHT,
+        html_mode: str = "spans",
+        colors: int | None = None,
+        fg_color: str | tuple[int, int, int] | None = None,
+        invert: bool = False,
+        contrast: float = 1.0,
+        gamma: float = 1.0,
+        levels: tuple[int, int] | None = None,
+        auto_levels: bool = False,
+        grid_size: tuple[int, int] | None = None,
+        mapping: str = "brightness",
+        edges: bool = False,
+        edge_threshold: float = EDGE_THRESHOLD,
+        mode: str = "ascii",
+        ansi_tolerance: int = 0,
+        ansi_palette: str = "truecolor",
+    ) -> "_RenderOptions":
+        if output_format not in RENDER_FORMATS:
+            raise ValueError("output_format must be one of: " + ", ".join(RENDER_FORMATS))
+
+        if grayscale_mode not in ("avg", "luma601", "luma709"):
+            raise ValueError("grayscale_mode must be one of: avg, luma601, luma709")
+
+        if dither not in ("none", "floyd-steinberg", "atkinson"):
+            raise ValueError("dither must be one of: none, floyd-steinberg, atkinson")
+
+        if html_mode not in ("spans", "compact", "canvas"):
+            raise ValueError("html_mode must be one of: spans, compact, canvas")
+
+        if mapping not in MAPPINGS:
+            raise ValueError("mapping must be one of: " + ", ".join(MAPPINGS))
+        if mapping == "shape" and dither != "none":
+            raise ValueError("dither is not supported with mapping='shape'")
+        if float(edge_threshold) < 0:
+            raise ValueError("edge_threshold must be >= 0")
+        if not 0 <= int(ansi_tolerance) <= 255:
+            raise ValueError("ansi_tolerance must be between 0 and 255")
+        if ansi_palette not in ANSI_PALETTES:
+            raise ValueError("ansi_palette must be one of: " + ", ".join(ANSI_PALETTES))
+
+        if mode not in MODES:
+            raise ValueError("mode must be one of: " + ", ".join(MODES))
+        if mode == "braille":
+            if mapping != "brightness" or edges:
+                raise ValueError(
+                    "mapping='shape' and edges are not supported with mode='braille'"
+                )
+            if dither == "atkinson":
+                raise ValueError(
+                    "mode='braille' supports dither none or floyd-steinberg"
+                )
+        if mode == "halfblock":
+            if output_format not in ("image", "array", "html", "ansi"):
+                raise ValueError(
+                    "mode='halfblock' supports output_format image, array, html "
+                    "and ansi"
+                )
+            if mapping != "brightness" or edges or dither != "none" or fg_color:
+                raise ValueError(
+                    "mapping='shape', edges, dither and fg_color are not "
+                    "supported with mode='halfblock'"
+                )
+            if output_format == "html" and html_mode == "canvas":
+                raise ValueError(
+                    "html_mode='canvas' is not supported with mode='halfblock'"
+                )
 
-    Args:
-        input_name (str):   The name of the image file to be converted, including the
-                            file extension.
-        scale_factor (float):   The scaling factor for the output image. Default is 0.2,
-                                which means the output image will be 20% of the size of the
-                                input image times the width and height of one character.
-        bg_brightness (int):    The brightness level of the output image background. Default is
-                                30, which is close to medium gray.
-        output_dir (str):   Directory where the resulting image will be saved.
-                            Defaults to ``./assets/output``.
-        mono (bool): Render characters in grayscale instead of colour.
-        font_path (str, optional): Path to a TTF font used for rendering.
-        grayscale_mode (str): How RGB pixels are mapped to a single brightness
-            value for character selection. One of:
-            - `avg`: average of channels (current behavior)
-            - `luma601`: BT.601 luma (integer approximation)
-            - `luma709`: BT.709 luma (integer approximation)
-        dither (str): Optional error-diffusion dithering applied to brightness
-            before character selection. One of: `none`, `floyd-steinberg`,
-            `atkinson`.
-        assemble (bool): If the input is an animated image and `output_format`
-            is `image`, assemble frames into a single animated GIF.
-        gif_fps (float, optional): When assembling an animated GIF, override the
-            per-frame duration using a fixed frames-per-second value.
-        gif_loop (int): When assembling an animated GIF, the GIF loop count
-            passed to Pillow. 0 means loop forever.
-        cell_width (int): Width (in pixels) of one character cell when rendering
-            `format=image`. Also used for aspect correction when resizing.
-        cell_height (int): Height (in pixels) of one character cell when
-            rendering `format=image`. Also used for aspect correction when
-            resizing.
-        html_mode (str): HTML output mode when `output_format=html`.
-            - `spans`: one span per character with inline styles (smaller code complexity)
-            - `compact`: CSS classes + run grouping (smaller HTML output)
-        progress_callback (callable, optional): Callback invoked as
-            ``progress_callback(current, total)`` to report the number of
-            processed rows.
+        if colors is not None:
+            colors = int(colors)
+            if not 1 <= colors <= 255:
+                raise ValueError("colors must be between 1 and 255")
+
+        if float(contrast) < 0:
+            raise ValueError("contrast must be >= 0")
+        if float(gamma) <= 0:
+            raise ValueError("gamma must be positive")
+        if levels is not None:
+            black, white = (int(v) for v in levels)
+            if not 0 <= black < white <= 255:
+                raise ValueError("levels must satisfy 0 <= black < white <= 255")
+            levels = (black, white)
+
+        fg_rgb: tuple[int, int, int] | None = None
+        if fg_color is not None:
+            if isinstance(fg_color, str):
+                fg_rgb = ImageColor.getrgb(fg_color)[:3]
+            else:
+                fg_rgb = tuple(int(c) for c in fg_color)[:3]
+            if len(fg_rgb) != 3 or not all(0 <= c <= 255 for c in fg_rgb):
+                raise ValueError("fg_color must be an RGB colour")
+
+        cell_width = int(cell_width)
+        cell_height = int(cell_height)
+        if cell_width <= 0 or cell_height <= 0:
+            raise ValueError("cell_width and cell_height must be positive integers")
+
+        if grid_size is not None:
+            grid_size = (int(grid_size[0]), int(grid_size[1]))
+            if grid_size[0] <= 0 or grid_size[1] <= 0:
+                raise ValueError("grid_size must be two positive integers")
+
+        if output_format == "array" and np is None:
+            raise ModuleNotFoundError("output_format='array' requires numpy")
+        if mapping == "shape" and np is None:
+            raise ModuleNotFoundError("mapping='shape' requires numpy")
+        if edges and np is None:
+            raise ModuleNotFoundError("edges requires numpy")
+        if mode == "braille" and np is None:
+            raise ModuleNotFoundError("mode='braille' requires numpy")
+
+        return cls(
+            output_format=output_format,
+            scale_factor=scale_factor,
+            bg_brightness=bg_brightness,
+            mono=bool(mono),
+            font_path=font_path,
+            grayscale_mode=grayscale_mode,
+            dither=dither,
+            cell_width=cell_width,
+            cell_height=cell_height,
+            html_mode=html_mode,
+            colors=colors,
+            fg_rgb=fg_rgb,
+            invert=bool(invert),
+            contrast=float(contrast),
+            gamma=float(gamma),
+            levels=levels,
+            auto_levels=bool(auto_levels),
+            grid_size=grid_size,
+            mapping=mapping,
+            edges=bool(edges),
+            edge_threshold=float(edge_threshold),
+            mode=mode,
+            ansi_tolerance=int(ansi_tolerance),
+            ansi_palette=ansi_palette,
+        )
 
-    Returns:
-        None. The output image is saved to a file.
+    @property
+    def extra_chars(self) -> tuple[str, ...]:
+        """Cells beyond the charset that this render may produce."""
+        if self.mode == "braille":
+            return BRAILLE_CHARS
+        if self.mode == "halfblock":
+            return (HALF_BLOCK,)
+        return EDGE_CHARS if self.edges else ()
+
+
+@dataclass
+class RenderResult:
+    """In-memory output of :meth:`Converter.render` for one frame.
+
+    Attributes:
+        output_format: The format that was rendered (see
+            :data:`RENDER_FORMATS`).
+        size: ``(columns, rows)`` of the character grid.
+        bg_brightness: Background gray level used for the render.
+        image: The rendered canvas for `image`, else ``None``.
+        array: The rendered canvas for `array` as a ``(height, width, 3)``
+            ``uint8`` NumPy array (the caller's `out` buffer when given),
+            else ``None``.
+        lines: One entry per grid row for `text`, `html` (markup inside the
+            ``<pre>`` only) and `ansi` (without the trailing reset), else
+            ``None``. A one-shot generator for lazy renders (see
+            :meth:`Converter.iter_rows`).
+        css: The ``<style>`` block of `html_mode=compact`, else ``None``.
+        page: The complete document of `html_mode=canvas`, which has no
+            `lines`, else ``None``.
+        rows: Cells of every grid row for `grid`, else ``None``.
+        colors: Packed RGB bytes (3 per cell) of every grid row for `grid`,
+            else ``None``.
+    """
 
-    Example:
-        If the "./assets/input/" directory contains an image file called
-        ``image1.jpg``, calling ``convert_image("image1.jpg", 0.1, 50)`` will
-        create an ASCII art representation of the image with a scale factor of
-        0.1 and a background brightness level of 50, and save the output image
-        to ``./assets/output/O_h:50_f_0.1_image1.jpg``.
+    output_format: str
+    size: tuple[int, int]
+    bg_brightness: int
+    image: Image.Image | None = None
+    array: Any = None
+    lines: list[str] | Iterator[str] | None = None
+    css: str | None = None
+    page: str | None = None
+    rows: list[list[str]] | None = None
+    colors: list[bytes] | None = None
+
+    def getvalue(self) -> str:
+        """Return the text document for `text`, `html` and `ansi` renders.
+
+        This is exactly what :meth:`Converter.convert` writes to the ``.txt``
+        or ``.html`` file, or (after a leading newline) to stdout for `ansi`.
+        """
+        return "".join(self.iter_document())
+
+    def iter_document(self) -> Iterator[str]:
+        """Yield the document of :meth:`getvalue` piece by piece.
+
+        With the lazy `lines` of :meth:`Converter.iter_rows` every row is
+        rendered only when it is reached, so the document can be written out
+        while the rest of the grid is still being rendered.
+        """
+        if self.page is not None:
+            yield self.page
+            return
+        if self.lines is None:
+            raise ValueError(f"{self.output_format} renders have no text value")
+        if self.output_format == "ansi":
+            for line in self.lines:
+                yield line
+                yield "\x1b[0m\n"
+            return
+        sep = "\n"
+        if self.output_format == "html":
+            bg = self.bg_brightness
+            sep = "<br>\n"
+            pre_open = (
+                "<pre class='ascii'>"
+                if self.css
+                else "<pre style='font-family:monospace;'>"
+            )
+            yield (
+                f"<html><head><meta charset='utf-8'>{self.css or ''}</head>"
+                f"<body style='background-color:rgb({bg},{bg},{bg});'>{pre_open}"
+            )
+        rows = iter(self.lines)
+        for line in rows:
+            yield line
+            break
+        for line in rows:
+            yield sep
+            yield line
+        if self.output_format == "html":
+            yield "</pre></body></html>"
+
+
+def _write_document(chunks: Iterable[str], fp: BinaryIO) -> None:
+    """Encode `chunks` as UTF-8 into the binary file object `fp`."""
+    write = fp.write
+    for chunk in chunks:
+        write(chunk.encode("utf-8"))
+
+
+@dataclass(frozen=True)
+class Charset:
+    """Immutable character ramp plus the lookup tables derived from it.
+
+    Attributes:
+        chars: Characters (or multi-character cells) ordered from lightest to
+            darkest.
+        length: ``len(chars)``.
+        lut: 256-entry tuple mapping a gray level to its ``chars`` entry.
+        table: The same mapping as a ``str.translate`` table over latin-1
+            decoded gray bytes (code point == gray level).
     """
 
-    def _resolve_input_image(name, default_base_name: str) -> tuple[Image.Image, str]:
-        if isinstance(name, Image.Image):
-            return name, default_base_name
-        name = os.fspath(name)
-        input_path = (
-            name
-            if os.path.isabs(name) or os.path.exists(name)
-            else os.path.join("./assets/input", name)
-        )
-        try:
-            return Image.open(input_path), Path(name).stem
-        except FileNotFoundError:
-            print(f"Input file '{name}' not found")
-            raise
+    chars: tuple[str, ...]
+    length: int
+    lut: tuple[str, ...]
+    table: dict[int, str]
+
+    @classmethod
+    def from_chars(cls, chars: Sequence[str]) -> "Charset":
+        chars = tuple(chars)
+        if not chars:
+            raise ValueError("chars must not be empty")
+        length = len(chars)
+        # Integer math avoids per-pixel floating point work.
+        lut = tuple(chars[(i * length) // 256] for i in range(256))
+        return cls(chars, length, lut, dict(enumerate(lut)))
+
+
+class FrameSession:
+    """Buffer pool shared by the consecutive frames of one stream.
+
+    Pass a session to :meth:`Converter.render` (or :meth:`Converter.convert`)
+    for every frame of a video, webcam feed or animation. Output canvases,
+    `array` buffers, dither error rows, per-row scratch lists and glyph
+    atlases are then allocated once and reused for as long as the grid size
+    (and mode) stays the same.
+
+    Results returned while using a session share those buffers: a frame's
+    ``image`` or ``array`` is overwritten by the next render, so copy it
+    first if it must outlive the frame. A session must not be shared between
+    threads.
+
+    Attributes:
+        allocations: ``Counter`` of buffers allocated, by kind: ``canvas``,
+            ``array``, ``atlas-array`` and ``atlas-strip`` (glyph atlases of
+            array and single-colour image output), ``dither`` (error rows),
+            ``palette`` (compact HTML colour classes) and the row scratch
+            lists ``cells`` and ``grays``.
+        reuses: ``Counter`` of buffers handed out again without allocating.
+    """
 
-    def _load_font(
-        user_font: str | None,
-    ) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-        windows_font = r"C:\\Windows\\Fonts\\lucon.ttf"
-        linux_font = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
-        if user_font:
-            try:
-                return ImageFont.truetype(user_font, cell_height)
-            except OSError:
-                print(f"Could not load font '{user_font}', falling back to defaults")
-        if os.path.exists(windows_font):
-            return ImageFont.truetype(windows_font, cell_height)
-        if os.path.exists(linux_font):
-            return ImageFont.truetype(linux_font, cell_height)
-        return ImageFont.load_default()
+    def __init__(self) -> None:
+        self.allocations: Counter[str] = Counter()
+        self.reuses: Counter[str] = Counter()
+        self._buffers: dict[str, tuple[Any, Any]] = {}
+
+    def get(self, kind: str, key: Any, factory: Callable[[], Any]) -> Any:
+        """Return the pooled ``kind`` buffer for ``key``, creating it if needed."""
+        entry = self._buffers.get(kind)
+        if entry is not None and entry[0] == key:
+            self.reuses[kind] += 1
+            return entry[1]
+        buffer = factory()
+        self._buffers[kind] = (key, buffer)
+        self.allocations[kind] += 1
+        return buffer
 
-    try:
-        _im, resolved_base = _resolve_input_image(input_name, base_name or "frame")
-    except FileNotFoundError:
-        return
-    if base_name is None:
-        base_name = resolved_base
 
-    fnt = _load_font(font_path)
+def _pooled(
+    session: FrameSession | None, kind: str, key: Any, factory: Callable[[], Any]
+) -> Any:
+    return factory() if session is None else session.get(kind, key, factory)
 
-    if grayscale_mode not in ("avg", "luma601", "luma709"):
-        raise ValueError("grayscale_mode must be one of: avg, luma601, luma709")
 
-    if dither not in ("none", "floyd-steinberg", "atkinson"):
-        raise ValueError("dither must be one of: none, floyd-steinberg, atkinson")
+class Converter:
+    """Reusable conversion session.
 
-    if gif_fps is not None and float(gif_fps) <= 0:
-        raise ValueError("gif_fps must be positive")
-    gif_loop = int(gif_loop)
-    if gif_loop < 0:
-        raise ValueError("gif_loop must be >= 0")
+    A converter owns its character set (and the lookup tables derived from
+    it) and caches loaded fonts, so repeated conversions skip that setup and
+    several converters with different charsets can run side by side. One
+    instance may be shared between threads: the charset is an immutable
+    :class:`Charset` swapped atomically and read once per conversion, and
+    font loading and glyph mask rendering are serialized.
 
-    if html_mode not in ("spans", "compact"):
-        raise ValueError("html_mode must be one of: spans, compact")
+    The module-level :func:`convert_image`, :func:`convert_video`,
+    :func:`load_char_array` and :func:`get_char` use a shared default
+    instance that follows the module's ``char_array``.
 
-    cell_width = int(cell_width)
-    cell_height = int(cell_height)
-    if cell_width <= 0 or cell_height <= 0:
-        raise ValueError("cell_width and cell_height must be positive integers")
+    Args:
+        chars: Character ramp from lightest to darkest. Defaults to the
+            built-in set.
+    """
 
-    is_animated = getattr(_im, "is_animated", False)
-    n_frames = int(getattr(_im, "n_frames", 1)) if is_animated else 1
-    frames_iter = ImageSequence.Iterator(_im) if is_animated else (_im,)
+    def __init__(self, chars: Sequence[str] | None = None) -> None:
+        self.charset = Charset.from_chars(DEFAULT_CHARS if chars is None else chars)
+        self._fonts: dict[
+            tuple[str | None, int], ImageFont.FreeTypeFont | ImageFont.ImageFont
+        ] = {}
+        self._lock = threading.Lock()
 
-    assemble_gif = (
-        bool(assemble) and is_animated and output_format == "image" and n_frames > 1
-    )
-    gif_frames: list[Image.Image] = []
-    gif_durations: list[int] = []
+    @property
+    def chars(self) -> list[str]:
+        return list(self.charset.chars)
+
+    def set_chars(self, chars: Sequence[str]) -> None:
+        """Replace the character ramp used by subsequent conversions."""
+        self.charset = Charset.from_chars(chars)
+
+    def load_chars(self, font_path: str | None = None) -> None:
+        """Use a brightness-ranked ramp generated by :mod:`ascii_art.charset`.
+
+        Falls back to the default font when ``font_path`` cannot be loaded.
+        """
+        try:
+            chars = generate_char_array(font_path)
+        except OSError:
+            print(
+                f"Could not load font '{font_path}', using default set",
+                file=sys.stderr,
+            )
+            chars = generate_char_array(None)
+        self.set_chars(chars)
+
+    def get_char(self, input_int: int) -> str:
+        """Return the character for a gray level, clamped to 0..255."""
+        return self.charset.lut[min(255, max(0, int(input_int)))]
+
+    def font(
+        self, font_path: str | None, cell_height: int
+    ) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+        """Return the (cached) render font for ``font_path`` at ``cell_height``."""
+        key = (font_path, int(cell_height))
+        with self._lock:
+            fnt = self._fonts.get(key)
+            if fnt is None:
+                fnt = _load_font(font_path, int(cell_height))
+                self._fonts[key] = fnt
+        return fnt
+
+    def render(
+        self,
+        image: Image.Image | PixelBuffer | Any,
+        output_format: str = "image",
+        *,
+        out: Any = None,
+        session: FrameSession | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+        **options: Any,
+    ) -> RenderResult:
+        """Render one image in memory and return the result.
+
+        Unlike :meth:`convert` nothing is written to disk or stdout and no
+        progress bar is shown; `progress_callback` is the only side channel.
+        Animated images render their current frame.
+
+        Args:
+            image: Source image (any mode), a :class:`PixelBuffer`, or a
+                NumPy array / shaped ``memoryview`` (see :func:`_as_frame`).
+            output_format: One of `image`, `array`, `text`, `html`, `ansi`,
+                `grid`. `array` draws the same pixels as `image` (converted
+                to RGB) into a NumPy array; `grid` returns the character grid
+                and cell colours that the other formats are drawn from.
+            out (numpy.ndarray, optional): For `array`, a C-contiguous
+                writable ``uint8`` array of shape ``(rows * cell_height,
+                columns * cell_width, 3)`` to draw into instead of allocating
+                one. Pass the previous result's ``array`` to reuse it frame
+                after frame.
+            session (FrameSession, optional): Reuse canvases and scratch
+                buffers across the frames of a stream (see
+                :class:`FrameSession`).
+            progress_callback (callable, optional): Called as
+                ``progress_callback(current, total)`` after every grid row.
+                `html_mode='canvas'` encodes the grid in one pass, so progress
+                may jump from ``0`` to ``total`` in a single step.
+            **options: The per-frame options of :meth:`convert`:
+                `scale_factor`, `bg_brightness`, `mono`, `font_path`,
+                `grayscale_mode`, `dither`, `cell_width`, `cell_height`,
+                `html_mode`, `colors`, `fg_color`, `invert`, `contrast`,
+                `gamma`, `levels`, `auto_levels`, `grid_size`, `mapping`,
+                `edges`, `edge_threshold`, `mode`, `ansi_tolerance`,
+                `ansi_palette`.
+
+        Returns:
+            A :class:`RenderResult`.
+        """
+        opts = _RenderOptions.create(output_format, **options)
+        if out is not None and output_format != "array":
+            raise ValueError("out is only supported with output_format='array'")
+        return self._render_frame(
+            _as_frame(image),
+            opts,
+            charset=self.charset,
+            out=out,
+            session=session,
+            progress_callback=progress_callback,
+        )
+
+    def iter_rows(
+        self,
+        image: Image.Image | PixelBuffer | Any,
+        output_format: str = "text",
+        *,
+        session: FrameSession | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+        **options: Any,
+    ) -> Iterator[str]:
+        """Yield the rows of a `text`, `html` or `ansi` render one at a time.
+
+        Each row is rendered only when it is requested, so the first row is
+        available long before the last one has been computed and the whole
+        document never has to be held in memory. The rows are the
+        :attr:`RenderResult.lines` of :meth:`render`: `html` rows are the
+        markup inside the ``<pre>``, `ansi` rows lack the trailing reset.
+        Use :meth:`write` for the complete document.
+
+        Buffers of `session` stay in use until the iterator is exhausted.
+        """
+        if output_format not in TEXT_FORMATS:
+            raise ValueError("output_format must be one of: " + ", ".join(TEXT_FORMATS))
+        opts = _RenderOptions.create(output_format, **options)
+        if output_format == "html" and opts.html_mode == "canvas":
+            raise ValueError("html_mode='canvas' renders no rows; use write()")
+        result = self._render_frame(
+            _as_frame(image),
+            opts,
+            charset=self.charset,
+            session=session,
+            progress_callback=progress_callback,
+            lazy=True,
+        )
+        assert result.lines is not None
+        return iter(result.lines)
+
+    def write(
+        self,
+        image: Image.Image | PixelBuffer | Any,
+        fp: BinaryIO,
+        output_format: str = "text",
+        *,
+        session: FrameSession | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+        **options: Any,
+    ) -> None:
+        """Stream the `text`, `html` or `ansi` document to a binary file.
+
+        The UTF-8 encoded output equals ``render(...).getvalue()``, but every
+        row is written to `fp` as soon as it is rendered (see
+        :meth:`iter_rows`). Wrap `fp` in a large ``io.BufferedWriter`` (or
+        open it with a large ``buffering``) to keep writes coarse.
+        """
+        if output_format not in TEXT_FORMATS:
+            raise ValueError("output_format must be one of: " + ", ".join(TEXT_FORMATS))
+        opts = _RenderOptions.create(output_format, **options)
+        result = self._render_frame(
+            _as_frame(image),
+            opts,
+            charset=self.charset,
+            session=session,
+            progress_callback=progress_callback,
+            lazy=True,
+        )
+        _write_document(result.iter_document(), fp)
+
+    def _render_frame(
+        self,
+        frame: Image.Image | PixelBuffer,
+        opts: _RenderOptions,
+        *,
+        charset: Charset,
+        out: Any = None,
+        session: FrameSession | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+        progress_desc: str | None = None,
+        png_writer_factory: (
+            Callable[[tuple[int, int], str, list[int] | None], StreamingPNGWriter]
+            | None
+        ) = None,
+        lazy: bool = False,
+    ) -> RenderResult:
+        """Render one frame; see :meth:`render`.
+
+        A progress bar is shown only when `progress_desc` is given and there
+        is no `progress_callback`. With `png_writer_factory` (``image`` only)
+        each row band is handed to the returned writer, which is closed at the
+        end, and the result carries no image. With `lazy` the `lines` of the
+        text formats are a generator that renders each row on demand.
+
+        The cell grid is prepared here; every format is then drawn by its
+        own helper (:func:`_render_raster`, :func:`_html_canvas_page` and the
+        row generators of the text formats).
+        """
+        output_format = opts.output_format
+        bg_brightness = opts.bg_brightness
+        cell_width = opts.cell_width
+        cell_height = opts.cell_height
+        mono = opts.mono
+        fg_rgb = opts.fg_rgb
+        cs = charset
+        fnt = self.font(opts.font_path, cell_height)
 
-    for frame_index, frame in enumerate(frames_iter):
-        if is_animated:
-            frame = frame.copy()
-        frame_duration_ms = int(getattr(frame, "info", {}).get("duration", 40))
         width, height = frame.size
-        frame = frame.resize(
-            (
-                max(1, int(scale_factor * width)),
-                max(1, int(scale_factor * height * (cell_width / cell_height))),
-            ),
-            _RESAMPLE_NEAREST,
+        grid_size = opts.grid_size or (
+            max(1, int(opts.scale_factor * width)),
+            max(1, int(opts.scale_factor * height * (cell_width / cell_height))),
         )
+        source = frame
+
+        def _sample(size: tuple[int, int]) -> Image.Image:
+            if isinstance(source, PixelBuffer):
+                # Only the sampled pixels are read from the caller's buffer.
+                return source.sample(size)
+            return source.resize(size, _RESAMPLE_NEAREST)
+
+        frame = _sample(grid_size)
         width, height = frame.size
         frame_rgb = frame.convert("RGB")
-        rgb_bytes = memoryview(frame_rgb.tobytes())
+        half_rgb: Image.Image | None = None
+        if opts.mode == "halfblock":
+            # Two samples per cell from one resize: even rows are the upper
+            # halves (glyph colour), odd rows the lower halves (background).
+            half_rgb = _sample((width, 2 * height)).convert("RGB")
+        html_classes: _HtmlClasses | None = None
         html_css: str | None = None
-        html_color_bytes = rgb_bytes
-        if output_format == "html" and html_mode == "compact" and not mono:
-            try:
-                quant = frame_rgb.quantize(colors=64).convert("RGB")
-                html_color_bytes = memoryview(quant.tobytes())
-            except Exception:
-                html_color_bytes = rgb_bytes
-        stride = width * 3
-        lut = CHAR_LUT
-
-        is_avg = grayscale_mode == "avg"
-        wr = wg = wb = 0
-        if not is_avg:
-            if grayscale_mode == "luma601":
-                wr, wg, wb = 77, 150, 29
-            else:  # luma709
-                wr, wg, wb = 54, 183, 19
-
-        levels = CHAR_LENGTH
-        levels_m1 = max(1, levels - 1)
-
-        output_image = None
-        draw = None
-        glyph_masks: dict[str, Image.Image] | None = None
-        if output_format == "image":
-            output_image = Image.new(
-                "RGB",
-                (cell_width * width, cell_height * height),
-                color=(bg_brightness, bg_brightness, bg_brightness),
-            )
-            draw = ImageDraw.Draw(output_image)
-            font_key = str(getattr(fnt, "path", "") or font_path or "default")
-            glyph_masks = _glyph_masks(
-                font=fnt,
-                cell_width=cell_width,
-                cell_height=cell_height,
-                font_key=font_key,
-                chars=char_array,
+        if output_format == "html" and opts.html_mode in ("compact", "canvas"):
+            html_classes = _html_classes(
+                frame_rgb, half_rgb, fg_rgb=fg_rgb, mono=mono, session=session
             )
-
-        text_lines: list[str] | None = None
-        html_lines: list[str] | None = None
-        ansi_lines: list[str] | None = None
-        if output_format == "text":
-            text_lines = []
-        elif output_format == "html":
-            html_lines = []
-        elif output_format == "ansi":
-            ansi_lines = []
+            if opts.html_mode == "compact":
+                html_css = html_classes.css(half=half_rgb is not None)
+        bg_rgb = bytes((bg_brightness, bg_brightness, bg_brightness))
+        gray_im = _gray_plane(frame_rgb, opts.grayscale_mode)
+        tone = _tone_table(
+            invert=opts.invert,
+            contrast=opts.contrast,
+            gamma=opts.gamma,
+            levels=_auto_levels(gray_im.histogram()) if opts.auto_levels else opts.levels,
+        )
+        if tone is not None:
+            gray_im = gray_im.point(tone)
+        font_key = str(getattr(fnt, "path", "") or opts.font_path or "default")
+        cell_index = _mapped_cell_index(
+            _sample,
+            (width, height),
+            opts,
+            tone=tone,
+            charset=cs,
+            font=fnt,
+            font_key=font_key,
+        )
+        half_gray: Image.Image | None = None
+        if half_rgb is not None and mono:
+            half_gray = _gray_plane(half_rgb, opts.grayscale_mode)
+            if tone is not None:
+                half_gray = half_gray.point(tone)
+            half_rgb = Image.merge("RGB", (half_gray, half_gray, half_gray))
+        # Every cell string the render can emit; glyph tables cover all.
+        glyph_chars = cs.chars + opts.extra_chars
+        edge_plane: Any = None
+        if opts.edges:
+            # Strong edges override the mapped character. Without dithering
+            # that is one more array operation on the index plane; dithered
+            # rows are patched at their (few) edge cells instead.
+            edge_plane = edge_bins(gray_im, opts.edge_threshold)
+            if opts.dither == "none":
+                table, index = cell_index or (cs.lut, memoryview(gray_im.tobytes()))
+                table, index = overlay_edges(table, index, edge_plane)
+                cell_index = (table, memoryview(index))
+                edge_plane = None
+        cell_rows = _cell_rows(
+            frame_rgb,
+            gray_im,
+            dither=opts.dither,
+            mono=mono,
+            charset=cs,
+            session=session,
+            # Only the grid output keeps rows beyond the current one.
+            reuse_cells=session is not None and output_format != "grid",
+            cell_index=cell_index,
+        )
+        if edge_plane is not None:
+            cell_rows = _edge_cell_rows(cell_rows, edge_plane)
+        if fg_rgb is not None:
+            fg_row = bytes(fg_rgb) * width
+            cell_rows = ((cells, fg_row) for cells, _ in cell_rows)
 
         progress = (
-            None
-            if progress_callback
-            else loader(
-                total=height,
-                desc=f"Frame {frame_index + 1}/{n_frames}" if n_frames > 1 else "Rows",
-            )
+            loader(total=height, desc=progress_desc)
+            if progress_desc is not None and not progress_callback
+            else None
         )
         if progress_callback:
             progress_callback(0, height)
-        if output_format == "image":
-            assert draw is not None
-            assert output_image is not None
-            assert glyph_masks is not None
-            paste = output_image.paste
-            draw_text = draw.text
-            x_positions = [x * cell_width for x in range(width)]
-            if dither == "none":
-                if is_avg:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        y_pos = y * cell_height
-                        off = 0
-                        for x in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (r + g + b) // 3
-                            ch = lut[h]
-                            color = (h, h, h) if mono else (r, g, b)
-                            mask = glyph_masks.get(ch)
-                            if mask is None:
-                                draw_text(
-                                    (x_positions[x], y_pos),
-                                    ch,
-                                    font=fnt,
-                                    fill=color,
-                                )
-                            else:
-                                paste(color, (x_positions[x], y_pos), mask)
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                else:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        y_pos = y * cell_height
-                        off = 0
-                        for x in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (wr * r + wg * g + wb * b) >> 8
-                            ch = lut[h]
-                            color = (h, h, h) if mono else (r, g, b)
-                            mask = glyph_masks.get(ch)
-                            if mask is None:
-                                draw_text(
-                                    (x_positions[x], y_pos),
-                                    ch,
-                                    font=fnt,
-                                    fill=color,
-                                )
-                            else:
-                                paste(color, (x_positions[x], y_pos), mask)
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-            elif dither == "floyd-steinberg":
-                err_curr = [0.0] * (width + 2)
-                err_next = [0.0] * (width + 2)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    y_pos = y * cell_height
-                    err_curr, err_next = err_next, [0.0] * (width + 2)
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        v = float(base) + err_curr[x + 1]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            idx = int(v * levels_m1 / 255.0 + 0.5)
-                            if idx < 0:
-                                idx = 0
-                            elif idx > levels_m1:
-                                idx = levels_m1
-                            qh = int(idx * 255.0 / levels_m1 + 0.5)
-                        err = v - float(qh)
-                        err_curr[x + 2] += err * (7.0 / 16.0)
-                        err_next[x + 0] += err * (3.0 / 16.0)
-                        err_next[x + 1] += err * (5.0 / 16.0)
-                        err_next[x + 2] += err * (1.0 / 16.0)
-
-                        ch = lut[qh]
-                        color = (qh, qh, qh) if mono else (r, g, b)
-                        mask = glyph_masks.get(ch)
-                        if mask is None:
-                            draw_text(
-                                (x_positions[x], y_pos),
-                                ch,
-                                font=fnt,
-                                fill=color,
-                            )
-                        else:
-                            paste(color, (x_positions[x], y_pos), mask)
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-            else:  # atkinson
-                err_curr = [0.0] * (width + 4)
-                err_next = [0.0] * (width + 4)
-                err_next2 = [0.0] * (width + 4)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    y_pos = y * cell_height
-                    err_curr, err_next, err_next2 = (
-                        err_next,
-                        err_next2,
-                        [0.0] * (width + 4),
-                    )
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        idx0 = x + 2
-                        v = float(base) + err_curr[idx0]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            qidx = int(v * levels_m1 / 255.0 + 0.5)
-                            if qidx < 0:
-                                qidx = 0
-                            elif qidx > levels_m1:
-                                qidx = levels_m1
-                            qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                        err = (v - float(qh)) / 8.0
-                        err_curr[idx0 + 1] += err
-                        err_curr[idx0 + 2] += err
-                        err_next[idx0 - 1] += err
-                        err_next[idx0 + 0] += err
-                        err_next[idx0 + 1] += err
-                        err_next2[idx0 + 0] += err
-
-                        ch = lut[qh]
-                        color = (qh, qh, qh) if mono else (r, g, b)
-                        mask = glyph_masks.get(ch)
-                        if mask is None:
-                            draw_text(
-                                (x_positions[x], y_pos),
-                                ch,
-                                font=fnt,
-                                fill=color,
-                            )
-                        else:
-                            paste(color, (x_positions[x], y_pos), mask)
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-        elif output_format == "text":
-            assert text_lines is not None
-            if dither == "none":
-                if is_avg:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        line_chars: list[str] = []
-                        off = 0
-                        for _ in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (r + g + b) // 3
-                            line_chars.append(lut[h])
-                        text_lines.append("".join(line_chars))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                else:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        line_chars: list[str] = []
-                        off = 0
-                        for _ in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (wr * r + wg * g + wb * b) >> 8
-                            line_chars.append(lut[h])
-                        text_lines.append("".join(line_chars))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-            elif dither == "floyd-steinberg":
-                err_curr = [0.0] * (width + 2)
-                err_next = [0.0] * (width + 2)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next = err_next, [0.0] * (width + 2)
-                    line_chars: list[str] = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        v = float(base) + err_curr[x + 1]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            idx = int(v * levels_m1 / 255.0 + 0.5)
-                            if idx < 0:
-                                idx = 0
-                            elif idx > levels_m1:
-                                idx = levels_m1
-                            qh = int(idx * 255.0 / levels_m1 + 0.5)
-                        err = v - float(qh)
-                        err_curr[x + 2] += err * (7.0 / 16.0)
-                        err_next[x + 0] += err * (3.0 / 16.0)
-                        err_next[x + 1] += err * (5.0 / 16.0)
-                        err_next[x + 2] += err * (1.0 / 16.0)
-                        line_chars.append(lut[qh])
-                    text_lines.append("".join(line_chars))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-            else:  # atkinson
-                err_curr = [0.0] * (width + 4)
-                err_next = [0.0] * (width + 4)
-                err_next2 = [0.0] * (width + 4)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next, err_next2 = (
-                        err_next,
-                        err_next2,
-                        [0.0] * (width + 4),
-                    )
-                    line_chars = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        idx0 = x + 2
-                        v = float(base) + err_curr[idx0]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            qidx = int(v * levels_m1 / 255.0 + 0.5)
-                            if qidx < 0:
-                                qidx = 0
-                            elif qidx > levels_m1:
-                                qidx = levels_m1
-                            qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                        err = (v - float(qh)) / 8.0
-                        err_curr[idx0 + 1] += err
-                        err_curr[idx0 + 2] += err
-                        err_next[idx0 - 1] += err
-                        err_next[idx0 + 0] += err
-                        err_next[idx0 + 1] += err
-                        err_next2[idx0 + 0] += err
-                        line_chars.append(lut[qh])
-                    text_lines.append("".join(line_chars))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-        elif output_format == "html":
-            assert html_lines is not None
-            if html_mode == "compact":
-                color_to_idx: dict[tuple[int, int, int], int] = {}
-                idx_to_color: list[tuple[int, int, int]] = []
-
-                def _cls(rgb: tuple[int, int, int]) -> int:
-                    idx = color_to_idx.get(rgb)
-                    if idx is None:
-                        idx = len(idx_to_color)
-                        color_to_idx[rgb] = idx
-                        idx_to_color.append(rgb)
-                    return idx
-
-                def _flush_run(
-                    line_parts: list[str], run_idx: int | None, run_buf: list[str]
-                ) -> None:
-                    if run_idx is None or not run_buf:
-                        return
-                    line_parts.append(
-                        f'<span class="c{run_idx}">{html.escape("".join(run_buf))}</span>'
-                    )
 
-                def _mono_rgb(v: int) -> tuple[int, int, int]:
-                    gq = (int(v) // 16) * 16
-                    return (gq, gq, gq)
-
-                if dither == "none":
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        crow = html_color_bytes[y * stride : (y + 1) * stride]
-                        line_parts: list[str] = []
-                        run_idx: int | None = None
-                        run_buf: list[str] = []
-                        off = 0
-                        for _ in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            h = (
-                                (r + g + b) // 3
-                                if is_avg
-                                else (wr * r + wg * g + wb * b) >> 8
-                            )
-                            ch = lut[h]
-                            if mono:
-                                rgb = _mono_rgb(h)
-                            else:
-                                rgb = (
-                                    int(crow[off]),
-                                    int(crow[off + 1]),
-                                    int(crow[off + 2]),
-                                )
-                            idx = _cls(rgb)
-                            if run_idx is None:
-                                run_idx = idx
-                                run_buf = [ch]
-                            elif idx == run_idx:
-                                run_buf.append(ch)
-                            else:
-                                _flush_run(line_parts, run_idx, run_buf)
-                                run_idx = idx
-                                run_buf = [ch]
-                            off += 3
-                        _flush_run(line_parts, run_idx, run_buf)
-                        html_lines.append("".join(line_parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                elif dither == "floyd-steinberg":
-                    err_curr = [0.0] * (width + 2)
-                    err_next = [0.0] * (width + 2)
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        crow = html_color_bytes[y * stride : (y + 1) * stride]
-                        err_curr, err_next = err_next, [0.0] * (width + 2)
-                        line_parts = []
-                        run_idx = None
-                        run_buf = []
-                        off = 0
-                        for x in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            base = (
-                                (r + g + b) // 3
-                                if is_avg
-                                else (wr * r + wg * g + wb * b) >> 8
-                            )
-                            v = float(base) + err_curr[x + 1]
-                            if v < 0.0:
-                                v = 0.0
-                            elif v > 255.0:
-                                v = 255.0
-                            if levels_m1 <= 0:
-                                qh = 0
-                            else:
-                                qidx = int(v * levels_m1 / 255.0 + 0.5)
-                                if qidx < 0:
-                                    qidx = 0
-                                elif qidx > levels_m1:
-                                    qidx = levels_m1
-                                qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                            err = v - float(qh)
-                            err_curr[x + 2] += err * (7.0 / 16.0)
-                            err_next[x + 0] += err * (3.0 / 16.0)
-                            err_next[x + 1] += err * (5.0 / 16.0)
-                            err_next[x + 2] += err * (1.0 / 16.0)
-                            ch = lut[qh]
-                            if mono:
-                                rgb = _mono_rgb(qh)
-                            else:
-                                rgb = (
-                                    int(crow[off]),
-                                    int(crow[off + 1]),
-                                    int(crow[off + 2]),
-                                )
-                            idx = _cls(rgb)
-                            if run_idx is None:
-                                run_idx = idx
-                                run_buf = [ch]
-                            elif idx == run_idx:
-                                run_buf.append(ch)
-                            else:
-                                _flush_run(line_parts, run_idx, run_buf)
-                                run_idx = idx
-                                run_buf = [ch]
-                            off += 3
-                        _flush_run(line_parts, run_idx, run_buf)
-                        html_lines.append("".join(line_parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                else:  # atkinson
-                    err_curr = [0.0] * (width + 4)
-                    err_next = [0.0] * (width + 4)
-                    err_next2 = [0.0] * (width + 4)
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        crow = html_color_bytes[y * stride : (y + 1) * stride]
-                        err_curr, err_next, err_next2 = (
-                            err_next,
-                            err_next2,
-                            [0.0] * (width + 4),
-                        )
-                        line_parts = []
-                        run_idx = None
-                        run_buf = []
-                        off = 0
-                        for x in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            base = (
-                                (r + g + b) // 3
-                                if is_avg
-                                else (wr * r + wg * g + wb * b) >> 8
-                            )
-                            idx0 = x + 2
-                            v = float(base) + err_curr[idx0]
-                            if v < 0.0:
-                                v = 0.0
-                            elif v > 255.0:
-                                v = 255.0
-                            if levels_m1 <= 0:
-                                qh = 0
-                            else:
-                                qidx = int(v * levels_m1 / 255.0 + 0.5)
-                                if qidx < 0:
-                                    qidx = 0
-                                elif qidx > levels_m1:
-                                    qidx = levels_m1
-                                qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                            err = (v - float(qh)) / 8.0
-                            err_curr[idx0 + 1] += err
-                            err_curr[idx0 + 2] += err
-                            err_next[idx0 - 1] += err
-                            err_next[idx0 + 0] += err
-                            err_next[idx0 + 1] += err
-                            err_next2[idx0 + 0] += err
-                            ch = lut[qh]
-                            if mono:
-                                rgb = _mono_rgb(qh)
-                            else:
-                                rgb = (
-                                    int(crow[off]),
-                                    int(crow[off + 1]),
-                                    int(crow[off + 2]),
-                                )
-                            idx = _cls(rgb)
-                            if run_idx is None:
-                                run_idx = idx
-                                run_buf = [ch]
-                            elif idx == run_idx:
-                                run_buf.append(ch)
-                            else:
-                                _flush_run(line_parts, run_idx, run_buf)
-                                run_idx = idx
-                                run_buf = [ch]
-                            off += 3
-                        _flush_run(line_parts, run_idx, run_buf)
-                        html_lines.append("".join(line_parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-
-                css_rules = [
-                    "<style>",
-                    "pre.ascii{font-family:monospace;line-height:1;}",
-                ]
-                for i, (r, g, b) in enumerate(idx_to_color):
-                    css_rules.append(f".c{i}{{color:rgb({r},{g},{b})}}")
-                css_rules.append("</style>")
-                html_css = "\n".join(css_rules)
-            elif dither == "none":
-                if is_avg:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        parts: list[str] = []
-                        off = 0
-                        for _ in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (r + g + b) // 3
-                            ch = lut[h]
-                            if mono:
-                                cr = cg = cb = h
-                            else:
-                                cr, cg, cb = r, g, b
-                            parts.append(
-                                f'<span style="color:rgb({cr},{cg},{cb})">{html.escape(ch)}</span>'
-                            )
-                        html_lines.append("".join(parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                else:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        parts: list[str] = []
-                        off = 0
-                        for _ in range(width):
-                            r = row[off]
-                            g = row[off + 1]
-                            b = row[off + 2]
-                            off += 3
-                            h = (wr * r + wg * g + wb * b) >> 8
-                            ch = lut[h]
-                            if mono:
-                                cr = cg = cb = h
-                            else:
-                                cr, cg, cb = r, g, b
-                            parts.append(
-                                f'<span style="color:rgb({cr},{cg},{cb})">{html.escape(ch)}</span>'
-                            )
-                        html_lines.append("".join(parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-            elif dither == "floyd-steinberg":
-                err_curr = [0.0] * (width + 2)
-                err_next = [0.0] * (width + 2)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next = err_next, [0.0] * (width + 2)
-                    parts: list[str] = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        v = float(base) + err_curr[x + 1]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            idx = int(v * levels_m1 / 255.0 + 0.5)
-                            if idx < 0:
-                                idx = 0
-                            elif idx > levels_m1:
-                                idx = levels_m1
-                            qh = int(idx * 255.0 / levels_m1 + 0.5)
-                        err = v - float(qh)
-                        err_curr[x + 2] += err * (7.0 / 16.0)
-                        err_next[x + 0] += err * (3.0 / 16.0)
-                        err_next[x + 1] += err * (5.0 / 16.0)
-                        err_next[x + 2] += err * (1.0 / 16.0)
-
-                        ch = lut[qh]
-                        if mono:
-                            cr = cg = cb = qh
-                        else:
-                            cr, cg, cb = r, g, b
-                        parts.append(
-                            f'<span style="color:rgb({cr},{cg},{cb})">{html.escape(ch)}</span>'
-                        )
-                    html_lines.append("".join(parts))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-            else:  # atkinson
-                err_curr = [0.0] * (width + 4)
-                err_next = [0.0] * (width + 4)
-                err_next2 = [0.0] * (width + 4)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next, err_next2 = (
-                        err_next,
-                        err_next2,
-                        [0.0] * (width + 4),
-                    )
-                    parts = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        idx0 = x + 2
-                        v = float(base) + err_curr[idx0]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            qidx = int(v * levels_m1 / 255.0 + 0.5)
-                            if qidx < 0:
-                                qidx = 0
-                            elif qidx > levels_m1:
-                                qidx = levels_m1
-                            qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                        err = (v - float(qh)) / 8.0
-                        err_curr[idx0 + 1] += err
-                        err_curr[idx0 + 2] += err
-                        err_next[idx0 - 1] += err
-                        err_next[idx0 + 0] += err
-                        err_next[idx0 + 1] += err
-                        err_next2[idx0 + 0] += err
-
-                        ch = lut[qh]
-                        if mono:
-                            cr = cg = cb = qh
-                        else:
-                            cr, cg, cb = r, g, b
-                        parts.append(
-                            f'<span style="color:rgb({cr},{cg},{cb})">{html.escape(ch)}</span>'
-                        )
-                    html_lines.append("".join(parts))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-        elif output_format == "ansi":
-            assert ansi_lines is not None
-            if dither == "none":
-                if is_avg:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        parts: list[str] = []
-                        off = 0
-                        if mono:
-                            for _ in range(width):
-                                r = row[off]
-                                g = row[off + 1]
-                                b = row[off + 2]
-                                off += 3
-                                h = (r + g + b) // 3
-                                ch = lut[h]
-                                parts.append(f"\x1b[38;2;{h};{h};{h}m{ch}")
-                        else:
-                            for _ in range(width):
-                                r = row[off]
-                                g = row[off + 1]
-                                b = row[off + 2]
-                                off += 3
-                                h = (r + g + b) // 3
-                                ch = lut[h]
-                                parts.append(f"\x1b[38;2;{r};{g};{b}m{ch}")
-                        ansi_lines.append("".join(parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-                else:
-                    for y in range(height):
-                        row = rgb_bytes[y * stride : (y + 1) * stride]
-                        parts: list[str] = []
-                        off = 0
-                        if mono:
-                            for _ in range(width):
-                                r = row[off]
-                                g = row[off + 1]
-                                b = row[off + 2]
-                                off += 3
-                                h = (wr * r + wg * g + wb * b) >> 8
-                                ch = lut[h]
-                                parts.append(f"\x1b[38;2;{h};{h};{h}m{ch}")
-                        else:
-                            for _ in range(width):
-                                r = row[off]
-                                g = row[off + 1]
-                                b = row[off + 2]
-                                off += 3
-                                h = (wr * r + wg * g + wb * b) >> 8
-                                ch = lut[h]
-                                parts.append(f"\x1b[38;2;{r};{g};{b}m{ch}")
-                        ansi_lines.append("".join(parts))
-                        if progress:
-                            progress.update(1)
-                        if progress_callback:
-                            progress_callback(y + 1, height)
-            elif dither == "floyd-steinberg":
-                err_curr = [0.0] * (width + 2)
-                err_next = [0.0] * (width + 2)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next = err_next, [0.0] * (width + 2)
-                    parts = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        v = float(base) + err_curr[x + 1]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            idx = int(v * levels_m1 / 255.0 + 0.5)
-                            if idx < 0:
-                                idx = 0
-                            elif idx > levels_m1:
-                                idx = levels_m1
-                            qh = int(idx * 255.0 / levels_m1 + 0.5)
-                        err = v - float(qh)
-                        err_curr[x + 2] += err * (7.0 / 16.0)
-                        err_next[x + 0] += err * (3.0 / 16.0)
-                        err_next[x + 1] += err * (5.0 / 16.0)
-                        err_next[x + 2] += err * (1.0 / 16.0)
-
-                        ch = lut[qh]
-                        if mono:
-                            parts.append(f"\x1b[38;2;{qh};{qh};{qh}m{ch}")
-                        else:
-                            parts.append(f"\x1b[38;2;{r};{g};{b}m{ch}")
-                    ansi_lines.append("".join(parts))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-            else:  # atkinson
-                err_curr = [0.0] * (width + 4)
-                err_next = [0.0] * (width + 4)
-                err_next2 = [0.0] * (width + 4)
-                for y in range(height):
-                    row = rgb_bytes[y * stride : (y + 1) * stride]
-                    err_curr, err_next, err_next2 = (
-                        err_next,
-                        err_next2,
-                        [0.0] * (width + 4),
-                    )
-                    parts = []
-                    off = 0
-                    for x in range(width):
-                        r = row[off]
-                        g = row[off + 1]
-                        b = row[off + 2]
-                        off += 3
-                        base = (
-                            (r + g + b) // 3
-                            if is_avg
-                            else (wr * r + wg * g + wb * b) >> 8
-                        )
-                        idx0 = x + 2
-                        v = float(base) + err_curr[idx0]
-                        if v < 0.0:
-                            v = 0.0
-                        elif v > 255.0:
-                            v = 255.0
-                        if levels_m1 <= 0:
-                            qh = 0
-                        else:
-                            qidx = int(v * levels_m1 / 255.0 + 0.5)
-                            if qidx < 0:
-                                qidx = 0
-                            elif qidx > levels_m1:
-                                qidx = levels_m1
-                            qh = int(qidx * 255.0 / levels_m1 + 0.5)
-                        err = (v - float(qh)) / 8.0
-                        err_curr[idx0 + 1] += err
-                        err_curr[idx0 + 2] += err
-                        err_next[idx0 - 1] += err
-                        err_next[idx0 + 0] += err
-                        err_next[idx0 + 1] += err
-                        err_next2[idx0 + 0] += err
-
-                        ch = lut[qh]
-                        if mono:
-                            parts.append(f"\x1b[38;2;{qh};{qh};{qh}m{ch}")
-                        else:
-                            parts.append(f"\x1b[38;2;{r};{g};{b}m{ch}")
-                    ansi_lines.append("".join(parts))
-                    if progress:
-                        progress.update(1)
-                    if progress_callback:
-                        progress_callback(y + 1, height)
-        if progress:
-            progress.close()
-
-        if output_format != "ansi":
-            os.makedirs(output_dir, exist_ok=True)
-            file_stem = f"O_h_{bg_brightness}_f_{scale_factor}_{base_name}"
-            if n_frames > 1:
-                file_stem += f"_{frame_index}"
-
-            if output_format == "image":
-                assert output_image is not None
-                if assemble_gif:
-                    gif_frames.append(output_image)
-                    gif_durations.append(frame_duration_ms)
-                else:
-                    output_image.save(os.path.join(output_dir, file_stem + ".png"))
+        def _rows_done(y: int, rows: int) -> None:
+            # `rows` rows up to and including `y` are finished.
+            if progress:
+                progress.update(rows)
+            if progress_callback:
+                progress_callback(y + 1, height)
+
+        output_image: Image.Image | None = None
+        lines: list[str] | Iterator[str] | None = None
+        html_page: str | None = None
+        grid_rows: list[list[str]] | None = None
+        grid_colors: list[bytes] | None = None
+        if output_format in ("image", "array"):
+            output_image, out = _render_raster(
+                cell_rows,
+                opts,
+                frame_rgb=frame_rgb,
+                half_rgb=half_rgb,
+                half_gray=half_gray,
+                chars=glyph_chars,
+                font=fnt,
+                font_key=font_key,
+                out=out,
+                session=session,
+                png_writer_factory=png_writer_factory,
+                rows_done=_rows_done,
+            )
+        elif output_format == "html" and opts.html_mode == "canvas":
+            assert html_classes is not None
+            html_page = _html_canvas_page(
+                cell_rows,
+                html_classes,
+                gray_im=gray_im,
+                lut=cs.lut,
+                cell_index=cell_index,
+                chars=glyph_chars,
+                dither=opts.dither,
+                bg_brightness=bg_brightness,
+                rows_done=_rows_done,
+            )
+        elif output_format in TEXT_FORMATS:
+            row_lines: Iterator[str]
+            if half_rgb is not None and output_format == "ansi":
+                row_lines = _ansi_half_rows(
+                    half_rgb, bg_rgb, opts.ansi_palette, opts.ansi_tolerance
+                )
+            elif half_rgb is not None and html_classes is not None:
+                row_lines = _html_half_compact_rows(half_rgb, html_classes, bg_rgb)
+            elif half_rgb is not None:
+                row_lines = _html_half_span_rows(half_rgb, bg_rgb)
             elif output_format == "text":
-                assert text_lines is not None
-                lines = text_lines
-                with open(
-                    os.path.join(output_dir, file_stem + ".txt"), "w", encoding="utf-8"
-                ) as fh:
-                    fh.write("\n".join(lines))
-            elif output_format == "html":
-                assert html_lines is not None
-                html_content = "<br>\n".join(html_lines)
-                head = f"<head><meta charset='utf-8'>{html_css or ''}</head>"
-                pre_open = (
-                    "<pre class='ascii'>"
-                    if html_css
-                    else "<pre style='font-family:monospace;'>"
+                # Plain text stays rectangular; only markup formats are trimmed.
+                if opts.dither == "none" and cell_index is None:
+                    row_lines = _text_rows(gray_im, cs.table)
+                elif cell_index is not None:
+                    row_lines = _index_text_rows(cell_index[1], width, cell_index[0])
+                else:
+                    row_lines = ("".join(cells) for cells, _ in cell_rows)
+            elif output_format == "html" and html_classes is not None:
+                row_lines = _html_compact_rows(
+                    cell_rows, html_classes, glyph_chars, bg_rgb
                 )
-                page = (
-                    f"<html>{head}<body style='background-color:rgb({bg_brightness},{bg_brightness},{bg_brightness});'>"
-                    f"{pre_open}{html_content}</pre></body></html>"
+            elif output_format == "html":
+                row_lines = _html_span_rows(cell_rows, glyph_chars, bg_rgb)
+            else:
+                row_lines = _ansi_rows(
+                    cell_rows,
+                    glyph_chars,
+                    bg_rgb,
+                    opts.ansi_palette,
+                    opts.ansi_tolerance,
                 )
-                with open(
-                    os.path.join(output_dir, file_stem + ".html"), "w", encoding="utf-8"
-                ) as fh:
-                    fh.write(page)
-        else:
-            assert ansi_lines is not None
-            sys.stdout.write("\n")
-            for line in ansi_lines:
-                sys.stdout.write(line + "\x1b[0m\n")
-
-    if assemble_gif and gif_frames:
-        os.makedirs(output_dir, exist_ok=True)
-        gif_stem = f"O_h_{bg_brightness}_f_{scale_factor}_{base_name}"
-        gif_path = os.path.join(output_dir, gif_stem + ".gif")
-        if gif_fps is not None:
-            frame_ms = max(1, int(1000.0 / float(gif_fps)))
-            duration = [frame_ms] * len(gif_frames)
-        else:
-            duration = gif_durations if gif_durations else 40
-        try:
-            gif_frames[0].save(
-                gif_path,
-                save_all=True,
-                append_images=gif_frames[1:],
-                duration=duration,
-                loop=gif_loop,
-            )
-        except OSError as exc:
-            print(f"Could not write GIF '{gif_path}': {exc}")
-
-
-def convert_video(
-    video_path=None,
-    scale_factor=0.2,
-    bg_brightness=30,
-    output_dir="./assets/output",
-    output_format="image",
-    assemble=False,
-    video_out: str | None = None,
-    mono=False,
-    font_path=None,
-    grayscale_mode: str = "avg",
-    dither: str = "none",
-    cell_width: int = ONE_CHAR_WIDTH,
-    cell_height: int = ONE_CHAR_HEIGHT,
-):
-    """Convert a video or webcam stream to ASCII using ``convert_image`` for each frame.
-
-    Args:
-        video_path: Path to a video file. If ``None`` the default webcam is used.
-        scale_factor: Scaling factor for each frame.
-        bg_brightness: Background brightness for the output.
-        output_dir: Directory to store generated frames.
-        output_format: Output format passed to ``convert_image``.
-        assemble: Legacy flag. Prefer ``video_out``.
-        video_out: One of: ``frames`` (default), ``gif``, ``mp4``.
-        mono: Render frames in grayscale instead of colour.
-        font_path: Optional path to a TTF font used for rendering.
-    """
-
-    import cv2
-    import shutil
-    import subprocess
 
-    out_mode = video_out or ("gif" if assemble else "frames")
-    if out_mode not in ("frames", "gif", "mp4"):
-        raise ValueError("video_out must be one of: frames, gif, mp4")
-
-    cap = cv2.VideoCapture(0 if video_path is None else video_path)
-    if not cap.isOpened():
-        print("Could not open video source")
-        return
+            def _lines() -> Iterator[str]:
+                for y, line in enumerate(row_lines):
+                    yield line
+                    _rows_done(y, 1)
+                if progress:
+                    progress.close()
+
+            # Lazy rows are rendered as the caller consumes them; the progress
+            # bar is closed by the generator once the last row is done.
+            lines = _lines() if lazy else list(_lines())
+        elif output_format == "grid":
+            # Only the character grid is kept; tiles are rendered from it.
+            grid_rows = []
+            grid_colors = []
+            for y, (row_cells, row_colors) in enumerate(cell_rows):
+                grid_rows.append(row_cells)
+                grid_colors.append(row_colors)
+                _rows_done(y, 1)
+        if progress and lines is None:
+            progress.close()
 
-    base = "webcam" if video_path is None else Path(video_path).stem
-    frames_for_gif = []
-    frame_index = 0
+        return RenderResult(
+            output_format=output_format,
+            size=(width, height),
+            bg_brightness=bg_brightness,
+            image=output_image,
+            array=out,
+            lines=lines,
+            css=html_css,
+            page=html_page,
+            rows=grid_rows,
+            colors=grid_colors,
+        )
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames <= 0:
-        total_frames = None
-    progress = loader(total=total_frames, desc="Frames")
+    def convert(
+        self,
+        input_name: Any,
+        scale_factor: float = 0.2,
+        bg_brightness: int = 30,
+        output_dir: str = "./assets/output",
+        output_format: str = "image",
+        base_name: str | None = None,
+        mono: bool = False,
+        font_path: str | None = None,
+        grayscale_mode: str = "avg",
+        dither: str = "none",
+        assemble: bool = False,
+        gif_fps: float | None = None,
+        gif_loop: int = 0,
+        cell_width: int = ONE_CHAR_WIDTH,
+        cell_height: int = ONE_CHAR_HEIGHT,
+        html_mode: str = "spans",
+        progress_callback: Callable[[int, int], None] | None = None,
+        png_stream: bool = False,
+        png_compress_level: int = 6,
+        png_filter: str = "none",
+        tile_size: int = 256,
+        workers: int = 1,
+        image_codec: str = "png",
+        png_optimize: bool = False,
+        webp_quality: int = 80,
+        colors: int | None = None,
+        fg_color: str | tuple[int, int, int] | None = None,
+        invert: bool = False,
+        contrast: float = 1.0,
+        gamma: float = 1.0,
+        levels: tuple[int, int] | None = None,
+        auto_levels: bool = False,
+        grid_size: tuple[int, int] | None = None,
+        session: FrameSession | None = None,
+        output_file: str | os.PathLike[str] | BinaryIO | None = None,
+        mapping: str = "brightness",
+        edges: bool = False,
+        edge_threshold: float = EDGE_THRESHOLD,
+        mode: str = "ascii",
+        ansi_tolerance: int = 0,
+        ansi_palette: str = "truecolor",
+    ) -> None:
+        """
+        Converts an image file to an ASCII art representation, and saves the output
+        image to ``output_dir`` with a filename that includes the chosen parameters
+        and the input filename.
+
+        Args:
+            input_name (str):   The name of the image file to be converted, including the
+                                file extension. A binary file object (such as
+                                ``sys.stdin.buffer``), a PIL image, a
+                                :class:`~ascii_art.pixelbuffer.PixelBuffer` or a
+                                NumPy array is converted in memory and named
+                                after `base_name` (default ``frame``).
+            scale_factor (float):   The scaling factor for the output image. Default is 0.2,
+                                    which means the output image will be 20% of the size of the
+                                    input image times the width and height of one character.
+            bg_brightness (int):    The brightness level of the output image background. Default is
+                                    30, which is close to medium gray.
+            output_dir (str):   Directory where the resulting image will be saved.
+                                Defaults to ``./assets/output``.
+            mono (bool): Render characters in grayscale instead of colour. With
+                `output_format=image` the canvas is a single-channel `L` image.
+            font_path (str, optional): Path to a TTF font used for rendering.
+            grayscale_mode (str): How RGB pixels are mapped to a single brightness
+                value for character selection. One of:
+                - `avg`: average of channels (current behavior)
+                - `luma601`: BT.601 luma (integer approximation)
+                - `luma709`: BT.709 luma (integer approximation)
+            dither (str): Optional error-diffusion dithering applied to brightness
+                before character selection. One of: `none`, `floyd-steinberg`,
+                `atkinson`.
+            assemble (bool): If the input is an animated image and `output_format`
+                is `image`, assemble frames into a single animated GIF.
+            gif_fps (float, optional): When assembling an animated GIF, override the
+                per-frame duration using a fixed frames-per-second value.
+            gif_loop (int): When assembling an animated GIF, the GIF loop count
+                passed to Pillow. 0 means loop forever.
+            cell_width (int): Width (in pixels) of one character cell when rendering
+                `format=image`. Also used for aspect correction when resizing.
+            cell_height (int): Height (in pixels) of one character cell when
+                rendering `format=image`. Also used for aspect correction when
+                resizing.
+            html_mode (str): HTML output mode when `output_format=html`.
+                - `spans`: one span per character with inline styles (smaller code complexity)
+                - `compact`: CSS classes + run grouping (smaller HTML output).
+                  With a `session` every frame reuses the first frame's palette.
+                - `canvas`: the character and colour grids embedded as one
+                  (deflated) base64 payload, drawn by an inline script onto a
+                  ``<canvas>`` one viewport at a time (smallest output; needs
+                  JavaScript). Not available with `mode='halfblock'`.
+            progress_callback (callable, optional): Callback invoked as
+                ``progress_callback(current, total)`` to report the number of
+                processed rows.
+            png_stream (bool): When `output_format=image`, render one row of
+                cells at a time and deflate it straight to the PNG file via
+                :class:`~ascii_art.pngstream.StreamingPNGWriter` instead of
+                allocating the full canvas. Ignored when assembling a GIF.
+            png_compress_level (int): zlib level (0-9) used for PNG output.
+            png_filter (str): PNG scanline filter used when `png_stream` is set.
+                One of: `none`, `sub`, `up`.
+            tile_size (int): Tile edge length in pixels for `output_format=dzi`,
+                which writes a Deep Zoom pyramid (``<stem>.dzi`` manifest plus
+                ``<stem>_files/<level>/<col>_<row>.png`` tiles) instead of a
+                single image.
+            workers (int): Number of worker processes used to render DZI tiles.
+            image_codec (str): Encoder for `output_format=image`, one of
+                `png`, `webp`, `webp-lossless`, `qoi`, `bmp`, `ppm` (see
+                :func:`save_image`).
+            png_optimize (bool): Let Pillow search for the smallest PNG encoding
+                (much slower to write).
+            webp_quality (int): Quality (0-100) for `image_codec=webp`.
+            colors (int, optional): Quantize the colour grid once to at most
+                this many colours (1-255) and render `output_format=image` into a
+                palette (`P`) canvas. Ignored when `mono` is set.
+            fg_color (str or tuple, optional): Draw every character in this one
+                colour (any Pillow colour string such as ``"#f0f0f0"`` or
+                ``"white"``, or an RGB tuple) instead of per-cell colours. Takes
+                precedence over `mono` and `colors`. For `output_format=image`
+                each row of cells is composited in a single paste; a gray
+                colour renders onto a single-channel `L` canvas.
+            invert (bool): Invert brightness before character selection. Like
+                the other tone controls below, this is fused into one 256-entry
+                table applied to the brightness plane in C. Tone controls change
+                character choice and `mono` gray levels, not colour output.
+            contrast (float): Contrast factor around mid-gray (1.0 = unchanged).
+            gamma (float): Gamma applied to brightness; values above 1 brighten
+                midtones (1.0 = unchanged).
+            levels (tuple, optional): ``(black, white)`` input levels stretched
+                to the full 0-255 range.
+            auto_levels (bool): Pick `levels` per frame from the brightness
+                histogram (0.5% of pixels may clip at each end).
+            grid_size (tuple, optional): ``(columns, rows)`` of the character
+                grid, overriding the size derived from `scale_factor`.
+            session (FrameSession, optional): Buffer pool to reuse across
+                calls, e.g. for the frames of a video. The frames of an
+                animated input always share one pool, except when they are
+                assembled into a GIF (which keeps every canvas).
+            output_file (str or file, optional): Write the output to this path
+                or binary file object (for example ``sys.stdout.buffer``)
+                instead of a generated file name in `output_dir`. `ansi`
+                output then goes there instead of stdout. The frames of an
+                animated input are written one after another, and an
+                assembled GIF is written as a single file. No progress bar is
+                shown. Not supported for `dzi`.
+            mapping (str): How characters are chosen. `brightness` (default)
+                maps one gray sample per cell through the character ramp.
+                `shape` samples every cell as 2x3 sub-cells and picks the
+                glyph whose ink layout matches best (through a lookup table
+                built once per font, cell size and charset), which keeps
+                edges and thin lines visible at a lower `scale_factor`.
+                Requires NumPy; not combinable with `dither`.
+            edges (bool): Show cells on a strong brightness edge as the
+                directional glyph ``|``, ``/``, ``\\``, ``-`` or ``_`` along
+                it; other cells keep their mapped character. Gradients are
+                a Sobel filter over the per-cell gray plane. Requires NumPy.
+            edge_threshold (float): Minimum edge strength for `edges`, where
+                a hard black-to-white step measures 255. Defaults to 64.
+            mode (str): What every cell shows. `ascii` (default) draws a
+                character chosen by `mapping`. `braille` samples each cell
+                as 2x4 sub-pixels, turns them on at brightness 128 and above
+                (or Floyd-Steinberg dithers them with
+                `dither='floyd-steinberg'`) and shows the matching braille
+                dot pattern: eight samples per character. Requires NumPy;
+                not combinable with `mapping='shape'` or `edges`.
+                `halfblock` samples two pixels per cell vertically and shows
+                them as an upper half block (``▀``) in the top colour on
+                the bottom colour, doubling the vertical resolution. Only
+                `image`, `html` and `ansi` output; no `mapping='shape'`,
+                `edges`, `dither` or `fg_color`.
+            ansi_tolerance (int): For `output_format=ansi`, the largest
+                per-channel difference (0-255) at which a cell keeps the
+                colour of the run before it. A colour escape is only written
+                when a cell leaves its run, so ``0`` (default) merges
+                identical colours and a small tolerance such as 8 merges
+                near-identical ones into far fewer escapes. Only used with
+                the `truecolor` palette.
+            ansi_palette (str): Colour depth of `output_format=ansi`.
+                `truecolor` (default) writes 24-bit colours; `256` maps
+                every cell to the xterm colour cube and gray ramp and `16`
+                to the system colours, for terminals and viewers without
+                truecolor. The mapping is one lookup per cell in a 32x32x32
+                table that is built once and cached in the user cache
+                directory.
+
+        Returns:
+            None. The output image is saved to a file.
+
+        Example:
+            If the "./assets/input/" directory contains an image file called
+            ``image1.jpg``, calling ``convert("image1.jpg", 0.1, 50)`` will
+            create an ASCII art representation of the image with a scale factor of
+            0.1 and a background brightness level of 50, and save the output image
+            to ``./assets/output/O_h:50_f_0.1_image1.jpg``.
+        """
+
+        def _resolve_input_image(name, default_base_name: str) -> tuple[Any, str]:
+            if hasattr(name, "read"):
+                return _open_image(name), default_base_name
+            if not isinstance(name, (str, os.PathLike)):
+                return _as_frame(name), default_base_name
+            name = os.fspath(name)
+            input_path = (
+                name
+                if os.path.isabs(name) or os.path.exists(name)
+                else os.path.join("./assets/input", name)
+            )
+            try:
+                return Image.open(input_path), Path(name).stem
+            except FileNotFoundError:
+                print(f"Input file '{name}' not found", file=sys.stderr)
+                raise
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(frame_rgb)
-        frame_name = f"{base}_{frame_index:05d}"
-        convert_image(
-            pil_img,
+        try:
+            _im, resolved_base = _resolve_input_image(input_name, base_name or "frame")
+        except FileNotFoundError:
+            return
+        if base_name is None:
+            base_name = resolved_base
+
+        if output_format not in ("image", "text", "html", "ansi", "dzi"):
+            raise ValueError("output_format must be one of: image, text, html, ansi, dzi")
+
+        if gif_fps is not None and float(gif_fps) <= 0:
+            raise ValueError("gif_fps must be positive")
+        gif_loop = int(gif_loop)
+        if gif_loop < 0:
+            raise ValueError("gif_loop must be >= 0")
+
+        png_compress_level = int(png_compress_level)
+        if not 0 <= png_compress_level <= 9:
+            raise ValueError("png_compress_level must be between 0 and 9")
+        if png_filter not in PNG_FILTERS:
+            raise ValueError("png_filter must be one of: " + ", ".join(PNG_FILTERS))
+
+        if int(tile_size) <= 0:
+            raise ValueError("tile_size must be a positive integer")
+        if output_file is not None and output_format == "dzi":
+            raise ValueError("output_file is not supported with output_format='dzi'")
+
+        if image_codec not in IMAGE_CODECS:
+            raise ValueError("image_codec must be one of: " + ", ".join(IMAGE_CODECS))
+        if png_stream and image_codec != "png":
+            raise ValueError("png_stream requires image_codec='png'")
+        if not 0 <= int(webp_quality) <= 100:
+            raise ValueError("webp_quality must be between 0 and 100")
+
+        # DZI tiles are drawn from the character grid by ``write_dzi``.
+        opts = _RenderOptions.create(
+            output_format="grid" if output_format == "dzi" else output_format,
             scale_factor=scale_factor,
             bg_brightness=bg_brightness,
-            output_dir=output_dir,
-            output_format=output_format,
-            base_name=frame_name,
             mono=mono,
             font_path=font_path,
             grayscale_mode=grayscale_mode,
             dither=dither,
             cell_width=cell_width,
             cell_height=cell_height,
+            html_mode=html_mode,
+            colors=colors,
+            fg_color=fg_color,
+            invert=invert,
+            contrast=contrast,
+            gamma=gamma,
+            levels=levels,
+            auto_levels=auto_levels,
+            grid_size=grid_size,
+            mapping=mapping,
+            edges=edges,
+            edge_threshold=edge_threshold,
+            mode=mode,
+            ansi_tolerance=ansi_tolerance,
+            ansi_palette=ansi_palette,
+        )
+        # One immutable snapshot per call: concurrent set_chars() calls never
+        # mix two charsets within a conversion.
+        cs = self.charset
+
+        is_animated = getattr(_im, "is_animated", False)
+        n_frames = int(getattr(_im, "n_frames", 1)) if is_animated else 1
+        frames_iter = ImageSequence.Iterator(_im) if is_animated else (_im,)
+
+        assemble_gif = (
+            bool(assemble) and is_animated and output_format == "image" and n_frames > 1
         )
-        if out_mode == "gif" and output_format == "image":
+        gif_frames: list[Image.Image] = []
+        gif_durations: list[int] = []
+        # Every frame is written out before the next one reuses its buffers.
+        pool = None if assemble_gif else (session or FrameSession())
+
+        with _output_stream(output_file) as out_fh:
+            for frame_index, frame in enumerate(frames_iter):
+                if is_animated:
+                    frame = frame.copy()
+                frame_duration_ms = int(getattr(frame, "info", {}).get("duration", 40))
+                file_stem = f"O_h_{bg_brightness}_f_{scale_factor}_{base_name}"
+                if n_frames > 1:
+                    file_stem += f"_{frame_index}"
+
+                png_writer_factory = None
+                if output_format == "image" and png_stream and not assemble_gif:
+
+                    def png_writer_factory(size, mode, palette, _stem=file_stem):
+                        if out_fh is None:
+                            os.makedirs(output_dir, exist_ok=True)
+                        return StreamingPNGWriter(
+                            out_fh or os.path.join(output_dir, _stem + ".png"),
+                            size,
+                            mode,
+                            compress_level=png_compress_level,
+                            filter_type=png_filter,
+                            palette=palette,
+                        )
+
+                result = self._render_frame(
+                    frame,
+                    opts,
+                    charset=cs,
+                    session=pool,
+                    progress_callback=progress_callback,
+                    # The progress bar would interleave with ANSI rows streamed
+                    # to the same terminal, or with output sent to stdout.
+                    progress_desc=(
+                        None
+                        if output_format == "ansi" or out_fh is not None
+                        else f"Frame {frame_index + 1}/{n_frames}"
+                        if n_frames > 1
+                        else "Rows"
+                    ),
+                    png_writer_factory=png_writer_factory,
+                    lazy=output_format in TEXT_FORMATS,
+                )
+
+                if out_fh is not None and not assemble_gif:
+                    if output_format in TEXT_FORMATS:
+                        _write_document(result.iter_document(), out_fh)
+                    elif result.image is not None:
+                        write_image(
+                            result.image,
+                            out_fh,
+                            codec=image_codec,
+                            png_compress_level=png_compress_level,
+                            png_optimize=png_optimize,
+                            webp_quality=webp_quality,
+                        )
+                    continue
+
+                if output_format == "ansi":
+                    # Rows reach the terminal while the rest are still rendered.
+                    stdout = getattr(sys.stdout, "buffer", None)
+                    if stdout is None:
+                        sys.stdout.write("\n")
+                        for chunk in result.iter_document():
+                            sys.stdout.write(chunk)
+                    else:
+                        sys.stdout.flush()
+                        stdout.write(b"\n")
+                        _write_document(result.iter_document(), stdout)
+                        stdout.flush()
+                    continue
+
+                if output_format == "image":
+                    if assemble_gif:
+                        assert result.image is not None
+                        gif_frames.append(result.image)
+                        gif_durations.append(frame_duration_ms)
+                    elif result.image is not None:
+                        os.makedirs(output_dir, exist_ok=True)
+                        save_image(
+                            result.image,
+                            os.path.join(output_dir, file_stem),
+                            codec=image_codec,
+                            png_compress_level=png_compress_level,
+                            png_optimize=png_optimize,
+                            webp_quality=webp_quality,
+                        )
+                elif output_format in ("text", "html"):
+                    ext = ".txt" if output_format == "text" else ".html"
+                    os.makedirs(output_dir, exist_ok=True)
+                    with open(
+                        os.path.join(output_dir, file_stem + ext),
+                        "wb",
+                        buffering=STREAM_BUFFER_SIZE,
+                    ) as fh:
+                        _write_document(result.iter_document(), fh)
+                elif output_format == "dzi":
+                    assert result.rows is not None and result.colors is not None
+                    fnt = self.font(opts.font_path, opts.cell_height)
+                    os.makedirs(output_dir, exist_ok=True)
+                    write_dzi(
+                        result.rows,
+                        result.colors,
+                        masks=_glyph_masks(
+                            font=fnt,
+                            cell_width=opts.cell_width,
+                            cell_height=opts.cell_height,
+                            font_key=str(
+                                getattr(fnt, "path", "") or font_path or "default"
+                            ),
+                            chars=cs.chars + opts.extra_chars,
+                        ),
+                        cell_width=opts.cell_width,
+                        cell_height=opts.cell_height,
+                        bg_color=(bg_brightness, bg_brightness, bg_brightness),
+                        output_dir=output_dir,
+                        stem=file_stem,
+                        tile_size=tile_size,
+                        workers=workers,
+                    )
+
+            if assemble_gif and gif_frames:
+                gif_stem = f"O_h_{bg_brightness}_f_{scale_factor}_{base_name}"
+                gif_path: Any = out_fh
+                if out_fh is None:
+                    os.makedirs(output_dir, exist_ok=True)
+                    gif_path = os.path.join(output_dir, gif_stem + ".gif")
+                if gif_fps is not None:
+                    frame_ms = max(1, int(1000.0 / float(gif_fps)))
+                    duration = [frame_ms] * len(gif_frames)
+                else:
+                    duration = gif_durations if gif_durations else 40
+                try:
+                    gif_frames[0].save(
+                        gif_path,
+                        format="GIF",
+                        save_all=True,
+                        append_images=gif_frames[1:],
+                        duration=duration,
+                        loop=gif_loop,
+                    )
+                except OSError as exc:
+                    print(f"Could not write GIF '{gif_path}': {exc}", file=sys.stderr)
+
+    def convert_video(
+        self,
+        video_path=None,
+        scale_factor=0.2,
+        bg_brightness=30,
+        output_dir="./assets/output",
+        output_format="image",
+        assemble=False,
+        video_out: str | None = None,
+        mono=False,
+        font_path=None,
+        grayscale_mode: str = "avg",
+        dither: str = "none",
+        cell_width: int = ONE_CHAR_WIDTH,
+        cell_height: int = ONE_CHAR_HEIGHT,
+        invert: bool = False,
+        contrast: float = 1.0,
+        gamma: float = 1.0,
+        levels: tuple[int, int] | None = None,
+        auto_levels: bool = False,
+        mapping: str = "brightness",
+        edges: bool = False,
+        edge_threshold: float = EDGE_THRESHOLD,
+        mode: str = "ascii",
+        html_mode: str = "spans",
+        ansi_tolerance: int = 0,
+        ansi_palette: str = "truecolor",
+        colors: int | None = None,
+        fg_color: str | tuple[int, int, int] | None = None,
+        image_codec: str = "png",
+        png_compress_level: int = 6,
+        png_optimize: bool = False,
+        webp_quality: int = 80,
+    ):
+        """Convert a video or webcam stream to ASCII using :meth:`convert` for each frame.
+
+        Args:
+            video_path: Path to a video file. If ``None`` the default webcam is used.
+            scale_factor: Scaling factor for each frame.
+            bg_brightness: Background brightness for the output.
+            output_dir: Directory to store generated frames.
+            output_format: Output format passed to :meth:`convert`.
+            assemble: Legacy flag. Prefer ``video_out``.
+            video_out: One of: ``frames`` (default), ``gif``, ``mp4``.
+            mono: Render frames in grayscale instead of colour.
+            font_path: Optional path to a TTF font used for rendering.
+            invert / contrast / gamma / levels / auto_levels: Tone controls
+                passed to :meth:`convert`.
+            mapping: Character selection, ``brightness`` or ``shape`` (see
+                :meth:`convert`).
+            edges / edge_threshold: Directional edge glyphs (see
+                :meth:`convert`).
+            mode: ``ascii``, ``braille`` or ``halfblock`` cells (see
+                :meth:`convert`).
+            html_mode / ansi_tolerance / ansi_palette: Markup of ``html``
+                frames and colour output of ``ansi`` frames (see
+                :meth:`convert`).
+            colors / fg_color: Palette size and single glyph colour (see
+                :meth:`convert`).
+            image_codec / png_compress_level / png_optimize / webp_quality:
+                Encoder of ``image`` frames (see :meth:`convert`). ``gif`` and
+                ``mp4`` assembly read the frames back in that format.
+        """
+
+        import cv2
+        import shutil
+        import subprocess
+
+        out_mode = video_out or ("gif" if assemble else "frames")
+        if out_mode not in ("frames", "gif", "mp4"):
+            raise ValueError("video_out must be one of: frames, gif, mp4")
+
+        if image_codec not in IMAGE_CODECS:
+            raise ValueError("image_codec must be one of: " + ", ".join(IMAGE_CODECS))
+        ext = IMAGE_CODECS[image_codec][0]
+
+        cap = cv2.VideoCapture(0 if video_path is None else video_path)
+        if not cap.isOpened():
+            print("Could not open video source", file=sys.stderr)
+            return
+
+        base = "webcam" if video_path is None else Path(video_path).stem
+        frames_for_gif = []
+        frame_index = 0
+        session = FrameSession()
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            total_frames = None
+        progress = loader(total=total_frames, desc="Frames")
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_name = f"{base}_{frame_index:05d}"
+            # OpenCV frames are BGR; they are sampled in place, no cvtColor.
+            self.convert(
+                PixelBuffer.from_array(frame, "BGR"),
+                scale_factor=scale_factor,
+                bg_brightness=bg_brightness,
+                output_dir=output_dir,
+                output_format=output_format,
+                base_name=frame_name,
+                mono=mono,
+                font_path=font_path,
+                grayscale_mode=grayscale_mode,
+                dither=dither,
+                cell_width=cell_width,
+                cell_height=cell_height,
+                invert=invert,
+                contrast=contrast,
+                gamma=gamma,
+                levels=levels,
+                auto_levels=auto_levels,
+                session=session,
+                mapping=mapping,
+                edges=edges,
+                edge_threshold=edge_threshold,
+                mode=mode,
+                html_mode=html_mode,
+                ansi_tolerance=ansi_tolerance,
+                ansi_palette=ansi_palette,
+                colors=colors,
+                fg_color=fg_color,
+                image_codec=image_codec,
+                png_compress_level=png_compress_level,
+                png_optimize=png_optimize,
+                webp_quality=webp_quality,
+            )
+            if out_mode == "gif" and output_format == "image":
+                import imageio
+
+                out_path = os.path.join(
+                    output_dir,
+                    f"O_h_{bg_brightness}_f_{scale_factor}_{frame_name}{ext}",
+                )
+                frames_for_gif.append(imageio.imread(out_path))
+            frame_index += 1
+            progress.update(1)
+
+        cap.release()
+        progress.close()
+
+        if out_mode == "gif" and frames_for_gif:
             import imageio
 
-            out_path = os.path.join(
-                output_dir,
-                f"O_h_{bg_brightness}_f_{scale_factor}_{frame_name}.png",
+            gif_path = os.path.join(output_dir, f"{base}.gif")
+            imageio.mimsave(gif_path, frames_for_gif, fps=24)
+
+        if out_mode == "mp4" and output_format == "image":
+            ffmpeg = shutil.which("ffmpeg")
+            if not ffmpeg:
+                print(
+                    "ffmpeg not found; install it or use --video-out frames/gif",
+                    file=sys.stderr,
+                )
+                return
+
+            pattern = os.path.join(
+                output_dir, f"O_h_{bg_brightness}_f_{scale_factor}_{base}_%05d{ext}"
             )
-            frames_for_gif.append(imageio.imread(out_path))
-        frame_index += 1
-        progress.update(1)
+            out_path = os.path.join(output_dir, f"{base}.mp4")
+            cmd = [
+                ffmpeg,
+                "-y",
+                "-framerate",
+                "24",
+                "-i",
+                pattern,
+                "-c:v",
+                "libx264",
+                "-pix_fmt",
+                "yuv420p",
+                out_path,
+            ]
+            try:
+                subprocess.run(cmd, check=True)
+            except subprocess.CalledProcessError as exc:
+                print(f"ffmpeg failed with exit code {exc.returncode}", file=sys.stderr)
 
-    cap.release()
-    progress.close()
 
-    if out_mode == "gif" and frames_for_gif:
-        import imageio
+_DEFAULT_CONVERTER = Converter(char_array)
+_recompute_interval()
 
-        gif_path = os.path.join(output_dir, f"{base}.gif")
-        imageio.mimsave(gif_path, frames_for_gif, fps=24)
 
-    if out_mode == "mp4" and output_format == "image":
-        ffmpeg = shutil.which("ffmpeg")
-        if not ffmpeg:
-            print("ffmpeg not found; install it or use --video-out frames/gif")
-            return
+def _default_converter() -> Converter:
+    # Callers may assign ``char_array`` directly; pick that up lazily.
+    if tuple(char_array) != _DEFAULT_CONVERTER.charset.chars:
+        _recompute_interval()
+    return _DEFAULT_CONVERTER
 
-        pattern = os.path.join(
-            output_dir, f"O_h_{bg_brightness}_f_{scale_factor}_{base}_%05d.png"
-        )
-        out_path = os.path.join(output_dir, f"{base}.mp4")
-        cmd = [
-            ffmpeg,
-            "-y",
-            "-framerate",
-            "24",
-            "-i",
-            pattern,
-            "-c:v",
-            "libx264",
-            "-pix_fmt",
-            "yuv420p",
-            out_path,
-        ]
-        try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as exc:
-            print(f"ffmpeg failed with exit code {exc.returncode}")
+
+def convert_image(input_name: Any, *args: Any, **kwargs: Any) -> None:
+    """Convert an image with the default :class:`Converter`.
+
+    Accepts the same arguments as :meth:`Converter.convert`.
+    """
+    return _default_converter().convert(input_name, *args, **kwargs)
+
+
+def convert_video(*args: Any, **kwargs: Any) -> None:
+    """Convert a video with the default :class:`Converter`.
+
+    Accepts the same arguments as :meth:`Converter.convert_video`.
+    """
+    return _default_converter().convert_video(*args, **kwargs)
 
 
 def print_divider():
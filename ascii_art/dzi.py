@@ -0,0 +1,250 @@
+"""Deep Zoom (DZI) tile pyramid writer for very large ASCII renders.
+
+The full-resolution level is rendered tile by tile straight from the matching
+slice of the character grid, so the complete canvas is never materialized.
+Lower levels are built by merging and halving the four child tiles of the
+level above, which only ever keeps a handful of tiles in memory. Tile
+rendering can be spread over worker processes.
+
+Output layout (viewable with OpenSeadragon and other Deep Zoom viewers)::
+
+    <stem>.dzi                       XML manifest
+    <stem>_files/<level>/<col>_<row>.<format>
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Sequence
+
+from PIL import Image
+
+_RESAMPLE_BOX = getattr(getattr(Image, "Resampling", Image), "BOX")
+
+DZI_NAMESPACE = "http://schemas.microsoft.com/deepzoom/2008"
+
+# Per-process rendering state, filled by ``_init_tile_worker``.
+_TILE_CTX: dict[str, Any] = {}
+
+
+def _init_tile_worker(
+    mask_bytes: dict[str, bytes],
+    cell_width: int,
+    cell_height: int,
+    bg_color: tuple[int, int, int],
+) -> None:
+    _TILE_CTX["masks"] = {
+        ch: Image.frombytes("L", (cell_width, cell_height), data)
+        for ch, data in mask_bytes.items()
+    }
+    _TILE_CTX["cell"] = (cell_width, cell_height)
+    _TILE_CTX["bg"] = bg_color
+
+
+def _render_tile(task: tuple) -> None:
+    """Render one full-resolution tile from its slice of the cell grid."""
+    path, x0, y0, w, h, cx0, cy0, rows = task
+    masks = _TILE_CTX["masks"]
+    cell_width, cell_height = _TILE_CTX["cell"]
+    tile = Image.new("RGB", (w, h), color=_TILE_CTX["bg"])
+    paste = tile.paste
+    x_base = cx0 * cell_width - x0
+    y_pos = cy0 * cell_height - y0
+    bg = _TILE_CTX["bg"]
+    for row_cells, row_colors in rows:
+        x_pos = x_base
+        off = 0
+        for ch in row_cells:
+            mask = masks.get(ch)
+            if mask is not None:
+                color = (row_colors[off], row_colors[off + 1], row_colors[off + 2])
+                if color != bg:
+                    paste(color, (x_pos, y_pos), mask)
+            x_pos += cell_width
+            off += 3
+        y_pos += cell_height
+    tile.save(path)
+
+
+def _merge_tile(task: tuple) -> None:
+    """Build one lower-level tile by halving its (up to four) child tiles."""
+    path, size, children = task
+    w, h = size
+    merged_w = sum(cw for (_, cw, _, dx, dy) in children if dy == 0)
+    merged_h = sum(ch for (_, _, ch, dx, dy) in children if dx == 0)
+    merged = Image.new("RGB", (merged_w, merged_h))
+    for child_path, _, _, dx, dy in children:
+        with Image.open(child_path) as child:
+            merged.paste(child.convert("RGB"), (dx, dy))
+    merged.resize((w, h), _RESAMPLE_BOX).save(path)
+
+
+def _run(
+    func: Callable[[tuple], None],
+    tasks: Sequence[tuple],
+    pool: ProcessPoolExecutor | None,
+    workers: int,
+) -> None:
+    if pool is None:
+        for task in tasks:
+            func(task)
+        return
+    chunksize = max(1, len(tasks) // (4 * workers))
+    for _ in pool.map(func, tasks, chunksize=chunksize):
+        pass
+
+
+def level_sizes(width: int, height: int) -> list[tuple[int, int]]:
+    """Return the pixel size of every pyramid level, from 1x1 up to full size."""
+    max_level = int(math.ceil(math.log2(max(width, height, 1))))
+    return [
+        (
+            max(1, int(math.ceil(width / 2 ** (max_level - level)))),
+            max(1, int(math.ceil(height / 2 ** (max_level - level)))),
+        )
+        for level in range(max_level + 1)
+    ]
+
+
+def write_dzi(
+    rows: Sequence[Sequence[str]],
+    colors: Sequence[bytes],
+    *,
+    masks: dict[str, Image.Image],
+    cell_width: int,
+    cell_height: int,
+    bg_color: tuple[int, int, int],
+    output_dir: str | os.PathLike[str],
+    stem: str,
+    tile_size: int = 256,
+    tile_format: str = "png",
+    workers: int = 1,
+    progress_callback: Callable[[int, int], None] | None = None,
+) -> str:
+    """Write a Deep Zoom pyramid for a grid of coloured characters.
+
+    Args:
+        rows: One sequence of cell strings (``char_array`` entries) per grid row.
+        colors: Packed RGB bytes per grid row (3 bytes per character).
+        masks: Glyph masks (``L`` images of one cell) keyed by character.
+            Characters without a mask are not drawn.
+        cell_width / cell_height: Pixel size of one character cell.
+        bg_color: Background RGB colour.
+        output_dir: Directory receiving ``<stem>.dzi`` and ``<stem>_files``.
+        stem: Base name of the manifest and tile directory.
+        tile_size: Edge length of the square tiles in pixels.
+        tile_format: Tile image format extension (``png`` or ``jpg``).
+        workers: Number of worker processes. ``1`` renders in-process.
+        progress_callback: Called as ``progress_callback(done, total)`` after
+            each pyramid level.
+
+    Returns:
+        Path of the written ``.dzi`` manifest.
+    """
+    tile_size = int(tile_size)
+    if tile_size <= 0:
+        raise ValueError("tile_size must be a positive integer")
+    if tile_format not in ("png", "jpg"):
+        raise ValueError("tile_format must be one of: png, jpg")
+    grid_h = len(rows)
+    grid_w = len(rows[0]) if rows else 0
+    width = max(1, grid_w * cell_width)
+    height = max(1, grid_h * cell_height)
+    sizes = level_sizes(width, height)
+    max_level = len(sizes) - 1
+
+    files_dir = os.path.join(output_dir, f"{stem}_files")
+
+    def _tile_path(level: int, col: int, row: int) -> str:
+        return os.path.join(files_dir, str(level), f"{col}_{row}.{tile_format}")
+
+    def _tiles(level: int) -> Iterable[tuple[int, int, int, int, int, int]]:
+        lw, lh = sizes[level]
+        for row in range(int(math.ceil(lh / tile_size))):
+            for col in range(int(math.ceil(lw / tile_size))):
+                x0 = col * tile_size
+                y0 = row * tile_size
+                w = min(tile_size, lw - x0)
+                h = min(tile_size, lh - y0)
+                yield col, row, x0, y0, w, h
+
+    for level in range(max_level + 1):
+        os.makedirs(os.path.join(files_dir, str(level)), exist_ok=True)
+
+    full_tasks = []
+    for col, row, x0, y0, w, h in _tiles(max_level):
+        cx0 = x0 // cell_width
+        cx1 = min(grid_w, -(-(x0 + w) // cell_width))
+        cy0 = y0 // cell_height
+        cy1 = min(grid_h, -(-(y0 + h) // cell_height))
+        tile_rows = [
+            (rows[cy][cx0:cx1], bytes(colors[cy][cx0 * 3 : cx1 * 3]))
+            for cy in range(cy0, cy1)
+        ]
+        full_tasks.append(
+            (_tile_path(max_level, col, row), x0, y0, w, h, cx0, cy0, tile_rows)
+        )
+
+    # Glyphs without ink are left out; cells without a mask are skipped.
+    mask_bytes = {
+        ch: m.tobytes() for ch, m in masks.items() if m.getbbox() is not None
+    }
+    init_args = (mask_bytes, int(cell_width), int(cell_height), tuple(bg_color))
+    workers = max(1, int(workers))
+    pool = (
+        ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_tile_worker,
+            initargs=init_args,
+        )
+        if workers > 1
+        else None
+    )
+    try:
+        if pool is None:
+            _init_tile_worker(*init_args)
+        _run(_render_tile, full_tasks, pool, workers)
+        del full_tasks
+        if progress_callback:
+            progress_callback(1, max_level + 1)
+
+        for level in range(max_level - 1, -1, -1):
+            child_w, child_h = sizes[level + 1]
+            merge_tasks = []
+            for col, row, _, _, w, h in _tiles(level):
+                children = []
+                for dy in (0, 1):
+                    for dx in (0, 1):
+                        ccol, crow = 2 * col + dx, 2 * row + dy
+                        cx, cy = ccol * tile_size, crow * tile_size
+                        if cx >= child_w or cy >= child_h:
+                            continue
+                        children.append(
+                            (
+                                _tile_path(level + 1, ccol, crow),
+                                min(tile_size, child_w - cx),
+                                min(tile_size, child_h - cy),
+                                dx * tile_size,
+                                dy * tile_size,
+                            )
+                        )
+                merge_tasks.append((_tile_path(level, col, row), (w, h), children))
+            _run(_merge_tile, merge_tasks, pool, workers)
+            if progress_callback:
+                progress_callback(max_level + 1 - level, max_level + 1)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    manifest = os.path.join(output_dir, f"{stem}.dzi")
+    with open(manifest, "w", encoding="utf-8") as fh:
+        fh.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="{DZI_NAMESPACE}" TileSize="{tile_size}" Overlap="0" '
+            f'Format="{tile_format}">\n'
+            f'  <Size Width="{width}" Height="{height}"/>\n'
+            "</Image>\n"
+        )
+    return manifest
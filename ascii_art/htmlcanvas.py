@@ -0,0 +1,139 @@
+"""Canvas-drawn HTML pages for very large grids.
+
+``html_mode="canvas"`` does not write one element per cell or run. The page
+embeds the grid as two binary planes, the character index of every cell and
+its palette class, base64-encoded (and deflated when that is smaller), next
+to the character table and the palette. A short inline script decodes the
+planes and draws only the rows and columns inside the viewport onto a
+fixed ``<canvas>``, redrawing on scroll and resize; a spacer element the
+size of the full grid provides the scrollbars. The browser never lays out
+the grid, so page size and load time no longer grow with the markup.
+
+Payload layout (row-major, ``columns * rows`` cells each)::
+
+    index plane   uint8, or little-endian uint16 when "wide"
+    class plane   uint8 palette class per cell
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import zlib
+from typing import Sequence
+
+# Pixel height of one character cell; cells are as wide as the font's "M".
+FONT_SIZE = 16
+
+_SCRIPT = """\
+(async () => {
+  const g = JSON.parse(document.getElementById("grid").textContent);
+  let bytes = Uint8Array.from(atob(g.data), (c) => c.charCodeAt(0));
+  if (g.deflate) {
+    const stream = new Blob([bytes]).stream()
+      .pipeThrough(new DecompressionStream("deflate"));
+    bytes = new Uint8Array(await new Response(stream).arrayBuffer());
+  }
+  const n = g.cols * g.rows, size = g.wide ? 2 : 1;
+  const index = g.wide ? new Uint16Array(bytes.buffer, 0, n) : bytes;
+  const classes = bytes.subarray(n * size, n * size + n);
+  const colors = g.palette.map((c) => `rgb(${c[0]},${c[1]},${c[2]})`);
+  const blank = g.chars.map((c) => c.trim() === "");
+  const view = document.getElementById("view");
+  const ctx = view.getContext("2d");
+  const font = `${g.font}px monospace`;
+  ctx.font = font;
+  const cw = ctx.measureText("M").width, ch = g.font;
+  document.getElementById("grid-size").style.cssText =
+    `width:${g.cols * cw}px;height:${g.rows * ch}px`;
+  let pending = false;
+  function draw() {
+    pending = false;
+    const w = innerWidth, h = innerHeight, dpr = devicePixelRatio || 1;
+    const pw = Math.round(w * dpr), ph = Math.round(h * dpr);
+    if (view.width !== pw || view.height !== ph) {
+      view.width = pw;
+      view.height = ph;
+      view.style.width = `${w}px`;
+      view.style.height = `${h}px`;
+    }
+    ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+    ctx.fillStyle = g.background;
+    ctx.fillRect(0, 0, w, h);
+    ctx.font = font;
+    ctx.textBaseline = "top";
+    // Only the cells inside the viewport are drawn.
+    const x0 = Math.floor(scrollX / cw);
+    const x1 = Math.min(g.cols, Math.ceil((scrollX + w) / cw));
+    const y0 = Math.floor(scrollY / ch);
+    const y1 = Math.min(g.rows, Math.ceil((scrollY + h) / ch));
+    for (let y = y0; y < y1; y++) {
+      let style = -1;
+      for (let x = x0, i = y * g.cols + x0; x < x1; x++, i++) {
+        const k = index[i];
+        if (blank[k]) continue;
+        if (classes[i] !== style) {
+          style = classes[i];
+          ctx.fillStyle = colors[style];
+        }
+        ctx.fillText(g.chars[k], x * cw - scrollX, y * ch - scrollY);
+      }
+    }
+  }
+  function schedule() {
+    if (!pending) {
+      pending = true;
+      requestAnimationFrame(draw);
+    }
+  }
+  addEventListener("scroll", schedule, { passive: true });
+  addEventListener("resize", schedule);
+  draw();
+})();
+"""
+
+
+def canvas_page(
+    size: tuple[int, int],
+    chars: Sequence[str],
+    index: bytes,
+    palette: Sequence[tuple[int, int, int]],
+    classes: bytes,
+    bg_brightness: int,
+) -> str:
+    """Return the self-contained canvas page of one character grid.
+
+    Args:
+        size: ``(columns, rows)`` of the grid.
+        chars: Character (or multi-character cell) of every index.
+        index: Index plane, one byte per cell or two (little-endian).
+        palette: RGB colour of every class.
+        classes: Class plane, one byte per cell.
+        bg_brightness: Background gray level.
+    """
+    raw = index + classes
+    packed = zlib.compress(raw)
+    deflate = len(packed) < len(raw)
+    bg = f"rgb({bg_brightness},{bg_brightness},{bg_brightness})"
+    grid = {
+        "cols": size[0],
+        "rows": size[1],
+        "font": FONT_SIZE,
+        "background": bg,
+        "chars": list(chars),
+        "wide": len(index) > size[0] * size[1],
+        "palette": [list(rgb) for rgb in palette],
+        "deflate": deflate,
+        "data": base64.b64encode(packed if deflate else raw).decode("ascii"),
+    }
+    # "</" would end the <script> element early.
+    payload = json.dumps(grid, separators=(",", ":")).replace("</", "<\\/")
+    return (
+        "<html><head><meta charset='utf-8'><style>"
+        f"body{{margin:0;background-color:{bg};}}"
+        "#view{position:fixed;top:0;left:0;}"
+        "</style></head><body>"
+        "<canvas id='view'></canvas><div id='grid-size'></div>"
+        f"<script id='grid' type='application/json'>{payload}</script>"
+        f"<script>\n{_SCRIPT}</script></body></html>"
+    )
@@ -0,0 +1,158 @@
+"""Zero-copy input for frames that already live in memory.
+
+Video decoders, cameras and NumPy pipelines hand out frames as contiguous
+8-bit buffers, often in OpenCV's BGR order. :class:`PixelBuffer` describes
+such a buffer (size and channel order) without copying it. The converter then
+reads only the pixels of the downsized cell grid straight from the buffer and
+reorders their channels on the way, so neither ``cv2.cvtColor`` nor
+``Image.fromarray`` (nor the following ``convert("RGB")``) copies the full
+frame first.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import accumulate, repeat
+from typing import Any
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - numpy is optional
+    np = None
+
+_RESAMPLE_NEAREST = getattr(getattr(Image, "Resampling", Image), "NEAREST")
+
+# Channel order -> (bytes per pixel, Pillow raw mode decoding it to RGB or L).
+CHANNEL_ORDERS: dict[str, tuple[int, str]] = {
+    "RGB": (3, "RGB"),
+    "BGR": (3, "BGR"),
+    "RGBA": (4, "RGBX"),
+    "BGRA": (4, "BGRX"),
+    "L": (1, "L"),
+}
+
+# Source channel picked for each output channel.
+_CHANNEL_INDEX: dict[str, list[int]] = {
+    "RGB": [0, 1, 2],
+    "BGR": [2, 1, 0],
+    "RGBA": [0, 1, 2],
+    "BGRA": [2, 1, 0],
+    "L": [0],
+}
+
+_DEFAULT_ORDERS = {1: "L", 3: "RGB", 4: "RGBA"}
+
+
+def nearest_indices(n_in: int, n_out: int) -> list[int]:
+    """Return the source index Pillow's ``NEAREST`` resize samples per output.
+
+    Pillow walks the output by repeatedly adding ``n_in / n_out`` to a
+    half-step start; ``accumulate`` reproduces that float rounding exactly.
+    """
+    step = n_in / n_out
+    return [int(v) for v in accumulate(repeat(step, n_out - 1), initial=step * 0.5)]
+
+
+@dataclass(frozen=True)
+class PixelBuffer:
+    """A C-contiguous 8-bit pixel buffer read in place.
+
+    Args:
+        data: Any object supporting the buffer protocol (``bytes``,
+            ``bytearray``, ``memoryview``, ``numpy.ndarray``, ...) holding
+            ``height`` rows of ``width`` pixels without row padding.
+        width / height: Frame size in pixels.
+        channel_order: One of ``RGB``, ``BGR`` (OpenCV), ``RGBA``, ``BGRA``
+            or ``L``. Alpha is ignored, like ``Image.convert("RGB")`` does.
+    """
+
+    data: Any
+    width: int
+    height: int
+    channel_order: str = "RGB"
+
+    def __post_init__(self) -> None:
+        if self.channel_order not in CHANNEL_ORDERS:
+            raise ValueError(
+                "channel_order must be one of: " + ", ".join(CHANNEL_ORDERS)
+            )
+        if int(self.width) <= 0 or int(self.height) <= 0:
+            raise ValueError("width and height must be positive")
+        view = memoryview(self.data)
+        if view.itemsize != 1:
+            raise ValueError("pixel buffers must hold 8-bit samples")
+        if not view.c_contiguous:
+            raise ValueError("pixel buffers must be C-contiguous")
+        if view.nbytes < self.row_bytes * int(self.height):
+            raise ValueError("buffer is smaller than width * height * channels")
+
+    @classmethod
+    def from_array(
+        cls, array: Any, channel_order: str | None = None
+    ) -> "PixelBuffer":
+        """Wrap an ``(height, width)`` or ``(height, width, channels)`` array.
+
+        Works for NumPy arrays and shaped ``memoryview`` objects. Without an
+        explicit `channel_order`, 1, 3 and 4 channels mean ``L``, ``RGB`` and
+        ``RGBA``.
+        """
+        shape = memoryview(array).shape or ()
+        if len(shape) == 2:
+            channels = 1
+        elif len(shape) == 3:
+            channels = shape[2]
+        else:
+            raise ValueError("arrays must have shape (height, width[, channels])")
+        if channel_order is None:
+            channel_order = _DEFAULT_ORDERS.get(channels, "")
+        if CHANNEL_ORDERS.get(channel_order, (None,))[0] != channels:
+            raise ValueError(
+                f"channel_order {channel_order!r} does not match {channels} channels"
+            )
+        return cls(array, int(shape[1]), int(shape[0]), channel_order)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return (int(self.width), int(self.height))
+
+    @property
+    def row_bytes(self) -> int:
+        return int(self.width) * CHANNEL_ORDERS[self.channel_order][0]
+
+    def sample(self, size: tuple[int, int]) -> Image.Image:
+        """Nearest-neighbour downsample to ``size`` as an ``RGB`` (or ``L``) image.
+
+        Only the sampled pixels are read. The result is identical to
+        decoding the whole buffer and calling ``resize(size, NEAREST)``.
+        """
+        out_w, out_h = int(size[0]), int(size[1])
+        bpp, raw_mode = CHANNEL_ORDERS[self.channel_order]
+        mode = "L" if bpp == 1 else "RGB"
+        xs = nearest_indices(self.width, out_w)
+        ys = nearest_indices(self.height, out_h)
+        if np is not None:
+            pixels = np.frombuffer(
+                self.data, dtype=np.uint8, count=self.row_bytes * self.height
+            ).reshape(self.height, self.width, bpp)
+            # One gather picks rows, columns and channels (in RGB order).
+            grid = pixels[np.ix_(ys, xs, _CHANNEL_INDEX[self.channel_order])]
+            return Image.frombytes(mode, (out_w, out_h), grid.tobytes())
+        # Without NumPy, decode just the sampled rows; Pillow resamples each
+        # one with the same column indices.
+        view = memoryview(self.data).cast("B")
+        stride = self.row_bytes
+        out = Image.new(mode, (out_w, out_h))
+        for y, src_y in enumerate(ys):
+            row = Image.frombuffer(
+                mode,
+                (self.width, 1),
+                view[src_y * stride : (src_y + 1) * stride],
+                "raw",
+                raw_mode,
+                0,
+                1,
+            )
+            out.paste(row.resize((out_w, 1), _RESAMPLE_NEAREST), (0, y))
+        return out
@@ -0,0 +1,213 @@
+"""Incremental PNG encoder for canvases that are too large to hold in memory.
+
+``StreamingPNGWriter`` accepts full-width horizontal bands (for example one
+row of character cells at a time), filters each scanline and feeds it through
+a single zlib stream that is flushed to disk as ``IDAT`` chunks. Only the
+current band and the previous scanline are ever kept in memory, so the output
+size is bounded by disk space rather than by what ``Image.new`` can allocate.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import struct
+import zlib
+from typing import Any, BinaryIO
+
+from PIL import Image, ImageChops
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG filter type byte written in front of every scanline.
+PNG_FILTERS: dict[str, int] = {"none": 0, "sub": 1, "up": 2}
+
+ZLIB_STRATEGIES: dict[str, int] = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+}
+
+# (colour type, bytes per pixel) for the supported Pillow modes.
+_MODE_INFO: dict[str, tuple[int, int]] = {"L": (0, 1), "P": (3, 1), "RGB": (2, 3)}
+
+# Compressed data is buffered and emitted as IDAT chunks of roughly this size.
+_IDAT_CHUNK_SIZE = 1 << 16
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(data, zlib.crc32(tag)) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+
+class StreamingPNGWriter:
+    """Write a PNG image band by band.
+
+    Given a path, the PNG is written to a temporary file next to it and
+    only moved into place by a successful :meth:`close`, so an interrupted
+    stream never leaves a truncated image under the real name.
+
+    Args:
+        fp: Output path or a binary file object opened for writing.
+        size: ``(width, height)`` of the final image in pixels.
+        mode: Pillow mode of the bands, ``"RGB"``, ``"L"`` or ``"P"``.
+        compress_level: zlib level, 0 (fastest) to 9 (smallest).
+        filter_type: PNG scanline filter, one of ``none``, ``sub``, ``up``.
+            ``none`` is the fastest; ``sub``/``up`` usually compress better
+            on photographic colour but cost one extra C pass per band.
+        strategy: zlib strategy, one of ``default``, ``filtered``,
+            ``huffman``, ``rle``.
+        palette: Flat ``[r, g, b, ...]`` list, required for mode ``"P"``.
+    """
+
+    def __init__(
+        self,
+        fp: str | os.PathLike[str] | BinaryIO,
+        size: tuple[int, int],
+        mode: str = "RGB",
+        *,
+        compress_level: int = 6,
+        filter_type: str = "none",
+        strategy: str = "default",
+        palette: list[int] | None = None,
+    ) -> None:
+        if mode not in _MODE_INFO:
+            raise ValueError("mode must be one of: " + ", ".join(_MODE_INFO))
+        if filter_type not in PNG_FILTERS:
+            raise ValueError("filter_type must be one of: " + ", ".join(PNG_FILTERS))
+        if strategy not in ZLIB_STRATEGIES:
+            raise ValueError("strategy must be one of: " + ", ".join(ZLIB_STRATEGIES))
+        compress_level = int(compress_level)
+        if not 0 <= compress_level <= 9:
+            raise ValueError("compress_level must be between 0 and 9")
+        width, height = int(size[0]), int(size[1])
+        if width <= 0 or height <= 0:
+            raise ValueError("size must be positive")
+        if mode == "P" and not palette:
+            raise ValueError("palette is required for mode P")
+
+        self.size = (width, height)
+        self.mode = mode
+        self.filter_type = filter_type
+        self.rows_written = 0
+        color_type, bpp = _MODE_INFO[mode]
+        self._stride = width * bpp
+        self._filter_byte = bytes((PNG_FILTERS[filter_type],))
+        self._prev_row: Image.Image | None = None
+        self._pending: list[bytes] = []
+        self._pending_len = 0
+        self._compressor = zlib.compressobj(
+            compress_level, zlib.DEFLATED, 15, 9, ZLIB_STRATEGIES[strategy]
+        )
+
+        self._path: str | None = None
+        self._tmp_path: str | None = None
+        if hasattr(fp, "write"):
+            self._fh: Any = fp
+            self._owns_fh = False
+        else:
+            self._path = os.fspath(fp)
+            self._tmp_path = self._path + ".part"
+            self._fh = open(self._tmp_path, "wb")
+            self._owns_fh = True
+        self._fh.write(PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+        self._fh.write(_chunk(b"IHDR", ihdr))
+        if mode == "P":
+            assert palette is not None
+            self._fh.write(_chunk(b"PLTE", bytes(palette[: 3 * 256])))
+
+    def __enter__(self) -> "StreamingPNGWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _discard(self) -> None:
+        """Abandon the image: close an owned file and delete its temp file."""
+        self._compressor = None
+        if self._owns_fh:
+            self._fh.close()
+        if self._tmp_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._tmp_path)
+            self._tmp_path = None
+
+    def _filtered(self, band: Image.Image) -> bytes:
+        if self.filter_type == "none":
+            return band.tobytes()
+        if band.mode == "P":
+            # Filters operate on the raw index bytes, not on palette colours.
+            band = Image.frombytes("L", band.size, band.tobytes())
+        width, height = band.size
+        ref = Image.new(band.mode, band.size)
+        if self.filter_type == "sub":
+            if width > 1:
+                ref.paste(band.crop((0, 0, width - 1, height)), (1, 0))
+        else:  # up
+            if self._prev_row is not None:
+                ref.paste(self._prev_row, (0, 0))
+            if height > 1:
+                ref.paste(band.crop((0, 0, width, height - 1)), (0, 1))
+            self._prev_row = band.crop((0, height - 1, width, height))
+        return ImageChops.subtract_modulo(band, ref).tobytes()
+
+    def _emit(self, data: bytes) -> None:
+        if not data:
+            return
+        self._pending.append(data)
+        self._pending_len += len(data)
+        if self._pending_len >= _IDAT_CHUNK_SIZE:
+            self._fh.write(_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending = []
+            self._pending_len = 0
+
+    def write_band(self, band: Image.Image, rows: int | None = None) -> None:
+        """Append the top ``rows`` scanlines of ``band`` (default: all of them).
+
+        ``band`` must be exactly as wide as the image and use the writer mode.
+        """
+        if band.mode != self.mode or band.size[0] != self.size[0]:
+            raise ValueError(
+                f"band must be a {self.mode} image {self.size[0]} pixels wide"
+            )
+        rows = band.size[1] if rows is None else int(rows)
+        rows = min(rows, band.size[1], self.size[1] - self.rows_written)
+        if rows <= 0:
+            return
+        if rows < band.size[1]:
+            band = band.crop((0, 0, self.size[0], rows))
+        data = memoryview(self._filtered(band))
+        compress = self._compressor.compress
+        stride = self._stride
+        flt = self._filter_byte
+        for i in range(rows):
+            self._emit(compress(flt))
+            self._emit(compress(data[i * stride : (i + 1) * stride]))
+        self.rows_written += rows
+
+    def close(self) -> None:
+        """Finish the zlib stream and write the trailing chunks."""
+        if self._compressor is None:
+            return
+        if self.rows_written != self.size[1]:
+            self._discard()
+            raise ValueError(
+                f"expected {self.size[1]} rows, got {self.rows_written}"
+            )
+        self._emit(self._compressor.flush())
+        self._compressor = None
+        if self._pending:
+            self._fh.write(_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending = []
+        self._fh.write(_chunk(b"IEND", b""))
+        if self._owns_fh:
+            self._fh.close()
+            os.replace(self._tmp_path, self._path)
+            self._tmp_path = None
+        else:
+            self._fh.flush()
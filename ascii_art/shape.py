@@ -0,0 +1,108 @@
+"""Shape-matching character selection.
+
+Brightness mapping picks each character from one gray sample per cell, so
+all detail inside a cell is lost. Shape matching samples every cell as a
+small grid of sub-cells (``SUBCELLS`` = 2 columns x 3 rows) and picks the
+glyph whose ink distribution is closest to that luminance vector, so edges
+and lines inside a cell select ``/``, ``_``, ``'`` and similar glyphs.
+
+Every sub-cell value is quantized to ``LEVELS`` steps, which turns the
+nearest-glyph search into a single table lookup: :func:`shape_lut` holds the
+best glyph for every quantized vector and is built once per font, cell size
+and charset. Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Sequence
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - numpy is optional
+    np = None
+
+# Sub-cell grid sampled per character cell: (columns, rows).
+SUBCELLS = (2, 3)
+
+# Quantization steps per sub-cell; the table has LEVELS ** 6 entries.
+LEVELS = 5
+
+_LUT_CACHE: dict[tuple, "np.ndarray"] = {}
+_LUT_LOCK = threading.Lock()
+
+
+def glyph_vectors(masks: Sequence[Image.Image]) -> "np.ndarray":
+    """Return the ``(n, 6)`` sub-cell ink vectors of glyph masks on 0..255.
+
+    Each entry is the mean coverage of one sub-cell (row-major). Vectors are
+    scaled so that the most densely inked sub-cell of any glyph reaches 255,
+    matching the brightest cells to the densest glyph like the brightness
+    ramp does.
+    """
+    cols, rows = SUBCELLS
+    vectors = []
+    for mask in masks:
+        cov = np.asarray(mask, dtype=np.float64)
+        vectors.append(
+            [
+                part.mean() if part.size else 0.0
+                for band in np.array_split(cov, rows, axis=0)
+                for part in np.array_split(band, cols, axis=1)
+            ]
+        )
+    vec = np.array(vectors, dtype=np.float64).reshape(len(vectors), cols * rows)
+    peak = vec.max() if vec.size else 0.0
+    if peak > 0:
+        vec *= 255.0 / peak
+    return vec
+
+
+def build_lut(vectors: "np.ndarray") -> "np.ndarray":
+    """Return the nearest glyph (row of `vectors`) for every quantized vector.
+
+    Entry ``sum(q[i] * LEVELS ** i)`` holds the glyph closest (in squared
+    distance) to the sub-cell vector whose components sit at the centres of
+    the quantization steps ``q[i]``.
+    """
+    dims = vectors.shape[1]
+    steps = (np.arange(LEVELS, dtype=np.float64) + 0.5) * (256.0 / LEVELS)
+    # Component i of entry k is digit i of k in base LEVELS.
+    digits = (np.arange(LEVELS**dims)[:, None] // LEVELS ** np.arange(dims)) % LEVELS
+    centers = steps[digits]
+    dist = (
+        (centers**2).sum(axis=1)[:, None]
+        - 2.0 * centers @ vectors.T
+        + (vectors**2).sum(axis=1)[None, :]
+    )
+    return dist.argmin(axis=1).astype(np.uint16)
+
+
+def shape_lut(key: tuple, masks: Sequence[Image.Image]) -> "np.ndarray":
+    """Return the (cached) lookup table for glyph `masks` identified by `key`."""
+    lut = _LUT_CACHE.get(key)
+    if lut is None:
+        with _LUT_LOCK:
+            lut = _LUT_CACHE.get(key)
+            if lut is None:
+                lut = _LUT_CACHE[key] = build_lut(glyph_vectors(masks))
+    return lut
+
+
+def cell_indices(sub_gray: Image.Image, lut: "np.ndarray") -> "np.ndarray":
+    """Return the glyph index of every cell as a flat ``uint16`` array.
+
+    ``sub_gray`` is the brightness plane sampled at ``SUBCELLS`` pixels per
+    cell, i.e. ``(2 * columns, 3 * rows)``. Quantization, packing and lookup
+    are whole-grid array operations.
+    """
+    cols, rows = SUBCELLS
+    width, height = sub_gray.size
+    grid_w, grid_h = width // cols, height // rows
+    sub = np.asarray(sub_gray, dtype=np.uint16).reshape(grid_h, rows, grid_w, cols)
+    q = (sub * LEVELS) >> 8
+    weights = (LEVELS ** np.arange(cols * rows, dtype=np.uint16)).reshape(rows, 1, cols)
+    keys = (q * weights[None]).sum(axis=(1, 3), dtype=np.intp)
+    return lut[keys].ravel()
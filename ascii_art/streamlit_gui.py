@@ -9,7 +9,6 @@ Or:
 
 from __future__ import annotations
 
-import contextlib
 import io
 import json
 import re
@@ -20,7 +19,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
 
 # Pillow changed resampling constants to an enum; use getattr for compatibility.
@@ -35,7 +34,8 @@ _REPO_ROOT = Path(__file__).resolve().parent.parent
 if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
-from ascii_art import converter
+from ascii_art import api, converter
+from ascii_art.pixelbuffer import PixelBuffer
 
 
 CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.json"
@@ -143,24 +143,19 @@ def _ansi_preview(
     progress_cb,
 ) -> str:
     converter.load_char_array(dynamic=dynamic_set, font_path=font_path)
-    buf = io.StringIO()
-    with contextlib.redirect_stdout(buf):
-        converter.convert_image(
-            img,
-            scale_factor=scale,
-            bg_brightness=brightness,
-            output_format="ansi",
-            output_dir="./assets/output",
-            mono=True,
-            font_path=font_path,
-            grayscale_mode=grayscale_mode,
-            dither=dither,
-            cell_width=int(cell_width),
-            cell_height=int(cell_height),
-            progress_callback=progress_cb,
-            base_name="preview",
-        )
-    return _strip_ansi(buf.getvalue())
+    text = api.to_ansi(
+        img,
+        scale_factor=scale,
+        bg_brightness=brightness,
+        mono=True,
+        font_path=font_path,
+        grayscale_mode=grayscale_mode,
+        dither=dither,
+        cell_width=int(cell_width),
+        cell_height=int(cell_height),
+        progress_callback=progress_cb,
+    )
+    return _strip_ansi(text)
 
 
 def _clamp(v: float, lo: float, hi: float) -> float:
@@ -185,39 +180,20 @@ def _scale_from_audio_inverse(
     return _clamp(scale, min_scale, max_scale)
 
 
-def _render_ascii_image(
-    img: Image.Image,
+def _live_grid_frame(
+    img: Image.Image | PixelBuffer,
     *,
     scale_factor: float,
     detail_scale: float | None = None,
-    bg_brightness: int,
-    mono: bool,
-    font_path: str | None,
-    grayscale_mode: str,
-    dither: str,
     cell_width: int,
     cell_height: int,
-    font: ImageFont.ImageFont | None = None,
-    char_map: list[str] | None = None,
 ) -> Image.Image:
-    """Render a single frame to a PIL image (no file IO)."""
-
-    def _load_font(
-        user_font: str | None,
-    ) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-        windows_font = r"C:\\Windows\\Fonts\\lucon.ttf"
-        linux_font = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
-        if user_font:
-            try:
-                return ImageFont.truetype(user_font, int(cell_height))
-            except OSError:
-                pass
-        if Path(windows_font).exists():
-            return ImageFont.truetype(windows_font, int(cell_height))
-        if Path(linux_font).exists():
-            return ImageFont.truetype(linux_font, int(cell_height))
-        return ImageFont.load_default()
+    """Return the frame resampled to the live character grid (one pixel per cell).
 
+    A :class:`PixelBuffer` is read in place: only the pixels of the detail
+    grid are sampled from it, instead of decoding and box-filtering the
+    whole frame.
+    """
     width, height = img.size
     detail_scale = float(scale_factor) if detail_scale is None else float(detail_scale)
     base_w = max(1, int(float(scale_factor) * width))
@@ -232,142 +208,17 @@ def _render_ascii_image(
     )
     # Keep output size fixed (base_w/base_h). Modulate detail by downsampling the
     # input to (detail_w/detail_h) and scaling back up to the fixed grid.
+    if isinstance(img, PixelBuffer):
+        frame = img.sample((detail_w, detail_h)).convert("RGB")
+        if (detail_w, detail_h) != (base_w, base_h):
+            return frame.resize((base_w, base_h), _RESAMPLE_BILINEAR)
+        return frame
     frame = img.convert("RGB")
     if (detail_w, detail_h) != (base_w, base_h):
-        frame = frame.resize((detail_w, detail_h), _RESAMPLE_BOX).resize(
+        return frame.resize((detail_w, detail_h), _RESAMPLE_BOX).resize(
             (base_w, base_h), _RESAMPLE_BILINEAR
         )
-    else:
-        frame = frame.resize((base_w, base_h), _RESAMPLE_BILINEAR)
-    pix = frame.load()
-
-    out = Image.new(
-        "RGB",
-        (int(cell_width) * base_w, int(cell_height) * base_h),
-        color=(bg_brightness, bg_brightness, bg_brightness),
-    )
-    draw = ImageDraw.Draw(out)
-    if font is None:
-        font = _load_font(font_path)
-    if char_map is None:
-        char_map = [converter.get_char(i) for i in range(256)]
-    assert char_map is not None
-
-    if grayscale_mode not in ("avg", "luma601", "luma709"):
-        grayscale_mode = "avg"
-
-    is_avg = grayscale_mode == "avg"
-    wr = wg = wb = 0
-    if not is_avg:
-        if grayscale_mode == "luma601":
-            wr, wg, wb = 77, 150, 29
-        else:
-            wr, wg, wb = 54, 183, 19
-
-    if dither not in ("none", "floyd-steinberg", "atkinson"):
-        dither = "none"
-
-    levels = len(converter.char_array)
-    levels_m1 = max(1, levels - 1)
-
-    if dither == "none":
-        for y in range(base_h):
-            for x in range(base_w):
-                r, g, b = pix[x, y]
-                if is_avg:
-                    h = (r + g + b) // 3
-                else:
-                    h = (wr * r + wg * g + wb * b) >> 8
-                ch = char_map[h]
-                color = (h, h, h) if mono else (r, g, b)
-                draw.text(
-                    (x * int(cell_width), y * int(cell_height)),
-                    ch,
-                    font=font,
-                    fill=color,
-                )
-        return out
-
-    if dither == "floyd-steinberg":
-        err_curr = [0.0] * (base_w + 2)
-        err_next = [0.0] * (base_w + 2)
-        for y in range(base_h):
-            err_curr, err_next = err_next, [0.0] * (base_w + 2)
-            for x in range(base_w):
-                r, g, b = pix[x, y]
-                base = (r + g + b) // 3 if is_avg else (wr * r + wg * g + wb * b) >> 8
-                v = float(base) + err_curr[x + 1]
-                if v < 0.0:
-                    v = 0.0
-                elif v > 255.0:
-                    v = 255.0
-                if levels_m1 <= 0:
-                    qh = 0
-                else:
-                    idx = int(v * levels_m1 / 255.0 + 0.5)
-                    if idx < 0:
-                        idx = 0
-                    elif idx > levels_m1:
-                        idx = levels_m1
-                    qh = int(idx * 255.0 / levels_m1 + 0.5)
-                err = v - float(qh)
-                err_curr[x + 2] += err * (7.0 / 16.0)
-                err_next[x + 0] += err * (3.0 / 16.0)
-                err_next[x + 1] += err * (5.0 / 16.0)
-                err_next[x + 2] += err * (1.0 / 16.0)
-
-                ch = char_map[qh]
-                color = (qh, qh, qh) if mono else (r, g, b)
-                draw.text(
-                    (x * int(cell_width), y * int(cell_height)),
-                    ch,
-                    font=font,
-                    fill=color,
-                )
-        return out
-
-    # atkinson
-    err_curr = [0.0] * (base_w + 4)
-    err_next = [0.0] * (base_w + 4)
-    err_next2 = [0.0] * (base_w + 4)
-    for y in range(base_h):
-        err_curr, err_next, err_next2 = err_next, err_next2, [0.0] * (base_w + 4)
-        for x in range(base_w):
-            r, g, b = pix[x, y]
-            base = (r + g + b) // 3 if is_avg else (wr * r + wg * g + wb * b) >> 8
-            idx0 = x + 2
-            v = float(base) + err_curr[idx0]
-            if v < 0.0:
-                v = 0.0
-            elif v > 255.0:
-                v = 255.0
-            if levels_m1 <= 0:
-                qh = 0
-            else:
-                qidx = int(v * levels_m1 / 255.0 + 0.5)
-                if qidx < 0:
-                    qidx = 0
-                elif qidx > levels_m1:
-                    qidx = levels_m1
-                qh = int(qidx * 255.0 / levels_m1 + 0.5)
-            err = (v - float(qh)) / 8.0
-            err_curr[idx0 + 1] += err
-            err_curr[idx0 + 2] += err
-            err_next[idx0 - 1] += err
-            err_next[idx0 + 0] += err
-            err_next[idx0 + 1] += err
-            err_next2[idx0 + 0] += err
-
-            ch = char_map[qh]
-            color = (qh, qh, qh) if mono else (r, g, b)
-            draw.text(
-                (x * int(cell_width), y * int(cell_height)),
-                ch,
-                font=font,
-                fill=color,
-            )
-
-    return out
+    return frame.resize((base_w, base_h), _RESAMPLE_BILINEAR)
 
 
 def _convert_and_collect_outputs(
@@ -763,6 +614,11 @@ def run_app() -> None:
             help="Higher = louder sound reduces detail more.",
         )
         live_mono = st.checkbox("Mono (grayscale)", value=True)
+        live_edges = st.checkbox(
+            "Edge glyphs",
+            value=False,
+            help="Draw strong edges with | / \\ - _ (needs numpy).",
+        )
 
         mod_charset = st.checkbox("Also reduce charset when loud", value=False)
         charset_min = 4
@@ -792,41 +648,24 @@ def run_app() -> None:
 
         class _VideoProc(VideoProcessorBase):
             def __init__(self) -> None:
-                self._font = ImageFont.load_default()
-                self._char_key: tuple[int, int] | None = None
-                self._char_map: list[str] | None = None
-
-            def _ensure_font(self) -> None:
-                if font_path:
-                    try:
-                        self._font = ImageFont.truetype(font_path, int(cell_height))
-                    except OSError:
-                        self._font = ImageFont.load_default()
-                else:
-                    self._font = ImageFont.load_default()
-
-            def _build_char_map(self, size: int) -> list[str]:
-                chars = converter.char_array[
-                    : max(2, min(size, len(converter.char_array)))
-                ]
-                interval = len(chars) / 256.0
-                out: list[str] = []
-                for i in range(256):
-                    idx = int(i * interval)
-                    if idx >= len(chars):
-                        idx = len(chars) - 1
-                    out.append(chars[idx])
-                return out
-
-            def _ensure_char_map(self, size: int) -> None:
+                # Own session: keeps its font cache while the charset changes.
+                self._conv = converter.Converter(converter.char_array)
+                self._conv_key: tuple[int, int] | None = None
+                # Output canvas and scratch buffers reused across frames.
+                self._session = converter.FrameSession()
+
+            def _ensure_converter(self, size: int) -> converter.Converter:
                 key = (id(converter.char_array), int(size))
-                if self._char_key != key or self._char_map is None:
-                    self._char_map = self._build_char_map(int(size))
-                    self._char_key = key
+                if self._conv_key != key:
+                    self._conv.set_chars(
+                        converter.char_array[
+                            : max(2, min(int(size), len(converter.char_array)))
+                        ]
+                    )
+                    self._conv_key = key
+                return self._conv
 
             def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-                self._ensure_font()
-
                 rms = shared_audio.get_rms()
                 level = _clamp(rms * float(audio_gain), 0.0, 1.0)
 
@@ -840,7 +679,7 @@ def run_app() -> None:
                             float(len(converter.char_array)),
                         )
                     )
-                self._ensure_char_map(charset_size)
+                conv = self._ensure_converter(charset_size)
 
                 dyn_scale = _scale_from_audio_inverse(
                     base_scale=float(live_base_scale),
@@ -850,23 +689,28 @@ def run_app() -> None:
                     max_scale=float(max_scale),
                 )
 
-                pil = Image.fromarray(frame.to_ndarray(format="rgb24"))
-                out = _render_ascii_image(
-                    pil,
+                grid = _live_grid_frame(
+                    PixelBuffer.from_array(frame.to_ndarray(format="rgb24")),
                     scale_factor=float(live_base_scale),
                     detail_scale=float(dyn_scale),
+                    cell_width=int(cell_width),
+                    cell_height=int(cell_height),
+                )
+                result = conv.render(
+                    grid,
+                    "array",
+                    session=self._session,
+                    grid_size=grid.size,
                     bg_brightness=int(brightness),
                     mono=bool(live_mono),
+                    edges=bool(live_edges),
                     font_path=font_path,
                     grayscale_mode=grayscale_mode,
                     dither=dither,
                     cell_width=int(cell_width),
                     cell_height=int(cell_height),
-                    font=self._font,
-                    char_map=self._char_map,
                 )
-                out_np = np.array(out, dtype=np.uint8)
-                return av.VideoFrame.from_ndarray(out_np, format="rgb24")
+                return av.VideoFrame.from_ndarray(result.array, format="rgb24")
 
         webrtc_streamer(
             key=f"ascii-live-{st.session_state['_live_key']}",
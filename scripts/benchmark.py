@@ -32,6 +32,16 @@ def _parse_args() -> argparse.Namespace:
     p.add_argument("--cell-height", type=int, default=18)
     p.add_argument("--dynamic-set", action="store_true")
     p.add_argument("--font", help="Optional .ttf font path")
+    p.add_argument("--image-codec", default="png", help="Encoder for format=image")
+    p.add_argument("--png-compress", type=int, default=6)
+    p.add_argument(
+        "--codecs",
+        default="all",
+        help=(
+            "Comma-separated codecs to time encoding of the rendered image "
+            "(format=image only; 'all' = every available codec, '' = skip)"
+        ),
+    )
     return p.parse_args()
 
 
@@ -50,6 +60,38 @@ def _compute_dims(
     return out_w, out_h, out_px_w, out_px_h
 
 
+def _bench_codecs(converter, canvas, args: argparse.Namespace, out_dir: Path) -> None:
+    from PIL import Image
+
+    Image.init()
+    if args.codecs == "all":
+        codecs = [
+            name
+            for name, (_, fmt) in converter.IMAGE_CODECS.items()
+            if fmt in Image.SAVE
+        ]
+    else:
+        codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
+    print(f"Encode: {canvas.size[0]}x{canvas.size[1]}px canvas")
+    for codec in codecs:
+        enc_times: list[float] = []
+        size = 0
+        for i in range(int(args.runs)):
+            t0 = time.perf_counter()
+            path = converter.save_image(
+                canvas,
+                out_dir / f"codec_{codec}_{i}",
+                codec=codec,
+                png_compress_level=int(args.png_compress),
+            )
+            enc_times.append(time.perf_counter() - t0)
+            size = Path(path).stat().st_size
+        print(
+            f"  {codec:<14} mean={statistics.mean(enc_times):.4f}s "
+            f"min={min(enc_times):.4f}s size={size / 1024:.1f}KiB"
+        )
+
+
 def main() -> int:
     args = _parse_args()
 
@@ -90,6 +132,7 @@ def main() -> int:
     converter.load_char_array(dynamic=bool(args.dynamic_set), font_path=args.font)
 
     times: list[float] = []
+    canvas = None
     with tempfile.TemporaryDirectory() as td:
         for i in range(int(args.runs)):
             t0 = time.perf_counter()
@@ -106,10 +149,17 @@ def main() -> int:
                 dither=str(args.dither),
                 cell_width=int(args.cell_width),
                 cell_height=int(args.cell_height),
+                image_codec=str(args.image_codec),
+                png_compress_level=int(args.png_compress),
             )
             t1 = time.perf_counter()
             times.append(t1 - t0)
 
+        if args.format == "image" and args.codecs and times:
+            rendered = next(Path(td).glob("O_h_*_bench_0.*"))
+            with Image.open(rendered) as im:
+                canvas = im.convert("RGB")
+
     if not times:
         print("No runs")
         return 1
@@ -120,6 +170,9 @@ def main() -> int:
     print(
         f"Timing: mean={mean_s:.4f}s min={min_s:.4f}s max={max_s:.4f}s (runs={len(times)})"
     )
+    if canvas is not None:
+        with tempfile.TemporaryDirectory() as td:
+            _bench_codecs(converter, canvas, args, Path(td))
     return 0
 
 
@@ -3,6 +3,7 @@ from pathlib import Path
 import sys
 
 from PIL import Image
+import pytest
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import ascii_art as ascii_mod
@@ -32,6 +33,27 @@ def test_parse_args_defaults():
     assert args.gif_loop is None
     assert args.video_out is None
     assert args.html_mode is None
+    assert args.png_stream is False
+    assert args.png_compress is None
+    assert args.png_filter is None
+    assert args.tile_size is None
+    assert args.workers is None
+    assert args.png_optimize is False
+    assert args.image_codec is None
+    assert args.webp_quality is None
+    assert args.colors is None
+    assert args.fg_color is None
+    assert args.invert is False
+    assert args.contrast is None
+    assert args.gamma is None
+    assert args.levels is None
+    assert args.auto_levels is False
+    assert args.output is None
+    assert args.edges is False
+    assert args.edge_threshold is None
+    assert args.mode is None
+    assert args.ansi_tolerance is None
+    assert args.ansi_palette is None
 
 
 def test_parse_args_grayscale_flag():
@@ -72,6 +94,417 @@ def test_parse_args_html_mode_flag():
     assert args.html_mode == "compact"
 
 
+def test_parse_args_png_flags():
+    args = ascii_mod.parse_args(
+        ["--png-stream", "--png-compress", "1", "--png-filter", "up"]
+    )
+    assert args.png_stream is True
+    assert args.png_compress == 1
+    assert args.png_filter == "up"
+
+
+def test_streaming_png_writer_roundtrip(tmp_path):
+    from ascii_art.pngstream import StreamingPNGWriter
+
+    src = Image.new("RGB", (7, 5))
+    src.putdata([(x * 30, y * 50, (x * y) % 256) for y in range(5) for x in range(7)])
+    for mode, filter_type in (("RGB", "none"), ("RGB", "sub"), ("RGB", "up"), ("L", "up")):
+        img = src.convert(mode)
+        out = tmp_path / f"stream_{mode}_{filter_type}.png"
+        with StreamingPNGWriter(out, img.size, mode, filter_type=filter_type) as writer:
+            # Uneven bands exercise the carry-over between writes.
+            writer.write_band(img.crop((0, 0, 7, 2)))
+            writer.write_band(img.crop((0, 2, 7, 5)), rows=1)
+            writer.write_band(img.crop((0, 3, 7, 5)))
+        with Image.open(out) as decoded:
+            assert decoded.mode == mode
+            assert decoded.tobytes() == img.tobytes()
+    out = tmp_path / "short.png"
+    with pytest.raises(ValueError, match="expected 5 rows"):
+        with StreamingPNGWriter(out, src.size) as writer:
+            writer.write_band(src.crop((0, 0, 7, 2)))
+    assert not out.exists() and not (tmp_path / "short.png.part").exists()
+
+
+def test_convert_image_png_stream_matches_canvas(tmp_path):
+    img = Image.new("RGB", (6, 4))
+    img.putdata([(x * 40, 255 - y * 60, 90) for y in range(4) for x in range(6)])
+    kwargs = dict(
+        scale_factor=1.0,
+        bg_brightness=20,
+        output_format="image",
+        base_name="stream",
+        cell_width=4,
+        cell_height=4,
+    )
+    ascii_mod.convert_image(img, output_dir=tmp_path / "full", **kwargs)
+    ascii_mod.convert_image(
+        img,
+        output_dir=tmp_path / "band",
+        png_stream=True,
+        png_compress_level=1,
+        png_filter="sub",
+        **kwargs,
+    )
+    name = "O_h_20_f_1.0_stream.png"
+    with Image.open(tmp_path / "full" / name) as full, Image.open(
+        tmp_path / "band" / name
+    ) as band:
+        assert band.size == full.size
+        assert band.tobytes() == full.convert("RGB").tobytes()
+    assert [p.name for p in (tmp_path / "band").iterdir()] == [name]
+
+    # An interrupted stream leaves neither a truncated PNG nor its temp file.
+    def interrupt(current, total):
+        if current == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        ascii_mod.convert_image(
+            img,
+            output_dir=tmp_path / "stopped",
+            png_stream=True,
+            progress_callback=interrupt,
+            **kwargs,
+        )
+    assert list((tmp_path / "stopped").iterdir()) == []
+
+
+def test_parse_args_dzi_flags():
+    args = ascii_mod.parse_args(
+        ["--format", "dzi", "--tile-size", "512", "--workers", "2"]
+    )
+    assert args.format == "dzi"
+    assert args.tile_size == 512
+    assert args.workers == 2
+
+
+def test_convert_image_dzi_pyramid_matches_canvas(tmp_path):
+    img = Image.new("RGB", (6, 4))
+    img.putdata([(x * 40, 255 - y * 60, 90) for y in range(4) for x in range(6)])
+    kwargs = dict(
+        scale_factor=1.0,
+        bg_brightness=20,
+        base_name="zoom",
+        cell_width=4,
+        cell_height=4,
+    )
+    ascii_mod.convert_image(
+        img, output_dir=tmp_path / "png", output_format="image", **kwargs
+    )
+    out_dir = tmp_path / "dzi"
+    ascii_mod.convert_image(
+        img, output_dir=out_dir, output_format="dzi", tile_size=10, **kwargs
+    )
+
+    manifest = (out_dir / "O_h_20_f_1.0_zoom.dzi").read_text(encoding="utf-8")
+    assert 'TileSize="10"' in manifest
+    assert '<Size Width="24" Height="16"/>' in manifest
+
+    files = out_dir / "O_h_20_f_1.0_zoom_files"
+    # ceil(log2(24)) = 5 -> levels 0..5, level 0 is a single pixel.
+    assert sorted(int(p.name) for p in files.iterdir()) == list(range(6))
+    with Image.open(files / "0" / "0_0.png") as tile:
+        assert tile.size == (1, 1)
+
+    stitched = Image.new("RGB", (24, 16))
+    for tile_path in (files / "5").iterdir():
+        col, row = (int(v) for v in tile_path.stem.split("_"))
+        with Image.open(tile_path) as tile:
+            stitched.paste(tile, (col * 10, row * 10))
+    with Image.open(tmp_path / "png" / "O_h_20_f_1.0_zoom.png") as full:
+        assert stitched.tobytes() == full.convert("RGB").tobytes()
+
+
+def test_parse_args_image_codec_flags():
+    args = ascii_mod.parse_args(
+        ["--image-codec", "webp", "--webp-quality", "60", "--png-optimize"]
+    )
+    assert args.image_codec == "webp"
+    assert args.webp_quality == 60
+    assert args.png_optimize is True
+
+
+def test_convert_image_lossless_codecs_match_png(tmp_path):
+    img = Image.new("RGB", (5, 3))
+    img.putdata([(x * 50, y * 80, 200) for y in range(3) for x in range(5)])
+    kwargs = dict(
+        scale_factor=1.0,
+        bg_brightness=10,
+        output_dir=tmp_path,
+        output_format="image",
+        cell_width=3,
+        cell_height=3,
+    )
+    ascii_mod.convert_image(img, base_name="ref", **kwargs)
+    with Image.open(tmp_path / "O_h_10_f_1.0_ref.png") as ref:
+        expected = ref.convert("RGB").tobytes()
+    for codec, ext in (("webp-lossless", "webp"), ("bmp", "bmp"), ("ppm", "ppm")):
+        ascii_mod.convert_image(img, base_name=codec, image_codec=codec, **kwargs)
+        with Image.open(tmp_path / f"O_h_10_f_1.0_{codec}.{ext}") as out:
+            assert out.convert("RGB").tobytes() == expected
+
+    with pytest.raises(ValueError, match="png_stream requires image_codec"):
+        ascii_mod.convert_image(
+            img, base_name="bad", image_codec="bmp", png_stream=True, **kwargs
+        )
+
+
+def test_parse_args_colors_flag():
+    args = ascii_mod.parse_args(["--colors", "16"])
+    assert args.colors == 16
+
+
+def test_convert_image_mono_uses_single_channel_canvas(tmp_path):
+    img = Image.new("RGB", (4, 2), color=(200, 40, 40))
+    ascii_mod.convert_image(
+        img,
+        scale_factor=1.0,
+        bg_brightness=7,
+        output_dir=tmp_path,
+        output_format="image",
+        base_name="mono",
+        mono=True,
+        cell_width=6,
+        cell_height=6,
+    )
+    with Image.open(tmp_path / "O_h_7_f_1.0_mono.png") as out:
+        assert out.mode == "L"
+        assert out.size == (24, 12)
+        # Background plus the gray level of the (avg) pixel brightness.
+        assert {v for _, v in out.getcolors()} <= set(range(7, 94))
+
+
+def test_convert_image_colors_palette_canvas(tmp_path):
+    img = Image.new("RGB", (8, 4))
+    img.putdata([(x * 32, y * 64, (x + y) * 20) for y in range(4) for x in range(8)])
+    kwargs = dict(
+        scale_factor=1.0,
+        bg_brightness=0,
+        output_format="image",
+        base_name="pal",
+        colors=4,
+        cell_width=4,
+        cell_height=4,
+    )
+    ascii_mod.convert_image(img, output_dir=tmp_path / "full", **kwargs)
+    ascii_mod.convert_image(
+        img, output_dir=tmp_path / "band", png_stream=True, **kwargs
+    )
+    with Image.open(tmp_path / "full" / "O_h_0_f_1.0_pal.png") as full, Image.open(
+        tmp_path / "band" / "O_h_0_f_1.0_pal.png"
+    ) as band:
+        assert full.mode == "P"
+        assert band.mode == "P"
+        # At most 4 glyph colours plus the background entry.
+        assert len(full.convert("RGB").getcolors()) <= 5
+        # Glyphs are pasted with hard masks: every cell holds only the
+        # background index and its own colour index.
+        for cy in range(4):
+            for cx in range(8):
+                cell = full.crop((cx * 4, cy * 4, cx * 4 + 4, cy * 4 + 4))
+                assert len(cell.getcolors()) <= 2
+        assert band.convert("RGB").tobytes() == full.convert("RGB").tobytes()
+
+
+def test_parse_args_fg_color_flag():
+    args = ascii_mod.parse_args(["--fg-color", "#e0e0e0"])
+    assert args.fg_color == "#e0e0e0"
+
+
+def test_convert_image_fg_color_row_strips_match_cells(tmp_path):
+    from ascii_art import converter as conv
+
+    img = Image.new("RGB", (12, 6))
+    img.putdata(
+        [((x * 23) % 256, (y * 41) % 256, 90) for y in range(6) for x in range(12)]
+    )
+    out_dir = tmp_path / "out"
+    ascii_mod.convert_image(
+        img,
+        scale_factor=1.0,
+        bg_brightness=20,
+        output_dir=out_dir,
+        base_name="fg",
+        fg_color="#ff8000",
+        cell_width=6,
+        cell_height=9,
+        progress_callback=lambda *_: None,
+    )
+    with Image.open(out_dir / "O_h_20_f_1.0_fg.png") as out:
+        out.load()
+    assert out.mode == "RGB"
+
+    # Reference: one paste per cell through the same glyph masks.
+    frame = img.resize((12, 4), Image.NEAREST)
+    expected = Image.new("RGB", (12 * 6, 4 * 9), (20, 20, 20))
+    font = conv._load_font(None, 9)
+    masks = conv._glyph_masks(
+        font=font,
+        cell_width=6,
+        cell_height=9,
+        font_key=str(getattr(font, "path", "") or "default"),
+        chars=conv.char_array,
+    )
+    rows = conv._cell_rows(
+        frame,
+        conv._gray_plane(frame, "avg"),
+        dither="none",
+        mono=False,
+        charset=conv.Charset.from_chars(conv.char_array),
+    )
+    for y, (cells, _) in enumerate(rows):
+        for x, ch in enumerate(cells):
+            expected.paste((255, 128, 0), (x * 6, y * 9), masks[ch])
+    assert out.tobytes() == expected.tobytes()
+
+    # A gray foreground only needs a single-channel canvas.
+    ascii_mod.convert_image(
+        img,
+        scale_factor=1.0,
+        bg_brightness=20,
+        output_dir=out_dir,
+        base_name="gray",
+        fg_color="white",
+        cell_width=6,
+        cell_height=9,
+        progress_callback=lambda *_: None,
+    )
+    with Image.open(out_dir / "O_h_20_f_1.0_gray.png") as gray:
+        assert gray.mode == "L"
+
+
+def test_parse_args_tone_flags():
+    args = ascii_mod.parse_args(
+        [
+            "--invert",
+            "--contrast",
+            "1.5",
+            "--gamma",
+            "2.2",
+            "--levels",
+            "16,235",
+            "--auto-levels",
+        ]
+    )
+    assert args.invert is True
+    assert args.contrast == 1.5
+    assert args.gamma == 2.2
+    assert args.levels == (16, 235)
+    assert args.auto_levels is True
+
+
+def test_tone_table_composition():
+    from ascii_art import converter as conv
+
+    assert conv._tone_table() is None
+    assert conv._tone_table(invert=True) == [255 - v for v in range(256)]
+    table = conv._tone_table(levels=(50, 150))
+    assert table[0] == table[50] == 0
+    assert table[100] == 128
+    assert table[150] == table[255] == 255
+    assert conv._tone_table(contrast=0.0) == [128] * 256
+    assert conv._tone_table(gamma=2.0)[64] > 64
+
+    hist = [0] * 256
+    hist[100] = 10
+    hist[140] = 10
+    assert conv._auto_levels(hist) == (100, 140)
+
+
+def test_convert_image_tone_controls_pick_characters(tmp_path):
+    img = Image.new("RGB", (2, 1))
+    img.putdata([(100, 100, 100), (140, 140, 140)])
+    out_dir = tmp_path / "out"
+    common = dict(
+        scale_factor=1.0,
+        bg_brightness=0,
+        output_dir=out_dir,
+        output_format="text",
+        cell_width=1,
+        cell_height=1,
+    )
+
+    ascii_mod.convert_image(img, base_name="inv", invert=True, **common)
+    text = (out_dir / "O_h_0_f_1.0_inv.txt").read_text(encoding="utf-8")
+    assert text == ascii_mod.get_char(155) + ascii_mod.get_char(115)
+
+    ascii_mod.convert_image(img, base_name="auto", auto_levels=True, **common)
+    text = (out_dir / "O_h_0_f_1.0_auto.txt").read_text(encoding="utf-8")
+    assert text == ascii_mod.get_char(0) + ascii_mod.get_char(255)
+
+
+def test_charset_ink_coverage_matches_pixel_count(tmp_path, monkeypatch):
+    from PIL import ImageDraw, ImageFont
+
+    from ascii_art import charset
+
+    monkeypatch.setenv("ASCII_ART_CACHE_DIR", str(tmp_path))
+    font = ImageFont.load_default()
+    chars = ["#", "j", "Ŋ", " "]
+    expected = []
+    for ch in chars:
+        canvas = Image.new("L", (200, 250))
+        ImageDraw.Draw(canvas).text((25, 5), ch, font=font, fill=255)
+        expected.append(sum(v > 100 for v in canvas.tobytes()) / 50000.0)
+    assert charset._ink_percentages(chars, font) == expected
+
+    monkeypatch.setattr(charset, "_default_font_path", lambda: "")
+    ranked = charset.generate_char_arrays([None, ""], workers=1)
+    assert ranked[0] == ranked[1] == charset.generate_char_array()
+    assert sorted(ranked[0]) == sorted(charset.BASE_CHARS)
+    # Cached per content key; later lookups never render again.
+    (entry,) = (tmp_path / "charsets").glob("*.json")
+    assert entry.stem == charset._ramp_key("")
+    monkeypatch.setattr(charset, "_rank_chars", None)
+    assert charset.generate_char_array() == ranked[0]
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_charset_bundled_ramps_match_fresh_ranking(tmp_path, monkeypatch):
+    from ascii_art import charset
+
+    monkeypatch.setenv("ASCII_ART_CACHE_DIR", str(tmp_path))
+    bundled = charset._bundled_ramps()
+    assert bundled
+    path = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+    key = charset._ramp_key(path) if os.path.exists(path) else None
+    if key in bundled:
+        assert bundled[key] == charset._rank_chars(path)
+
+
+def test_converter_instances_keep_their_own_charset(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    img = Image.new("RGB", (4, 2), color=(255, 255, 255))
+    converters = {
+        "hash": ascii_mod.Converter([" ", "#"]),
+        "at": ascii_mod.Converter([" ", "@"]),
+    }
+
+    def _run(job):
+        i, name = job
+        converters[name].convert(
+            img,
+            scale_factor=1.0,
+            bg_brightness=0,
+            output_dir=tmp_path / str(i),
+            output_format="text",
+            base_name=name,
+            cell_width=1,
+            cell_height=1,
+            progress_callback=lambda *_: None,
+        )
+        return (tmp_path / str(i) / f"O_h_0_f_1.0_{name}.txt").read_text("utf-8")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_run, enumerate(["hash", "at"] * 4)))
+    assert results == ["####\n####", "@@@@\n@@@@"] * 4
+    # The module-level default is untouched.
+    assert ascii_mod.get_char(255) == ascii_mod.char_array[-1]
+    assert converters["hash"].get_char(300) == "#"
+
+
 def test_convert_image_dither_floyd_steinberg_tiny_gradient(tmp_path):
     import ascii_art.converter as conv
 
@@ -307,6 +740,36 @@ def test_convert_image_mono_ansi_stdout(tmp_path, capsys):
     assert expected_line in captured
 
 
+def test_convert_image_trims_trailing_invisible_cells(tmp_path, capsys):
+    # A visible cell followed by a blank cell and a background-coloured cell.
+    img = Image.new("RGB", (3, 1))
+    img.putdata([(200, 200, 200), (0, 0, 0), (30, 30, 30)])
+    test_path = tmp_path / "trim.png"
+    img.save(test_path)
+    out_dir = tmp_path / "out"
+    common = dict(
+        scale_factor=1.0,
+        bg_brightness=30,
+        output_dir=out_dir,
+        cell_width=1,
+        cell_height=1,
+    )
+
+    ascii_mod.convert_image(test_path, output_format="ansi", **common)
+    expected_char = ascii_mod.get_char(200)
+    captured = capsys.readouterr().out
+    assert f"\x1b[38;2;200;200;200m{expected_char}\x1b[0m\n" in captured
+
+    ascii_mod.convert_image(test_path, output_format="html", **common)
+    content = (out_dir / "O_h_30_f_1.0_trim.html").read_text(encoding="utf-8")
+    assert content.count("<span") == 1
+
+    # Plain text keeps every cell so the grid stays rectangular.
+    ascii_mod.convert_image(test_path, output_format="text", **common)
+    text = (out_dir / "O_h_30_f_1.0_trim.txt").read_text(encoding="utf-8")
+    assert len(text) == 3
+
+
 def test_convert_image_mono_ansi_grayscale_luma601(tmp_path, capsys):
     img = Image.new("RGB", (1, 1), color=(255, 0, 0))
     input_dir = tmp_path / "input"
@@ -390,3 +853,494 @@ def test_convert_image_progress_callback(tmp_path):
     assert calls[0][0] == 0
     assert calls[-1][0] == calls[-1][1]
     assert calls[-1][1] > 0
+
+
+def test_api_matches_convert_output_without_side_effects(tmp_path, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    img = Image.new("RGB", (6, 4))
+    img.putdata([(x * 40, 255 - x * 40, (x * y) % 256) for y in range(4) for x in range(6)])
+    opts = dict(scale_factor=1.0, bg_brightness=0)
+    text = ascii_mod.api.to_text(img, **opts)
+    page = ascii_mod.api.to_html(img, html_mode="compact", **opts)
+    ansi = ascii_mod.api.to_ansi(img, **opts)
+    canvas = ascii_mod.api.to_image(img, **opts)
+    rows, colors = ascii_mod.api.to_grid(img, **opts)
+    assert os.listdir(tmp_path) == []
+    assert capsys.readouterr().out == ""
+
+    out_dir = tmp_path / "out"
+    for fmt in ("text", "html", "image"):
+        ascii_mod.convert_image(
+            img, output_dir=out_dir, output_format=fmt, base_name="t",
+            html_mode="compact", progress_callback=lambda *_: None, **opts
+        )
+    assert (out_dir / "O_h_0_f_1.0_t.txt").read_text(encoding="utf-8") == text
+    assert (out_dir / "O_h_0_f_1.0_t.html").read_text(encoding="utf-8") == page
+    with Image.open(out_dir / "O_h_0_f_1.0_t.png") as saved:
+        assert saved.tobytes() == canvas.tobytes()
+    ascii_mod.convert_image(
+        img, output_format="ansi", progress_callback=lambda *_: None, **opts
+    )
+    assert capsys.readouterr().out == "\n" + ansi
+    assert text.split("\n") == ["".join(r) for r in rows]
+    assert len(colors) == len(rows) and colors[0][:3] == bytes(img.getpixel((0, 0)))
+
+
+def test_iter_rows_streams_rows_matching_render():
+    import io
+
+    img = Image.new("RGB", (8, 6))
+    img.putdata([(x * 30, y * 40, 200 - x * 20) for y in range(6) for x in range(8)])
+    conv = ascii_mod.Converter(ascii_mod.char_array)
+    opts = dict(scale_factor=1.0, bg_brightness=0)
+    for fmt, mode in (("text", "spans"), ("html", "spans"), ("html", "compact"), ("ansi", "spans")):
+        done = []
+        rows = conv.iter_rows(
+            img, fmt, html_mode=mode, progress_callback=lambda cur, _: done.append(cur), **opts
+        )
+        first = next(rows)
+        # Only the first row has been rendered so far.
+        assert done == [0]
+        result = conv.render(img, fmt, html_mode=mode, **opts)
+        assert [first, *rows] == result.lines
+        assert done[-1] == result.size[1]
+        buf = io.BytesIO()
+        conv.write(img, buf, fmt, html_mode=mode, **opts)
+        assert buf.getvalue().decode("utf-8") == result.getvalue()
+    with pytest.raises(ValueError, match="output_format must be one of"):
+        conv.iter_rows(img, "image")
+
+
+def test_convert_reads_and_writes_binary_streams(tmp_path, capsys):
+    import io
+
+    class Pipe(io.RawIOBase):
+        """Unseekable reader, like ``sys.stdin.buffer``."""
+
+        def __init__(self, data):
+            self._src = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, b):
+            return self._src.readinto(b)
+
+    img = Image.new("RGB", (6, 4))
+    img.putdata([(x * 40, y * 60, 90) for y in range(4) for x in range(6)])
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+    opts = dict(scale_factor=1.0, bg_brightness=0)
+    for fmt in ("text", "html", "ansi"):
+        out = io.BytesIO()
+        ascii_mod.convert_image(
+            Pipe(png.getvalue()), output_format=fmt, output_file=out,
+            output_dir=tmp_path / "unused", **opts
+        )
+        expected = ascii_mod.api.render(img, fmt, **opts).getvalue()
+        assert out.getvalue().decode("utf-8") == expected
+    out = io.BytesIO()
+    ascii_mod.convert_image(
+        io.BytesIO(png.getvalue()), output_format="image", output_file=out,
+        image_codec="bmp", **opts
+    )
+    assert out.getvalue() == ascii_mod.api.to_image_bytes(img, codec="bmp", **opts)
+    assert not (tmp_path / "unused").exists()
+    assert capsys.readouterr().out == ""
+
+
+def test_cli_stdout_output_carries_only_the_document(tmp_path):
+    import io
+    import subprocess
+
+    img = Image.new("RGB", (40, 30))
+    img.putdata([(x * 6, y * 8, 90) for y in range(30) for x in range(40)])
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+    cmd = [sys.executable, "-m", "ascii_art.cli", "--input", "-", "--output", "-"]
+    runs = [
+        subprocess.run(
+            cmd + ["--format", fmt] + extra,
+            input=png.getvalue(),
+            capture_output=True,
+            cwd=Path(__file__).resolve().parent.parent,
+            check=True,
+        )
+        for fmt in ("text", "image")
+        for extra in ([], ["--font", str(tmp_path / "missing.ttf")])
+    ]
+    # Diagnostics go to stderr; stdout is exactly the font-less document.
+    assert runs[1].stdout == runs[0].stdout
+    assert runs[3].stdout == runs[2].stdout
+    assert b"Could not load font" in runs[1].stderr
+    assert runs[2].stdout.startswith(b"\x89PNG")
+
+
+def test_shape_mapping_follows_sub_cell_layout():
+    from ascii_art import shape
+
+    # 2x3 sub-cells per cell: only the bottom sub-row of every cell is lit.
+    img = Image.new("L", (8, 6))
+    img.putdata([255 if y % 3 == 2 else 0 for y in range(6) for x in range(8)])
+    conv = ascii_mod.Converter(ascii_mod.char_array)
+    opts = dict(grid_size=(4, 2), bg_brightness=0, mapping="shape")
+    rows, _ = ascii_mod.api.to_grid(img, converter=conv, **opts)
+    chars = {ch for row in rows for ch in row}
+    assert len(chars) == 1
+    conv_mod = ascii_mod.converter
+    fnt = conv.font(None, conv_mod.ONE_CHAR_HEIGHT)
+    masks = conv_mod._glyph_masks(
+        font=fnt,
+        cell_width=conv_mod.ONE_CHAR_WIDTH,
+        cell_height=conv_mod.ONE_CHAR_HEIGHT,
+        font_key=str(getattr(fnt, "path", "") or "default"),
+        chars=conv.charset.chars,
+    )
+    (vec,) = shape.glyph_vectors([masks[chars.pop()]])
+    assert vec[4:].sum() > vec[:2].sum()
+
+    frame = Image.new("RGB", (40, 30))
+    frame.putdata([((x * 7) % 256, (y * 9) % 256, (x * y) % 256) for y in range(30) for x in range(40)])
+    text = ascii_mod.api.to_text(frame, scale_factor=0.5, mapping="shape")
+    buf = ascii_mod.PixelBuffer(frame.tobytes(), *frame.size)
+    assert ascii_mod.api.to_text(buf, scale_factor=0.5, mapping="shape") == text
+    with pytest.raises(ValueError, match="dither is not supported"):
+        ascii_mod.api.to_text(frame, mapping="shape", dither="atkinson")
+
+
+def test_edges_pick_directional_glyphs():
+    import numpy as np
+
+    conv = ascii_mod.Converter(ascii_mod.char_array)
+    opts = dict(grid_size=(6, 6), bg_brightness=0, edges=True)
+    ramp = set(conv.charset.chars)
+    # Bright right half, bright bottom half, bright lower-right triangle.
+    ramps = np.repeat([0, 255], 3)
+    planes = {
+        "|": np.tile(ramps, (6, 1)),
+        "_": np.tile(ramps[:, None], (1, 6)),
+        "/": np.where(np.add.outer(np.arange(6), np.arange(6)) > 5, 255, 0),
+    }
+    for glyph, plane in planes.items():
+        img = Image.fromarray(plane.astype(np.uint8))
+        rows, _ = ascii_mod.api.to_grid(img, converter=conv, **opts)
+        cells = {ch for row in rows for ch in row}
+        assert glyph in cells
+        assert cells <= ramp | {glyph}
+        dithered, _ = ascii_mod.api.to_grid(
+            img, converter=conv, dither="atkinson", **opts
+        )
+        assert [[ch == glyph for ch in row] for row in dithered] == [
+            [ch == glyph for ch in row] for row in rows
+        ]
+
+    # Flat areas keep the ramp character; every output covers the glyphs.
+    plain, _ = ascii_mod.api.to_grid(img, converter=conv, grid_size=(6, 6))
+    assert rows[0][0] == plain[0][0]
+    image = ascii_mod.api.to_image(img, converter=conv, **opts).convert("RGB")
+    assert np.array_equal(
+        ascii_mod.api.to_array(img, converter=conv, **opts), np.asarray(image)
+    )
+    shaped = ascii_mod.api.to_text(img, converter=conv, mapping="shape", **opts)
+    assert "/" in shaped
+
+
+def test_braille_mode_packs_dots():
+    # One 2x4 cell per braille dot: dot n lit alone in cell n.
+    positions = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (0, 3), (1, 3)]
+    img = Image.new("L", (16, 4))
+    for n, (x, y) in enumerate(positions):
+        img.putpixel((2 * n + x, y), 255)
+    opts = dict(grid_size=(8, 1), bg_brightness=0, mode="braille")
+    text = ascii_mod.api.to_text(img, **opts)
+    assert text == "".join(chr(0x2800 + (1 << n)) for n in range(8))
+
+    gray = Image.new("L", (16, 8), color=128)
+    assert set(ascii_mod.api.to_text(gray, **opts)) == {"⣿"}
+    dithered = ascii_mod.api.to_text(
+        Image.new("L", (16, 8), color=100), dither="floyd-steinberg", **opts
+    )
+    dots = sum(bin(ord(ch) - 0x2800).count("1") for ch in dithered)
+    assert 16 <= dots <= 34
+
+    # Empty patterns are trimmed like blank cells; dots are drawn as masks.
+    assert ascii_mod.api.to_ansi(Image.new("L", (16, 4)), **opts) == "\x1b[0m\n"
+    image = ascii_mod.api.to_image(img, fg_color="white", **opts)
+    assert image.getbbox() is not None
+    with pytest.raises(ValueError, match="supports dither none or floyd"):
+        ascii_mod.api.to_text(img, dither="atkinson", **opts)
+
+
+def test_halfblock_mode_pairs_colors():
+    # Top half red, bottom half blue in the first two cells, then all blue.
+    img = Image.new("RGB", (4, 2), color=(0, 0, 255))
+    img.paste((255, 0, 0), (0, 0, 2, 1))
+    opts = dict(grid_size=(4, 1), bg_brightness=0, mode="halfblock")
+    # Each colour is emitted only where it changes.
+    assert ascii_mod.api.to_ansi(img, **opts) == (
+        "\x1b[38;2;255;0;0m\x1b[48;2;0;0;255m▀▀\x1b[38;2;0;0;255m▀▀\x1b[0m\n"
+    )
+    assert "background:rgb(0,0,255)" in ascii_mod.api.to_html(img, **opts)
+    compact = ascii_mod.api.to_html(img, html_mode="compact", **opts)
+    assert compact.count("▀") == 4 and ".b0{" in compact
+
+    image = ascii_mod.api.to_image(img, cell_width=4, cell_height=6, **opts)
+    assert image.size == (16, 6)
+    assert image.getpixel((0, 0)) == (255, 0, 0)
+    assert image.getpixel((0, 5)) == image.getpixel((15, 0)) == (0, 0, 255)
+    with pytest.raises(ValueError, match="supports output_format image"):
+        ascii_mod.api.to_text(img, **opts)
+
+
+def test_ansi_escapes_only_on_colour_change():
+    img = Image.new("RGB", (4, 1))
+    img.putdata([(200, 0, 0), (200, 0, 0), (204, 3, 0), (100, 100, 250)])
+    opts = dict(grid_size=(4, 1), bg_brightness=0)
+    exact = ascii_mod.api.to_ansi(img, **opts)
+    assert exact.count("\x1b[38;2;") == 3
+    merged = ascii_mod.api.to_ansi(img, ansi_tolerance=8, **opts)
+    assert merged.count("\x1b[38;2;") == 2
+    assert merged.startswith("\x1b[38;2;200;0;0m")
+    assert ascii_mod.api.to_ansi(
+        Image.new("RGB", (4, 1), color=(90, 90, 90)), fg_color="white", **opts
+    ).count("\x1b[38;2;255;255;255m") == 1
+    with pytest.raises(ValueError, match="ansi_tolerance must be between"):
+        ascii_mod.api.to_ansi(img, ansi_tolerance=256, **opts)
+
+
+def test_ansi_palettes_use_cached_lookup_table(tmp_path, monkeypatch):
+    from ascii_art import ansipalette
+
+    monkeypatch.setenv("ASCII_ART_CACHE_DIR", str(tmp_path))
+    ansipalette.palette_lut.cache_clear()
+    img = Image.new("RGB", (4, 2), color=(250, 10, 10))
+    opts = dict(grid_size=(4, 1), bg_brightness=0)
+    assert ascii_mod.api.to_ansi(img, ansi_palette="16", **opts).startswith(
+        "\x1b[91m"
+    )
+    half = ascii_mod.api.to_ansi(img, ansi_palette="256", mode="halfblock", **opts)
+    assert half == "\x1b[38;5;196m\x1b[48;5;196m▀▀▀▀\x1b[0m\n"
+    # Every table entry is the nearest palette colour; both are on disk.
+    lut = ansipalette.palette_lut("256")
+    assert ansipalette.XTERM_256[lut[ansipalette.lut_key(8, 9, 8)] - 16] == (8, 8, 8)
+    assert len(list((tmp_path / "ansi").glob("*.lut"))) == 2
+    ansipalette.palette_lut.cache_clear()
+    monkeypatch.setattr(ansipalette, "_build_lut", None)
+    assert ansipalette.palette_lut("256") == lut
+    with pytest.raises(ValueError, match="ansi_palette must be one of"):
+        ascii_mod.api.to_ansi(img, ansi_palette="88", **opts)
+
+
+def test_compact_html_reuses_palette_across_frames():
+    img = Image.new("RGB", (12, 4))
+    img.putdata([(x * 20, 200 - y * 40, 90) for y in range(4) for x in range(12)])
+    frames = [img, img.transpose(Image.FLIP_LEFT_RIGHT), img.point(lambda v: v // 2)]
+    opts = dict(scale_factor=1.0, bg_brightness=0, html_mode="compact")
+    session = ascii_mod.FrameSession()
+    results = [
+        ascii_mod.api.render(frame, "html", session=session, **opts)
+        for frame in frames
+    ]
+    assert session.allocations["palette"] == 1
+    assert session.reuses["palette"] == len(frames) - 1
+    assert len({result.css for result in results}) == 1
+    # The first frame is rendered exactly as without a session.
+    assert results[0].getvalue() == ascii_mod.api.to_html(img, **opts)
+
+    # A run of same-class cells is one span, escaped per character.
+    ramp = Image.new("L", (4, 1))
+    ramp.putdata([255, 200, 120, 255])
+    result = ascii_mod.Converter([" ", "<", "&"]).render(
+        ramp, "html", grid_size=(4, 1), fg_color="white", **opts
+    )
+    assert result.lines == ['<span class="c0">&amp;&amp;&lt;&amp;</span>']
+
+
+def test_html_canvas_embeds_grid_planes(tmp_path):
+    import base64
+    import json
+    import zlib
+
+    img = Image.new("RGB", (6, 3))
+    img.putdata([(x * 50, y * 120, 60) for y in range(3) for x in range(6)])
+    opts = dict(grid_size=(6, 3), bg_brightness=0)
+    page = ascii_mod.api.to_html(img, html_mode="canvas", **opts)
+    assert "<canvas" in page and "<span" not in page
+    payload = page.split("type='application/json'>")[1].split("</script>")[0]
+    grid = json.loads(payload)
+    data = base64.b64decode(grid["data"])
+    if grid["deflate"]:
+        data = zlib.decompress(data)
+    n = grid["cols"] * grid["rows"]
+    rows = [
+        "".join(grid["chars"][i] for i in data[y * 6 : (y + 1) * 6])
+        for y in range(3)
+    ]
+    assert rows == ascii_mod.api.to_text(img, **opts).split("\n")
+    assert max(data[n:]) < len(grid["palette"])
+
+    # Dithered grids go through the rows, and convert() writes the page.
+    dithered = ascii_mod.api.render(
+        img, "html", html_mode="canvas", dither="atkinson", **opts
+    )
+    assert dithered.lines is None and dithered.page.startswith("<html>")
+    ascii_mod.convert_image(
+        img, output_dir=tmp_path, output_format="html", base_name="t",
+        html_mode="canvas", progress_callback=lambda *_: None, **opts
+    )
+    assert (tmp_path / "O_h_0_f_0.2_t.html").read_text(encoding="utf-8") == page
+    with pytest.raises(ValueError, match="renders no rows"):
+        next(ascii_mod.api.iter_rows(img, "html", html_mode="canvas", **opts))
+
+
+def test_api_to_image_bytes_from_path(tmp_path):
+    src = tmp_path / "in.png"
+    Image.new("RGB", (3, 3), color=(200, 10, 10)).save(src)
+    data = ascii_mod.api.to_image_bytes(src, scale_factor=1.0, codec="bmp")
+    assert data[:2] == b"BM"
+    assert ascii_mod.api.to_image(src, scale_factor=1.0, mono=True).mode == "L"
+
+
+def test_pixel_buffer_bgr_input_matches_pil_image():
+    img = Image.new("RGB", (7, 5))
+    img.putdata([(x * 30, y * 50, (x + y) * 20) for y in range(5) for x in range(7)])
+    rgb = img.tobytes()
+    bgr = bytearray(rgb)
+    bgr[0::3], bgr[2::3] = rgb[2::3], rgb[0::3]
+    buf = ascii_mod.PixelBuffer(memoryview(bgr), 7, 5, "BGR")
+    assert buf.sample((3, 2)).tobytes() == img.resize((3, 2), Image.NEAREST).tobytes()
+    opts = dict(scale_factor=0.6, bg_brightness=0)
+    assert ascii_mod.api.to_ansi(buf, **opts) == ascii_mod.api.to_ansi(img, **opts)
+    shaped = memoryview(rgb).cast("B", (5, 7, 3))
+    assert ascii_mod.api.to_text(shaped, **opts) == ascii_mod.api.to_text(img, **opts)
+    with pytest.raises(ValueError, match="smaller"):
+        ascii_mod.PixelBuffer(bytes(10), 7, 5)
+
+
+def test_api_to_array_matches_image_and_reuses_out():
+    import numpy as np
+
+    img = Image.new("RGB", (8, 6))
+    img.putdata([(x * 30, y * 40, 200 - x * 20) for y in range(6) for x in range(8)])
+    for opts in (
+        dict(scale_factor=1.0, bg_brightness=20),
+        dict(scale_factor=1.0, bg_brightness=20, mono=True),
+        dict(scale_factor=1.0, bg_brightness=20, colors=4),
+        dict(scale_factor=1.0, bg_brightness=20, fg_color="orange"),
+    ):
+        expected = np.asarray(ascii_mod.api.to_image(img, **opts).convert("RGB"))
+        buf = ascii_mod.api.to_array(img, **opts)
+        assert buf.shape == expected.shape and (buf == expected).all()
+        buf[:] = 0
+        assert ascii_mod.api.to_array(img, out=buf, **opts) is buf
+        assert (buf == expected).all()
+
+    grid = ascii_mod.api.to_array(img, grid_size=(3, 2), cell_width=4, cell_height=5)
+    assert grid.shape == (10, 12, 3)
+    with pytest.raises(ValueError, match="shape"):
+        ascii_mod.api.to_array(img, out=np.empty((1, 1, 3), np.uint8))
+
+
+def test_frame_session_reuses_buffers_with_identical_output():
+    img = Image.new("RGB", (12, 9))
+    img.putdata([(x * 20, y * 25, (x * y) % 256) for y in range(9) for x in range(12)])
+    frames = [img, img.transpose(Image.FLIP_LEFT_RIGHT), img.rotate(90)]
+    session = ascii_mod.FrameSession()
+    opts = dict(scale_factor=1.0, bg_brightness=10, dither="atkinson", mono=True)
+    for frame in frames:
+        plain = ascii_mod.api.to_image(frame, **opts)
+        pooled = ascii_mod.api.to_image(frame, session=session, **opts)
+        assert pooled.tobytes() == plain.tobytes()
+    assert session.allocations == {"canvas": 1, "dither": 1, "grays": 1, "cells": 1}
+    assert session.reuses["canvas"] == len(frames) - 1
+    assert session.reuses["dither"] == len(frames) - 1
+
+    # A different grid size allocates fresh buffers.
+    ascii_mod.api.to_image(img, session=session, **dict(opts, scale_factor=0.5))
+    assert session.allocations["canvas"] == 2
+
+
+def test_frame_session_shares_atlas_pool_across_formats():
+    img = Image.new("RGB", (12, 9))
+    img.putdata([(x * 20, y * 25, 90) for y in range(9) for x in range(12)])
+    opts = dict(scale_factor=1.0, bg_brightness=10, fg_color="orange")
+    image = ascii_mod.api.to_image(img, **opts).convert("RGB")
+    session = ascii_mod.FrameSession()
+    # Array and image output keep differently shaped glyph atlases.
+    for _ in range(2):
+        array = ascii_mod.api.to_array(img, session=session, **opts)
+        pooled = ascii_mod.api.to_image(img, session=session, **opts)
+        assert array.tobytes() == image.tobytes()
+        assert pooled.convert("RGB").tobytes() == image.tobytes()
+    assert session.allocations["atlas-array"] == 1
+    assert session.allocations["atlas-strip"] == 1
+
+
+def _fake_cv2(frames):
+    """Return a stand-in ``cv2`` module whose capture yields `frames`."""
+    import types
+
+    class VideoCapture:
+        def __init__(self, source):
+            self._frames = iter(frames)
+
+        def isOpened(self):
+            return True
+
+        def get(self, prop):
+            return len(frames)
+
+        def read(self):
+            frame = next(self._frames, None)
+            return frame is not None, frame
+
+        def release(self):
+            pass
+
+    return types.SimpleNamespace(VideoCapture=VideoCapture, CAP_PROP_FRAME_COUNT=7)
+
+
+def test_convert_video_forwards_html_and_ansi_options(tmp_path, monkeypatch, capsys):
+    import numpy as np
+
+    img = Image.new("RGB", (8, 4))
+    img.putdata([(x * 30, y * 60, 200 - x * 20) for y in range(4) for x in range(8)])
+    bgr = np.ascontiguousarray(np.asarray(img)[..., ::-1])
+    monkeypatch.setitem(sys.modules, "cv2", _fake_cv2([bgr, bgr]))
+    opts = dict(scale_factor=1.0, bg_brightness=0)
+    ascii_mod.convert_video(
+        "clip.mp4", output_dir=str(tmp_path), output_format="ansi", ansi_palette="16", **opts
+    )
+    out = capsys.readouterr().out
+    assert "\x1b[38;2;" not in out
+    assert out.count(ascii_mod.api.to_ansi(img, ansi_palette="16", **opts)) == 2
+
+    ascii_mod.convert_video(
+        "clip.mp4", output_dir=str(tmp_path), output_format="html", html_mode="compact", **opts
+    )
+    page = (tmp_path / "O_h_0_f_1.0_clip_00000.html").read_text(encoding="utf-8")
+    assert page == ascii_mod.api.to_html(img, html_mode="compact", **opts)
+
+
+def test_convert_video_forwards_colour_and_codec_options(tmp_path, monkeypatch):
+    import numpy as np
+
+    img = Image.new("RGB", (8, 4), (200, 40, 90))
+    bgr = np.ascontiguousarray(np.asarray(img)[..., ::-1])
+    monkeypatch.setitem(sys.modules, "cv2", _fake_cv2([bgr]))
+    ascii_mod.convert_video(
+        "clip.mp4",
+        scale_factor=1.0,
+        bg_brightness=0,
+        output_dir=str(tmp_path),
+        image_codec="webp-lossless",
+        fg_color="white",
+    )
+    (frame,) = tmp_path.iterdir()
+    assert frame.name == "O_h_0_f_1.0_clip_00000.webp"
+    with Image.open(frame) as im:
+        colours = {c for _, c in im.convert("RGB").getcolors(1 << 16)}
+    # White glyphs on a black background: only grays, never the frame colour.
+    assert all(r == g == b for r, g, b in colours)
+    with pytest.raises(ValueError, match="image_codec must be one of"):
+        ascii_mod.convert_video("clip.mp4", output_dir=str(tmp_path), image_codec="tiff")